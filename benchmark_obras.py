@@ -0,0 +1,1580 @@
+"""Benchmarks de la carga de obras.
+
+Uso:
+    python benchmark_obras.py streaming --veces 1 10 50 --bloque 5000
+    python benchmark_obras.py indices --veces 20
+    python benchmark_obras.py espacial --veces 20
+    python benchmark_obras.py texto --veces 1 100 760
+    python benchmark_obras.py paralelo --veces 20 --procesos 1 2 4
+    python benchmark_obras.py transiciones --veces 20 --cantidad 5000
+    python benchmark_obras.py sugerencias --cantidad 500 5000 50000
+    python benchmark_obras.py columnar --veces 1 10 40
+    python benchmark_obras.py escaneo --veces 1 10 40
+    python benchmark_obras.py suite --filas 10000 100000 1000000 --salida actual.json
+    python benchmark_obras.py comparar base.json actual.json --umbral 0.1
+    python benchmark_obras.py instrumentacion --veces 20 --formato prometheus
+    python benchmark_obras.py pragmas --veces 20
+    python benchmark_obras.py servicio --veces 20 --clientes 1 8 32 --segundos 5 --ingesta
+    python benchmark_obras.py listado --veces 40 200
+    python benchmark_obras.py arranque --veces 1 10 --repeticiones 5
+    python benchmark_obras.py historial --veces 40 --rondas 20
+    python benchmark_obras.py empresas --cantidad 10000 50000 100000
+    python benchmark_obras.py instantaneas --veces 1 10 40
+    python benchmark_obras.py ciudades --ciudades 1 2 4 8 16 32 --filas 5000
+
+Cada medición corre en un proceso aparte para que el pico de memoria (RSS)
+de una no contamine a la siguiente. Los resultados se imprimen como JSON,
+una línea por medición.
+"""
+import argparse
+import collections
+import contextlib
+import csv
+import datetime
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+RUTA_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'observatorio_de_obras_urbanas.csv')
+
+
+def rss_pico_mb():
+    """Pico de memoria residente del proceso actual, o None si no se puede medir."""
+    # En Linux se lee VmHWM, que a diferencia de ru_maxrss se puede reiniciar (reiniciar_pico_rss)
+    try:
+        with open('/proc/self/status') as estado:
+            for linea in estado:
+                if linea.startswith('VmHWM:'):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB y macOS bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def reiniciar_pico_rss():
+    """Lleva el pico de RSS al uso actual, para medir el de cada fase por separado.
+    Solo se puede en Linux; en otros sistemas el pico es el de todo el proceso."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as archivo:
+            archivo.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def replicar_csv(destino, veces, origen=RUTA_CSV):
+    """Escribe un CSV con las filas de origen repetidas `veces` veces."""
+    with open(origen, encoding='latin1', newline='') as archivo:
+        encabezado = archivo.readline()
+        cuerpo = archivo.read()
+    if not cuerpo.endswith('\n'):
+        cuerpo += '\n'
+    with open(destino, 'w', encoding='latin1', newline='') as archivo:
+        archivo.write(encabezado)
+        for _ in range(veces):
+            archivo.write(cuerpo)
+    return destino
+
+
+def preparar_base(ruta_db, perfil='predeterminado'):
+    from modelo_orm import sqlite_db
+    from gestionar_obras import ControlObra
+
+    sqlite_db.configurar(ruta_db, perfil)
+    with contextlib.redirect_stdout(io.StringIO()):
+        ControlObra.conectar_db()
+        ControlObra.mapear_orm()
+    return ControlObra
+
+
+def medir_carga(ruta_csv, ruta_db, modo, tamanio_bloque):
+    """Carga ruta_csv en una base nueva y devuelve tiempos y memoria."""
+    ControlObra = preparar_base(ruta_db)
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if modo == 'bloques':
+            filas = ControlObra.cargar_csv_por_bloques(ruta_csv, tamanio_bloque)
+        else:
+            filas = ControlObra.cargar_datos_masivo(ControlObra.extraer_datos(ruta_csv))
+    segundos = time.perf_counter() - inicio
+    return {
+        'modo': modo,
+        'bytes_csv': os.path.getsize(ruta_csv),
+        'filas': filas,
+        'segundos': round(segundos, 3),
+        'filas_por_segundo': round(filas / segundos, 1) if segundos else None,
+        'rss_pico_mb': round(rss_pico_mb() or 0, 1) or None,
+    }
+
+
+def benchmark_streaming(veces, tamanio_bloque, modos=('bloques', 'completo')):
+    """Mide carga completa vs. por bloques para CSVs de distinto tamaño."""
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        for n in veces:
+            ruta_csv = replicar_csv(os.path.join(carpeta, f'obras_x{n}.csv'), n)
+            for modo in modos:
+                ruta_db = os.path.join(carpeta, f'obras_x{n}_{modo}.db')
+                salida = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '_medir_carga',
+                     ruta_csv, ruta_db, modo, str(tamanio_bloque)],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                resultado = json.loads(salida.strip().splitlines()[-1])
+                resultado['veces'] = n
+                print(json.dumps(resultado))
+                resultados.append(resultado)
+    return resultados
+
+
+def consultas_indicadores():
+    """Las consultas de Obtener_indicadores (y una búsqueda por clave natural), por nombre."""
+    from peewee import fn
+    from modelo_orm import Obra, Etapa, Tipo_obra, Barrio, Empresa_licitadora
+
+    return {
+        'obras_por_etapa': (
+            Obra
+            .select(Etapa.Desc_etapa, Obra.Etapa, fn.COUNT(Obra.Id_Obra))
+            .join(Etapa)
+            .group_by(Obra.Etapa, Etapa.Desc_etapa)
+        ),
+        'obras_y_monto_por_tipo': (
+            Obra
+            .select(Tipo_obra.Desc_tipo, Obra.Tipo_obra, fn.COUNT(Obra.Id_Obra), fn.SUM(Obra.Monto_contrato))
+            .join(Tipo_obra)
+            .group_by(Obra.Tipo_obra, Tipo_obra.Desc_tipo)
+        ),
+        'barrios_comunas_123': Barrio.select().where(Barrio.Comuna.in_([1, 2, 3])),
+        'obras_finalizadas_en_24_meses': (
+            Obra.select(fn.COUNT(Obra.Id_Obra)).where((Obra.Etapa == 3) & (Obra.Plazo <= 24))
+        ),
+        'monto_total_inversion': Obra.select(fn.SUM(Obra.Monto_contrato)),
+        'empresa_por_nombre': (
+            Empresa_licitadora.select().where(Empresa_licitadora.Empresa == 'Criba S.A.')
+        ),
+    }
+
+
+def plan_de_consulta(consulta):
+    from modelo_orm import sqlite_db
+
+    sql, parametros = consulta.sql()
+    filas = sqlite_db.execute_sql('EXPLAIN QUERY PLAN ' + sql, parametros).fetchall()
+    return ' | '.join(fila[-1] for fila in filas)
+
+
+def cronometrar(funcion, repeticiones):
+    """Mediana en milisegundos de `repeticiones` ejecuciones de funcion()."""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return round(statistics.median(tiempos), 4)
+
+
+def indices_del_plan():
+    """Índices únicos y compuestos declarados en los modelos (no los implícitos de las FK)."""
+    from modelo_orm import Obra, CLAVES_NATURALES
+
+    indices = []
+    for modelo in list(CLAVES_NATURALES) + [Obra]:
+        for indice in modelo._meta.fields_to_index():
+            if indice._unique or len(indice._expressions) > 1:
+                indices.append((modelo, indice))
+    return indices
+
+
+def benchmark_indices(veces, repeticiones=50):
+    """Plan y tiempo de cada consulta de indicadores sin y con los índices del esquema."""
+    from modelo_orm import sqlite_db
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), veces)
+        ControlObra = preparar_base(os.path.join(carpeta, 'obras.db'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            filas = ControlObra.cargar_datos_masivo(ControlObra.extraer_datos(ruta_csv))
+
+        indices = indices_del_plan()
+        for fase in ('sin_indices', 'con_indices'):
+            if fase == 'sin_indices':
+                for _, indice in indices:
+                    sqlite_db.execute_sql(f'DROP INDEX IF EXISTS "{indice._name}"')
+            else:
+                for modelo, _ in indices:
+                    modelo._schema.create_indexes(safe=True)
+            sqlite_db.execute_sql('ANALYZE')
+
+            for nombre, consulta in consultas_indicadores().items():
+                resultado = {
+                    'consulta': nombre,
+                    'fase': fase,
+                    'filas_obras': filas,
+                    'ms': cronometrar(lambda: list(consulta.clone().tuples()), repeticiones),
+                    'plan': plan_de_consulta(consulta),
+                }
+                print(json.dumps(resultado, ensure_ascii=False))
+                resultados.append(resultado)
+    return resultados
+
+
+# Rectángulo que cubre la Ciudad de Buenos Aires, de donde se sortean los puntos de consulta
+CAJA_CABA = (-34.705, -58.531, -34.527, -58.335)
+
+
+def benchmark_espacial(veces, repeticiones=200, puntos=50):
+    """Tiempo de las consultas espaciales contra recorrer todas las coordenadas en Python."""
+    from modelo_orm import Obra, distancia_metros
+
+    azar = random.Random(0)
+    lat_min, lng_min, lat_max, lng_max = CAJA_CABA
+    centros = [(azar.uniform(lat_min, lat_max), azar.uniform(lng_min, lng_max)) for _ in range(puntos)]
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), veces)
+        ControlObra = preparar_base(os.path.join(carpeta, 'obras.db'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            filas = ControlObra.cargar_datos_masivo(ControlObra.extraer_datos(ruta_csv))
+
+        def fuerza_bruta(lat, lng, metros):
+            coordenadas = (Obra
+                           .select(Obra.Id_Obra, Obra.Latitud, Obra.Longitud)
+                           .where(Obra.Latitud.is_null(False) & Obra.Longitud.is_null(False))
+                           .tuples())
+            return [id_ for id_, lat_obra, lng_obra in coordenadas
+                    if distancia_metros(lat, lng, lat_obra, lng_obra) <= metros]
+
+        consultas = {
+            'en_radio_500m': lambda lat, lng: Obra.en_radio(lat, lng, 500),
+            'en_radio_2km': lambda lat, lng: Obra.en_radio(lat, lng, 2000),
+            'mas_cercanas_10': lambda lat, lng: Obra.mas_cercanas(lat, lng, 10),
+            'en_rectangulo_1km': lambda lat, lng: Obra.en_rectangulo(lat - 0.0045, lng - 0.0055,
+                                                                    lat + 0.0045, lng + 0.0055),
+            'fuerza_bruta_500m': lambda lat, lng: fuerza_bruta(lat, lng, 500),
+        }
+        for nombre, consulta in consultas.items():
+            # Cada punto se repite repeticiones/puntos veces; la fuerza bruta, una sola
+            vueltas = 1 if nombre.startswith('fuerza') else max(1, repeticiones // puntos)
+            tiempos, encontradas = [], []
+            for lat, lng in centros:
+                tiempos.append(cronometrar(lambda: consulta(lat, lng), vueltas))
+                encontradas.append(len(consulta(lat, lng)))
+            resultado = {
+                'consulta': nombre,
+                'filas_obras': filas,
+                'ms_mediana': round(statistics.median(tiempos), 4),
+                'ms_maximo': round(max(tiempos), 4),
+                'obras_promedio': round(statistics.mean(encontradas), 1),
+            }
+            print(json.dumps(resultado, ensure_ascii=False))
+            resultados.append(resultado)
+    return resultados
+
+
+TERMINOS_BUSQUEDA = ['escuela', 'plaza irlanda', 'corrientes', 'ilumin', 'jardín']
+
+
+def consulta_like(texto, limite=None):
+    """La búsqueda de antes: cada palabra con LIKE '%...%' en alguna de las columnas de texto."""
+    from modelo_orm import Obra
+
+    condicion = None
+    for palabra in texto.split():
+        patron = f'%{palabra}%'
+        en_alguna = (Obra.Nombre_obra ** patron) | (Obra.Descripcion ** patron) | (Obra.Direccion ** patron)
+        condicion = en_alguna if condicion is None else condicion & en_alguna
+    consulta = Obra.select().where(condicion)
+    return consulta.limit(limite) if limite else consulta
+
+
+def benchmark_texto(veces, repeticiones=5, limite=20):
+    """Búsqueda con LIKE contra FTS5 (primeras `limite` y total de coincidencias)."""
+    from modelo_orm import Obra, sqlite_db, consulta_fts
+
+    resultados = []
+    for n in veces:
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), n)
+            ControlObra = preparar_base(os.path.join(carpeta, 'obras.db'))
+            with contextlib.redirect_stdout(io.StringIO()):
+                filas = ControlObra.cargar_csv_por_bloques(ruta_csv)
+            os.remove(ruta_csv)
+
+            def contar_fts(texto):
+                return sqlite_db.execute_sql(
+                    'SELECT COUNT(*) FROM Obras_fts WHERE Obras_fts MATCH ?', (consulta_fts(texto),)).fetchone()[0]
+
+            for texto in TERMINOS_BUSQUEDA:
+                medidas = {
+                    'like_primeras': lambda: list(consulta_like(texto, limite).tuples()),
+                    'like_total': lambda: consulta_like(texto).count(),
+                    'fts_ranking': lambda: Obra.buscar(texto, limite),
+                    'fts_total': lambda: contar_fts(texto),
+                }
+                resultado = {'texto': texto, 'filas_obras': filas, 'veces': n,
+                             'coincidencias_like': consulta_like(texto).count(),
+                             'coincidencias_fts': contar_fts(texto)}
+                for nombre, funcion in medidas.items():
+                    resultado[f'ms_{nombre}'] = cronometrar(funcion, repeticiones)
+                print(json.dumps(resultado, ensure_ascii=False))
+                resultados.append(resultado)
+    return resultados
+
+
+def huella_base(ruta_db, con_historial=False):
+    """Hash del contenido de todas las tablas, para comprobar que dos cargas dejan la misma base.
+    Salvo con_historial, quedan afuera las del historial: sus eventos llevan la fecha y hora de la carga."""
+    import sqlite3
+    from modelo_orm import MODELOS_HISTORIAL
+
+    historial = {modelo._meta.table_name for modelo in MODELOS_HISTORIAL}
+    resumen = hashlib.sha256()
+    with contextlib.closing(sqlite3.connect(ruta_db)) as conexion:
+        tablas = [fila[0] for fila in conexion.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND sql NOT LIKE 'CREATE VIRTUAL%' "
+            "AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+        for tabla in tablas:
+            if tabla in historial and not con_historial:
+                continue
+            resumen.update(tabla.encode())
+            for fila in conexion.execute(f'SELECT * FROM "{tabla}" ORDER BY 1'):
+                resumen.update(repr(fila).encode())
+    return resumen.hexdigest()
+
+
+def benchmark_paralelo(veces, procesos, tamanio_bloque=20_000):
+    """Carga serie (cargar_csv_por_bloques) contra cargar_csv_en_paralelo con distintos procesos."""
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), veces)
+        huella_serie = None
+        for cantidad in [0] + list(procesos):
+            ruta_db = os.path.join(carpeta, f'obras_{cantidad}.db')
+            ControlObra = preparar_base(ruta_db)
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                if cantidad:
+                    filas = ControlObra.cargar_csv_en_paralelo(ruta_csv, cantidad, tamanio_bloque)
+                else:
+                    filas = ControlObra.cargar_csv_por_bloques(ruta_csv, tamanio_bloque)
+            segundos = time.perf_counter() - inicio
+            huella = huella_base(ruta_db)
+            huella_serie = huella_serie or huella
+            resultado = {
+                'modo': f'paralelo_{cantidad}' if cantidad else 'serie',
+                'filas': filas,
+                'segundos': round(segundos, 3),
+                'filas_por_segundo': round(filas / segundos, 1) if segundos else None,
+                'igual_a_serie': huella == huella_serie,
+                'cpus': os.cpu_count(),
+            }
+            print(json.dumps(resultado))
+            resultados.append(resultado)
+    return resultados
+
+
+def generar_transiciones(estados, cantidad, azar):
+    """Transiciones al azar sobre obras abiertas: avance, plazo, mano de obra y algunas finalizaciones."""
+    plazos = dict(estados)
+    abiertas = list(plazos)
+    registros = []
+    for _ in range(cantidad):
+        id_ = azar.choice(abiertas)
+        tirada = azar.random()
+        if tirada < 0.6:
+            registros.append({'obra': id_, 'transicion': 'actualizar_porcentaje_avance',
+                              'porcentaje': round(azar.uniform(0, 100), 1)})
+        elif tirada < 0.85:
+            plazos[id_] = (plazos[id_] or 0) + azar.randint(1, 6)
+            registros.append({'obra': id_, 'transicion': 'incrementar_plazo', 'plazo': plazos[id_]})
+        elif tirada < 0.95:
+            registros.append({'obra': id_, 'transicion': 'incrementar_mano_obra',
+                              'mano_obra': azar.randint(0, 300)})
+        else:
+            registros.append({'obra': id_, 'transicion': 'finalizar_obra'})
+            abiertas.remove(id_)
+    return registros
+
+
+def aplicar_con_save(registros):
+    """La forma anterior: traer la obra, cambiarle el atributo y save() (reescribe todas las columnas)."""
+    from modelo_orm import Obra, Etapa, cache_dimensiones
+
+    columnas = {'actualizar_porcentaje_avance': ('Porcentaje_avance', 'porcentaje'),
+                'incrementar_plazo': ('Plazo', 'plazo'),
+                'incrementar_mano_obra': ('Mano_de_obra', 'mano_obra')}
+    for registro in registros:
+        obra = Obra.get_by_id(registro['obra'])
+        if registro['transicion'] == 'finalizar_obra':
+            obra.Etapa = cache_dimensiones.obtener_o_crear(Etapa, Desc_etapa="Finalizada")[0]
+        else:
+            campo, argumento = columnas[registro['transicion']]
+            setattr(obra, campo, registro[argumento])
+        obra.save()
+
+
+def benchmark_transiciones(veces, cantidad):
+    """Transiciones por segundo: save() por obra, aplicar_transicion una por una y en lote."""
+    from modelo_orm import Obra, Etapa, sqlite_db, cache_dimensiones, verificar_resumenes
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), veces)
+        ruta_base = os.path.join(carpeta, 'base.db')
+        ControlObra = preparar_base(ruta_base)
+        with contextlib.redirect_stdout(io.StringIO()):
+            filas = ControlObra.cargar_csv_por_bloques(ruta_csv)
+        # Casi todas las obras del CSV están cerradas: se las reabre para tener donde aplicar transiciones
+        en_ejecucion, _ = cache_dimensiones.obtener_o_crear(Etapa, Desc_etapa="En ejecución")
+        Obra.update(Etapa=en_ejecucion).execute()
+        estados = list(Obra.select(Obra.Id_Obra, Obra.Plazo).tuples())
+        sqlite_db.close()
+        registros = generar_transiciones(estados, cantidad, random.Random(0))
+
+        def una_por_una(registros):
+            for registro in registros:
+                datos = {clave: valor for clave, valor in registro.items() if clave not in ('obra', 'transicion')}
+                Obra.get_by_id(registro['obra']).aplicar_transicion(registro['transicion'], **datos)
+
+        modos = {
+            'save_por_obra': aplicar_con_save,
+            'aplicar_transicion': una_por_una,
+            'aplicar_transiciones': Obra.aplicar_transiciones,
+        }
+        for modo, aplicar in modos.items():
+            ruta_db = os.path.join(carpeta, f'{modo}.db')
+            shutil.copy(ruta_base, ruta_db)
+            preparar_base(ruta_db)
+            inicio = time.perf_counter()
+            aplicar(registros)
+            segundos = time.perf_counter() - inicio
+            resultado = {
+                'modo': modo,
+                'filas_obras': filas,
+                'transiciones': len(registros),
+                'segundos': round(segundos, 3),
+                'transiciones_por_segundo': round(len(registros) / segundos, 1) if segundos else None,
+                'resumenes_consistentes': not verificar_resumenes(),
+            }
+            print(json.dumps(resultado))
+            resultados.append(resultado)
+            sqlite_db.close()
+    return resultados
+
+
+# Lo que escribiría alguien en el prompt: prefijo, palabra del medio, varias palabras y errores de tipeo
+TEXTOS_SUGERENCIAS = ('cri', 'constructora', 'ingenieria sa', 'contruciones', 'ingeniera del', 'xyz')
+
+
+def generar_empresas(cantidad, azar):
+    """Nombres de empresa armados con palabras de las empresas del CSV."""
+    with open(RUTA_CSV, encoding='latin1', newline='') as archivo:
+        nombres = {fila['licitacion_oferta_empresa'] for fila in csv.DictReader(archivo, delimiter=';')}
+    vocabulario = sorted({palabra for nombre in nombres if nombre for palabra in nombre.split()})
+    empresas = set()
+    while len(empresas) < cantidad:
+        empresas.add(' '.join(azar.sample(vocabulario, azar.randint(2, 4))))
+    return sorted(empresas)
+
+
+def benchmark_sugerencias(cantidades, repeticiones=200):
+    """Prompt de empresa: listar toda la tabla (como antes) vs. sugerencias del índice en memoria."""
+    from peewee import chunked
+    from modelo_orm import Empresa_licitadora, sqlite_db, cache_dimensiones
+
+    resultados = []
+    for cantidad in cantidades:
+        with tempfile.TemporaryDirectory() as carpeta:
+            preparar_base(os.path.join(carpeta, 'obras.db'))
+            empresas = generar_empresas(cantidad, random.Random(0))
+            with sqlite_db.atomic():
+                for lote in chunked(empresas, 500):
+                    Empresa_licitadora.insert_many([(empresa,) for empresa in lote],
+                                                   fields=[Empresa_licitadora.Empresa]).execute()
+
+            def listar_todo():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for item in Empresa_licitadora.select():
+                        print(f"- {item.Empresa}")
+
+            def armar_indice():
+                cache_dimensiones.invalidar(Empresa_licitadora)
+                cache_dimensiones.sugerencias(Empresa_licitadora, 'Empresa')
+
+            resultado = {'empresas': cantidad,
+                         'ms_listar_todo': cronometrar(listar_todo, max(1, repeticiones // 20)),
+                         'ms_armar_indice': cronometrar(armar_indice, max(1, repeticiones // 20))}
+            for texto in TEXTOS_SUGERENCIAS:
+                resultado[f'ms_sugerir_{texto}'] = cronometrar(
+                    lambda: cache_dimensiones.sugerir(Empresa_licitadora, 'Empresa', texto), repeticiones)
+            print(json.dumps(resultado))
+            resultados.append(resultado)
+            sqlite_db.close()
+    return resultados
+
+
+def tamanio_carpeta_mb(carpeta):
+    return sum(os.path.getsize(os.path.join(raiz, archivo))
+               for raiz, _, archivos in os.walk(carpeta) for archivo in archivos) / (1024 * 1024)
+
+
+def indicadores_iguales(a, b):
+    """Compara dos resultados de indicadores tolerando el orden de suma de los montos."""
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(indicadores_iguales(a[clave], b[clave]) for clave in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(indicadores_iguales(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        return abs(a - b) <= 1e-9 * max(abs(a), abs(b), 1)
+    return a == b
+
+
+def benchmark_columnar(veces, repeticiones=5):
+    """Indicadores desde SQLite (resúmenes y GROUP BY sobre Obras) contra los
+    archivos Parquet / Arrow IPC, y el paso a pandas fila por fila contra el columnar."""
+    import pandas as pd
+    from modelo_orm import sqlite_db, _calcular_resumenes
+    from columnar_obras import (FORMATOS, consulta_estrella, exportar_columnar,
+                                indicadores_columnares, leer_obras)
+
+    resultados = []
+    for n in veces:
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), n)
+            ControlObra = preparar_base(os.path.join(carpeta, 'obras.db'))
+            with contextlib.redirect_stdout(io.StringIO()):
+                filas = ControlObra.cargar_csv_en_paralelo(ruta_csv)
+                esperado = ControlObra.Obtener_indicadores(usar_cache=False)
+            os.remove(ruta_csv)
+
+            def desde_resumenes():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ControlObra.Obtener_indicadores(usar_cache=False)
+
+            resultado = {'filas_obras': filas, 'veces': n,
+                         'ms_sqlite_resumenes': cronometrar(desde_resumenes, repeticiones),
+                         'ms_sqlite_group_by': cronometrar(_calcular_resumenes, repeticiones),
+                         'ms_sqlite_a_pandas': cronometrar(
+                             lambda: pd.DataFrame(list(consulta_estrella().dicts())), 1)}
+            for formato in FORMATOS:
+                destino = os.path.join(carpeta, formato)
+                inicio = time.perf_counter()
+                exportar_columnar(destino, formato)
+                resultado[f's_exportar_{formato}'] = round(time.perf_counter() - inicio, 3)
+                resultado[f'mb_{formato}'] = round(tamanio_carpeta_mb(destino), 2)
+                resultado[f'ms_indicadores_{formato}'] = cronometrar(
+                    lambda: indicadores_columnares(destino, formato), repeticiones)
+                resultado[f'ms_{formato}_a_pandas'] = cronometrar(
+                    lambda: leer_obras(destino, formato).to_table().to_pandas(), 1)
+                resultado[f'coincide_{formato}'] = indicadores_iguales(
+                    esperado, indicadores_columnares(destino, formato))
+            sqlite_db.close()
+            resultado['mb_sqlite'] = round(os.path.getsize(os.path.join(carpeta, 'obras.db')) / (1024 * 1024), 2)
+            print(json.dumps(resultado))
+            resultados.append(resultado)
+    return resultados
+
+
+def memoria_retenida_mb(funcion):
+    """MB que siguen asignados por Python después de funcion() mientras se conserva su resultado."""
+    tracemalloc.start()
+    try:
+        resultado = funcion()
+        actual, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del resultado
+    return round(actual / (1024 * 1024), 2)
+
+
+def benchmark_escaneo(veces, repeticiones=3):
+    """Recorrer todas las obras: modelos de Obra.select() contra Obra.recorrer() y
+    Obra.columnas_numericas(). Mide la memoria de tener todas en una lista y el
+    tiempo de una pasada que suma los montos."""
+    import numpy as np
+    from peewee import ForeignKeyField
+    from modelo_orm import Obra, sqlite_db, CAMPOS_NUMERICOS
+
+    # Las mismas columnas que columnas_numericas, para comparar namedtuples con NumPy
+    numericos = (['Id_Obra'] + [campo.name for campo in Obra._meta.sorted_fields
+                                if isinstance(campo, ForeignKeyField)] + list(CAMPOS_NUMERICOS))
+    resultados = []
+    for n in veces:
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), n)
+            ControlObra = preparar_base(os.path.join(carpeta, 'obras.db'))
+            with contextlib.redirect_stdout(io.StringIO()):
+                filas = ControlObra.cargar_csv_en_paralelo(ruta_csv)
+            os.remove(ruta_csv)
+
+            modos = {
+                'modelos': (lambda: list(Obra.select()),
+                            lambda: sum(obra.Monto_contrato or 0 for obra in Obra.select().iterator())),
+                'compactos': (lambda: list(Obra.recorrer()),
+                              lambda: sum(obra.Monto_contrato or 0 for obra in Obra.recorrer())),
+                'compactos_numericos': (lambda: list(Obra.recorrer(numericos)),
+                                        lambda: sum(obra.Monto_contrato or 0 for obra in Obra.recorrer(numericos))),
+                'numpy': (Obra.columnas_numericas,
+                          lambda: float(np.nansum(Obra.columnas_numericas()['Monto_contrato']))),
+            }
+            for modo, (listar, sumar) in modos.items():
+                mb = memoria_retenida_mb(listar)
+                ms = cronometrar(sumar, repeticiones)
+                resultado = {'modo': modo, 'filas_obras': filas, 'veces': n,
+                             'mb_en_memoria': mb,
+                             'bytes_por_obra': round(mb * 1024 * 1024 / filas) if filas else None,
+                             'ms_recorrido': ms,
+                             'obras_por_segundo': round(filas / ms * 1000) if ms else None,
+                             'suma_monto': round(sumar(), 2)}
+                print(json.dumps(resultado))
+                resultados.append(resultado)
+            sqlite_db.close()
+    return resultados
+
+
+# Suite de regresión: CSV sintéticos con la forma del original, fases medidas por separado
+TAMANIOS_SUITE = (10_000, 100_000, 1_000_000)
+CARGAS_SUITE = ('masivo', 'sincronizar', 'filas')
+# Cambios más chicos que esto (en segundos) no cuentan como regresión: son ruido
+DIFERENCIA_MINIMA_S = 0.005
+
+
+def _desplazar_coordenada(texto, azar, rango):
+    """Mueve unos cientos de metros una coordenada del CSV ('-34,5671'), si es válida."""
+    try:
+        valor = float(texto.replace(',', '.'))
+    except ValueError:
+        return texto
+    if not -rango <= valor <= rango:
+        return texto
+    return f'{valor + azar.uniform(-0.003, 0.003):.8f}'.replace('.', ',')
+
+
+def generar_csv_sintetico(destino, filas, semilla=0, origen=RUTA_CSV):
+    """CSV de `filas` filas con las columnas, el separador ';' y el latin1 del original.
+
+    Cada fila es una fila real elegida al azar, así cada columna mantiene su
+    distribución (vacíos y valores mal formados incluidos) y las columnas que
+    van juntas (barrio y comuna, etapa y avance) siguen siendo coherentes. Se
+    numera el nombre para que no haya obras repetidas y se mueven un poco las
+    coordenadas para que no caigan todas en los mismos puntos.
+    """
+    azar = random.Random(semilla)
+    with open(origen, encoding='latin1', newline='') as archivo:
+        lector = csv.reader(archivo, delimiter=';')
+        encabezado = next(lector)
+        reales = list(lector)
+    nombre, lat, lng = (encabezado.index(columna) for columna in ('nombre', 'lat', 'lng'))
+    with open(destino, 'w', encoding='latin1', newline='') as archivo:
+        escritor = csv.writer(archivo, delimiter=';')
+        escritor.writerow(encabezado)
+        for numero in range(1, filas + 1):
+            fila = list(azar.choice(reales))
+            fila[nombre] = f'{fila[nombre]} #{numero}'
+            fila[lat] = _desplazar_coordenada(fila[lat], azar, 90)
+            fila[lng] = _desplazar_coordenada(fila[lng], azar, 180)
+            escritor.writerow(fila)
+    return destino
+
+
+def correr_fases(ruta_csv, ruta_db, carga, repeticiones=5):
+    """Parseo, normalización, carga y cada consulta de indicadores, con su tiempo
+    y su pico de RSS. Se corre en un proceso propio por tamaño (ver benchmark_suite)."""
+    import pandas as pd
+    from gestionar_obras import COLUMNAS_UTILES, normalizar_df
+
+    mediciones = []
+
+    def medir(fase, funcion, filas=None, veces=1):
+        reiniciar_pico_rss()
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = funcion()
+            segundos = time.perf_counter() - inicio
+            if veces > 1:
+                segundos = cronometrar(funcion, veces) / 1000
+        mediciones.append({
+            'fase': fase,
+            'segundos': round(segundos, 6),
+            'filas_por_segundo': round(filas / segundos, 1) if filas and segundos else None,
+            'mb_pico': round(rss_pico_mb() or 0, 1) or None,
+        })
+        return resultado
+
+    crudo = medir('parseo', lambda: pd.read_csv(ruta_csv, sep=';', encoding='latin1', dtype=str))
+    filas = len(crudo)
+    mediciones[-1]['filas_por_segundo'] = round(filas / mediciones[-1]['segundos'], 1)
+    df, _ = medir('normalizacion', lambda: normalizar_df(crudo[COLUMNAS_UTILES]), filas)
+    del crudo
+
+    ControlObra = preparar_base(ruta_db)
+    cargadores = {
+        'masivo': lambda: ControlObra.cargar_datos_masivo(df),
+        'sincronizar': lambda: ControlObra.sincronizar_datos(df),
+        'filas': lambda: ControlObra.cargar_datos(df),
+    }
+    medir('carga', cargadores[carga], filas)
+    del df
+
+    for nombre, consulta in consultas_indicadores().items():
+        medir(f'consulta_{nombre}', lambda: list(consulta.tuples()), veces=repeticiones)
+    medir('Obtener_indicadores', lambda: ControlObra.Obtener_indicadores(usar_cache=False), veces=repeticiones)
+    medir('Obtener_indicadores_cache', ControlObra.Obtener_indicadores, veces=repeticiones)
+    return mediciones
+
+
+def metadatos_entorno():
+    """Con qué código y en qué máquina se midió, para poder comparar resultados."""
+    import pandas as pd
+    import peewee
+
+    def git(*argumentos):
+        try:
+            return subprocess.run(['git', *argumentos], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                  check=True, capture_output=True, text=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'cambios_sin_commit': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'peewee': peewee.__version__,
+        'pandas': pd.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def benchmark_suite(tamanios, carga='masivo', salida=None, semilla=0):
+    """Para cada tamaño genera un CSV sintético y mide sus fases en un proceso aparte.
+    Imprime una línea JSON por medición y, con `salida`, guarda todo junto con
+    metadatos_entorno() para compararlo después con `comparar`."""
+    mediciones = []
+    for filas in tamanios:
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta_csv = generar_csv_sintetico(os.path.join(carpeta, 'obras.csv'), filas, semilla)
+            salida_fases = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '_fases',
+                 ruta_csv, os.path.join(carpeta, 'obras.db'), carga],
+                check=True, capture_output=True, text=True
+            ).stdout
+            for medicion in json.loads(salida_fases.strip().splitlines()[-1]):
+                medicion = {'filas': filas, 'carga': carga, **medicion}
+                print(json.dumps(medicion))
+                mediciones.append(medicion)
+    if salida:
+        with open(salida, 'w', encoding='utf-8') as archivo:
+            json.dump({'entorno': metadatos_entorno(), 'semilla': semilla, 'mediciones': mediciones},
+                      archivo, ensure_ascii=False, indent=2)
+    return mediciones
+
+
+def comparar(ruta_base, ruta_nueva, umbral=0.10):
+    """Compara dos salidas de `suite` medición por medición. Imprime una línea JSON
+    por medición y devuelve cuántas empeoraron (tiempo o memoria) más que `umbral`."""
+    def cargar(ruta):
+        with open(ruta, encoding='utf-8') as archivo:
+            return {(m['filas'], m['carga'], m['fase']): m for m in json.load(archivo)['mediciones']}
+
+    base, nueva = cargar(ruta_base), cargar(ruta_nueva)
+    regresiones = 0
+    for clave in sorted(base.keys() & nueva.keys()):
+        antes, despues = base[clave], nueva[clave]
+        cambio = {}
+        for metrica, minimo in (('segundos', DIFERENCIA_MINIMA_S), ('mb_pico', 1.0)):
+            if antes.get(metrica) and despues.get(metrica):
+                cambio[f'cambio_{metrica}'] = round(despues[metrica] / antes[metrica] - 1, 3)
+                if cambio[f'cambio_{metrica}'] > umbral and despues[metrica] - antes[metrica] > minimo:
+                    cambio.setdefault('regresion', []).append(metrica)
+        regresiones += 'regresion' in cambio
+        print(json.dumps({'filas': clave[0], 'carga': clave[1], 'fase': clave[2],
+                          'segundos': [antes['segundos'], despues['segundos']],
+                          'mb_pico': [antes.get('mb_pico'), despues.get('mb_pico')], **cambio}))
+    for clave in sorted(base.keys() ^ nueva.keys()):
+        print(json.dumps({'filas': clave[0], 'carga': clave[1], 'fase': clave[2],
+                          'solo_en': ruta_base if clave in base else ruta_nueva}))
+    return regresiones
+
+
+def benchmark_instrumentacion(veces, formato='json', repeticiones=3):
+    """Carga por bloques con la instrumentación apagada y prendida (costo de medir)
+    y muestra el reporte de la última carga instrumentada."""
+    from instrumentacion import instrumentacion
+    from modelo_orm import sqlite_db
+
+    segundos = {False: [], True: []}
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), veces)
+        for repeticion in range(repeticiones):
+            for activa in (False, True):
+                ruta_db = os.path.join(carpeta, f'obras_{repeticion}_{activa}.db')
+                ControlObra = preparar_base(ruta_db)
+                instrumentacion.reiniciar()
+                if activa:
+                    instrumentacion.activar()
+                inicio = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    filas = ControlObra.cargar_csv_por_bloques(ruta_csv)
+                    ControlObra.Obtener_indicadores(usar_cache=False)
+                segundos[activa].append(time.perf_counter() - inicio)
+                instrumentacion.desactivar()
+                sqlite_db.close()
+
+    apagada, prendida = statistics.median(segundos[False]), statistics.median(segundos[True])
+    print(json.dumps({'filas': filas, 'segundos_apagada': round(apagada, 3), 'segundos_prendida': round(prendida, 3),
+                      'costo_relativo': round(prendida / apagada - 1, 4)}))
+    print(instrumentacion.a_prometheus() if formato == 'prometheus' else instrumentacion.a_json(indent=2))
+
+
+def benchmark_pragmas(veces, repeticiones=5):
+    """Carga y consultas típicas con cada perfil de PRAGMAs de conexion.py, y con
+    la base en memoria. Las consultas corren después de reabrir la base."""
+    from conexion import PERFILES
+    from modelo_orm import Obra, sqlite_db
+
+    variantes = [(perfil, perfil, 'archivo') for perfil in PERFILES] + [('memoria', 'predeterminado', ':memory:')]
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), veces)
+        for nombre, perfil, destino in variantes:
+            ruta_db = os.path.join(carpeta, f'{nombre}.db') if destino == 'archivo' else destino
+            ControlObra = preparar_base(ruta_db, perfil)
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                filas = ControlObra.cargar_csv_por_bloques(ruta_csv)
+            segundos_carga = time.perf_counter() - inicio
+            if destino == 'archivo':
+                sqlite_db.close()
+                sqlite_db.connect()
+            ids = [id_ for id_, in Obra.select(Obra.Id_Obra).tuples()]
+            muestra = random.Random(0).sample(ids, min(500, len(ids)))
+
+            def indicadores():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ControlObra.Obtener_indicadores(usar_cache=False)
+
+            resultado = {
+                'variante': nombre, 'filas_obras': filas,
+                's_carga': round(segundos_carga, 3),
+                'ms_indicadores': cronometrar(indicadores, repeticiones),
+                'ms_500_por_id': cronometrar(lambda: [Obra.get_by_id(id_) for id_ in muestra], repeticiones),
+                'ms_buscar_texto': cronometrar(lambda: Obra.buscar('escuela'), repeticiones),
+                'ms_mas_cercanas': cronometrar(lambda: Obra.mas_cercanas(-34.6, -58.45, 10), repeticiones),
+                'ms_recorrer': cronometrar(lambda: sum(obra.Monto_contrato or 0 for obra in Obra.recorrer()),
+                                           repeticiones),
+            }
+            print(json.dumps(resultado))
+            resultados.append(resultado)
+            sqlite_db.close()
+    return resultados
+
+
+# Mezcla de pedidos del generador de carga: (proporción, tipo)
+MEZCLA_SERVICIO = ((0.10, 'indicadores'), (0.50, 'obra'), (0.25, 'listado'), (0.15, 'buscar'))
+PALABRAS_SERVICIO = ('escuela', 'plaza', 'hospital', 'calle', 'centro', 'vivienda', 'parque', 'subte')
+
+
+def pedido_al_azar(azar, ids, etapas, comunas):
+    tirada, acumulado = azar.random(), 0
+    for proporcion, tipo in MEZCLA_SERVICIO:
+        acumulado += proporcion
+        if tirada < acumulado:
+            break
+    if tipo == 'indicadores':
+        return '/indicadores'
+    if tipo == 'obra':
+        return f'/obras/{azar.choice(ids)}'
+    if tipo == 'listado':
+        id_ = azar.choice(ids)
+        return (f'/obras?etapa={azar.choice(etapas)}&comuna={azar.choice(comunas)}'
+                f'&despues=[{id_},{id_}]&limite=50')
+    return f'/buscar?q={azar.choice(PALABRAS_SERVICIO)}&limite=20'
+
+
+async def generar_carga(ruta_socket, clientes, segundos, ids, etapas, comunas):
+    """`clientes` conexiones keep-alive pidiendo sin pausa durante `segundos`.
+    Devuelve las latencias en milisegundos y la cantidad de errores."""
+    import asyncio
+
+    latencias, errores = [], 0
+    fin = time.perf_counter() + segundos
+
+    async def cliente(numero):
+        nonlocal errores
+        azar = random.Random(numero)
+        lector, escritor = await asyncio.open_unix_connection(ruta_socket)
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            escritor.write(f'GET {pedido_al_azar(azar, ids, etapas, comunas)} HTTP/1.1\r\n'
+                           'Host: local\r\n\r\n'.encode())
+            estado = (await lector.readline()).split()[1]
+            largo = 0
+            while (encabezado := await lector.readline()) != b'\r\n':
+                if encabezado.lower().startswith(b'content-length:'):
+                    largo = int(encabezado.split(b':')[1])
+            await lector.readexactly(largo)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            errores += estado not in (b'200', b'404')
+        escritor.close()
+
+    await asyncio.gather(*(cliente(numero) for numero in range(clientes)))
+    return latencias, errores
+
+
+def benchmark_servicio(veces, clientes, segundos=5, lectores=4, ingesta=False):
+    """Pedidos por segundo y latencias del servicio de consultas para distinta
+    cantidad de clientes concurrentes; con `ingesta`, mientras otro proceso carga obras."""
+    import asyncio
+    from modelo_orm import Obra, Etapa, Comuna, sqlite_db
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), veces)
+        ruta_db = os.path.join(carpeta, 'obras.db')
+        ControlObra = preparar_base(ruta_db)
+        with contextlib.redirect_stdout(io.StringIO()):
+            filas = ControlObra.cargar_csv_por_bloques(ruta_csv)
+        ids = [id_ for id_, in Obra.select(Obra.Id_Obra).tuples()]
+        etapas = [id_ for id_, in Etapa.select(Etapa.Id_Etapa).tuples()]
+        comunas = [id_ for id_, in Comuna.select(Comuna.Id_Comuna).tuples()]
+        sqlite_db.close()
+
+        ruta_socket = os.path.join(carpeta, 'servicio.sock')
+        servicio = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'servicio_obras.py'),
+             '--db', ruta_db, '--socket', ruta_socket, '--lectores', str(lectores)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while not os.path.exists(ruta_socket):
+                if servicio.poll() is not None:
+                    raise RuntimeError('El servicio de consultas no arrancó')
+                time.sleep(0.05)
+            for cantidad in clientes:
+                escritor = None
+                if ingesta:
+                    escritor = subprocess.Popen(
+                        [sys.executable, os.path.abspath(__file__), '_medir_carga', ruta_csv, ruta_db, 'bloques', '5000'],
+                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                latencias, errores = asyncio.run(
+                    generar_carga(ruta_socket, cantidad, segundos, ids, etapas, comunas))
+                if escritor:
+                    escritor.terminate()
+                    escritor.wait()
+                percentiles = statistics.quantiles(latencias, n=100)
+                resultado = {'clientes': cantidad, 'lectores': lectores, 'ingesta': ingesta, 'filas_obras': filas,
+                             'pedidos': len(latencias), 'errores': errores,
+                             'pedidos_por_segundo': round(len(latencias) / segundos, 1),
+                             'ms_p50': round(percentiles[49], 2), 'ms_p95': round(percentiles[94], 2),
+                             'ms_p99': round(percentiles[98], 2), 'ms_max': round(max(latencias), 2)}
+                print(json.dumps(resultado))
+                resultados.append(resultado)
+        finally:
+            servicio.terminate()
+            servicio.wait()
+    return resultados
+
+
+def listados_de_prueba():
+    """Combinaciones de filtros y orden del listado de obras, por nombre."""
+    from modelo_orm import Obra, Etapa, Tipo_obra
+    from peewee import fn
+
+    def mas_comun(campo):
+        return Obra.select(campo).group_by(campo).order_by(fn.COUNT(Obra.Id_Obra).desc()).scalar()
+
+    etapa, tipo = mas_comun(Obra.Etapa), mas_comun(Obra.Tipo_obra)
+    menos_comun = Obra.select(Obra.Etapa).group_by(Obra.Etapa).order_by(fn.COUNT(Obra.Id_Obra)).scalar()
+    return {
+        'id': lambda: Obra.listado(),
+        'monto': lambda: Obra.listado('monto'),
+        'etapa_fecha_desc': lambda: Obra.listado('fecha_inicio', descendente=True).etapa(etapa),
+        'tipo_avance_rango_monto': lambda: Obra.listado('avance').tipo_obra(tipo).monto(minimo=1e6),
+        'comuna_monto_desc': lambda: Obra.listado('monto', descendente=True).comuna(1),
+        'etapa_poco_comun_monto': lambda: Obra.listado('monto').etapa(menos_comun),
+        'fechas_2019_2021_id': lambda: Obra.listado().fecha_inicio('2019-01-01', '2021-12-31'),
+    }
+
+
+def benchmark_listado(veces, repeticiones=20, profundidades=(0, 0.5, 0.99), limite=50):
+    """Una página del listado de obras a distintas profundidades: LIMIT/OFFSET
+    contra ListadoObras (keyset), con los mismos filtros y orden."""
+    from modelo_orm import sqlite_db, Obra
+
+    resultados = []
+    for n in veces:
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), n)
+            ControlObra = preparar_base(os.path.join(carpeta, 'obras.db'))
+            with contextlib.redirect_stdout(io.StringIO()):
+                filas = ControlObra.cargar_csv_en_paralelo(ruta_csv)
+            os.remove(ruta_csv)
+
+            for nombre, armar in listados_de_prueba().items():
+                listado = armar()
+                total = listado.contar()
+                filtro = listado._filtro()
+                orden = ([listado.clave.desc(), Obra.Id_Obra.desc()] if listado.descendente
+                         else [listado.clave, Obra.Id_Obra])
+                con_offset = Obra.select().order_by(*orden)
+                if filtro is not None:
+                    con_offset = con_offset.where(filtro)
+                for profundidad in profundidades:
+                    salto = int(total * profundidad)
+                    despues = None
+                    if salto:
+                        anterior = sqlite_db.execute(
+                            con_offset.select(listado.clave, Obra.Id_Obra).offset(salto - 1).limit(1)).fetchone()
+                        despues = tuple(anterior)
+                    resultado = {
+                        'listado': nombre, 'filas_obras': filas, 'obras_filtradas': total,
+                        'profundidad': profundidad, 'indice': listado.indice(),
+                        'ms_offset': cronometrar(
+                            lambda: sqlite_db.execute(con_offset.offset(salto).limit(limite)).fetchall(),
+                            repeticiones),
+                        'ms_keyset': cronometrar(lambda: armar().pagina(limite, despues), repeticiones),
+                    }
+                    print(json.dumps(resultado))
+                    resultados.append(resultado)
+            sqlite_db.close()
+    return resultados
+
+
+# Lo que hace ControlObra.main antes de los pasos interactivos, seguido de los indicadores
+ARRANQUE_MAIN = """
+import contextlib, io, sys
+from gestionar_obras import ControlObra
+with contextlib.redirect_stdout(io.StringIO()):
+    ControlObra.conectar_db()
+    ControlObra.mapear_orm()
+    ControlObra.sincronizar_datos(ControlObra.extraer_datos(sys.argv[1]))
+    ControlObra.mostrar_indicadores(ControlObra.Obtener_indicadores())
+"""
+
+
+def comandos_arranque(ruta_csv):
+    """Nombre -> argumentos de cada arranque a medir, en un proceso nuevo."""
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cli_obras.py')
+    return {
+        'python': ['-c', 'pass'],
+        'import_gestionar_obras': ['-c', 'import gestionar_obras'],
+        'main_sin_interaccion': ['-c', ARRANQUE_MAIN, ruta_csv],
+        'cli_init': [cli, 'init'],
+        'cli_indicators': [cli, 'indicators'],
+        'cli_indicators_json': [cli, 'indicators', '--json'],
+        'cli_search': [cli, 'search', 'escuela'],
+        'cli_ingest': [cli, 'ingest', ruta_csv, '--modo', 'bloques'],
+    }
+
+
+def benchmark_arranque(veces, repeticiones=5):
+    """Tiempo de pared de cada subcomando de cli_obras.py en un proceso nuevo
+    (importaciones incluidas) contra el arranque de ControlObra.main, con la
+    base ya cargada con el CSV repetido `veces` veces."""
+    from modelo_orm import sqlite_db
+
+    resultados = []
+    for n in veces:
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), n)
+            ruta_db = os.path.join(carpeta, 'obras.db')
+            ControlObra = preparar_base(ruta_db)
+            with contextlib.redirect_stdout(io.StringIO()):
+                filas = ControlObra.sincronizar_datos(ControlObra.extraer_datos(ruta_csv))['nuevas']
+            sqlite_db.close()
+            entorno = {**os.environ, 'OBRAS_DB': ruta_db, 'PYTHONPATH': os.path.dirname(os.path.abspath(__file__))}
+            entorno.pop('OBRAS_INSTRUMENTACION', None)
+            for nombre, argumentos in comandos_arranque(ruta_csv).items():
+                tiempos = []
+                for _ in range(repeticiones):
+                    inicio = time.perf_counter()
+                    subprocess.run([sys.executable, *argumentos], env=entorno, check=True,
+                                   stdout=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                resultado = {'arranque': nombre, 'filas_obras': filas,
+                             'ms_mediana': round(statistics.median(tiempos), 1),
+                             'ms_minimo': round(min(tiempos), 1)}
+                print(json.dumps(resultado))
+                resultados.append(resultado)
+    return resultados
+
+
+def benchmark_historial(veces, rondas=20, repeticiones=5):
+    """Costo de registrar el historial al cargar y consultas sobre él: `rondas`
+    lotes de transiciones (avance y mano de obra de una cuarta parte de las obras
+    abiertas, y finalizar algunas), y después la curva de avance, los cambios de
+    etapa y estado_al a distintas alturas, con las fotos y rehaciendo todo el historial."""
+    from modelo_orm import (sqlite_db, Obra, Etapa, Evento_obra, Foto_historial, Estado_foto,
+                            ETAPAS_CERRADAS)
+
+    azar = random.Random(0)
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), veces)
+        segundos_carga = {}
+        for variante in ('sin_historial', 'con_historial'):
+            ControlObra = preparar_base(os.path.join(carpeta, f'{variante}.db'))
+            if variante == 'sin_historial':
+                for trigger in ('obras_historial_insert', 'obras_historial_update'):
+                    sqlite_db.execute_sql(f'DROP TRIGGER {trigger}')
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                filas = ControlObra.cargar_csv_por_bloques(ruta_csv)
+            segundos_carga[variante] = round(time.perf_counter() - inicio, 3)
+            if variante == 'sin_historial':
+                sqlite_db.close()
+        eventos_carga = Evento_obra.select().count()
+
+        abiertas = [id_ for id_, in Obra.select(Obra.Id_Obra).join(Etapa)
+                    .where(Etapa.Desc_etapa.not_in(ETAPAS_CERRADAS)).tuples()]
+        instantes = []
+        inicio = time.perf_counter()
+        for ronda in range(rondas):
+            elegidas = azar.sample(abiertas, len(abiertas) // 4)
+            registros = [{'obra': id_, 'transicion': 'actualizar_porcentaje_avance',
+                          'porcentaje': min(100, 5 * (ronda + 1))} for id_ in elegidas]
+            registros += [{'obra': id_, 'transicion': 'incrementar_mano_obra',
+                           'mano_obra': azar.randint(1, 200)} for id_ in elegidas[::2]]
+            finalizadas = elegidas[::50]
+            registros += [{'obra': id_, 'transicion': 'finalizar_obra'} for id_ in finalizadas]
+            Obra.aplicar_transiciones(registros)
+            abiertas = sorted(set(abiertas) - set(finalizadas))
+            instantes.append(datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None))
+            time.sleep(0.002)
+        segundos_transiciones = time.perf_counter() - inicio
+
+        muestra = azar.sample(abiertas, min(200, len(abiertas)))
+        alturas = {'25%': instantes[rondas // 4], '50%': instantes[rondas // 2], 'final': instantes[-1]}
+        resultado = {
+            'filas_obras': filas,
+            's_carga_sin_historial': segundos_carga['sin_historial'],
+            's_carga_con_historial': segundos_carga['con_historial'],
+            'eventos_carga': eventos_carga,
+            'eventos': Evento_obra.select().count(),
+            'fotos': Foto_historial.select().count(),
+            's_transiciones': round(segundos_transiciones, 3),
+            'ms_200_curvas_avance': cronometrar(lambda: [Obra.curva_avance(id_) for id_ in muestra], repeticiones),
+            'ms_cambios_de_etapa': cronometrar(
+                lambda: Obra.cambios_de_etapa(instantes[0], instantes[-1]), repeticiones),
+        }
+        for nombre, instante in alturas.items():
+            resultado[f'ms_estado_al_{nombre}'] = cronometrar(lambda: Obra.estado_al(instante), repeticiones)
+        Estado_foto.delete().execute()
+        Foto_historial.delete().execute()
+        for nombre, instante in alturas.items():
+            resultado[f'ms_estado_al_{nombre}_sin_fotos'] = cronometrar(
+                lambda: Obra.estado_al(instante), repeticiones)
+        print(json.dumps(resultado))
+        sqlite_db.close()
+    return resultado
+
+
+FORMAS_EMPRESAS = ('S.A.', 'SA', 'S.A', 'S.R.L.', 'SRL', '')
+
+
+def cuit_al_azar(azar):
+    """Un CUIT de persona jurídica con dígito verificador válido, sin guiones."""
+    from empresas import PESOS_CUIT
+
+    while True:
+        digitos = '30' + ''.join(str(azar.randint(0, 9)) for _ in range(8))
+        verificador = 11 - sum(int(d) * peso for d, peso in zip(digitos, PESOS_CUIT)) % 11
+        if verificador != 10:
+            return digitos + str(verificador % 11)
+
+
+def variante_empresa(nombre, azar):
+    """Otra forma de escribir la misma empresa: mayúsculas, otra forma societaria
+    o un error de tipeo en una palabra."""
+    palabras = nombre.split()
+    cambio = azar.random()
+    if cambio < 0.35:
+        palabras = [palabra.upper() for palabra in palabras]
+    elif cambio < 0.7:
+        largas = [i for i, palabra in enumerate(palabras) if len(palabra) >= 5]
+        if largas:
+            i = azar.choice(largas)
+            letras = list(palabras[i])
+            j = azar.randrange(1, len(letras) - 1)
+            if azar.random() < 0.5:
+                del letras[j]
+            else:
+                letras[j], letras[j + 1] = letras[j + 1], letras[j]
+            palabras[i] = ''.join(letras)
+    forma = azar.choice(FORMAS_EMPRESAS)
+    return ' '.join(palabras + ([forma] if forma else []))
+
+
+def generar_empresas_repetidas(cantidad, azar, proporcion_repetidas=0.3):
+    """[(nombre, cuit, entidad)]: `cantidad` filas de Empresas_licitadoras donde
+    cerca de `proporcion_repetidas` son otra forma de escribir una empresa anterior
+    (la misma `entidad`), con su CUIT o con el comodín 00-00000000-0."""
+    entidades = generar_empresas(int(cantidad * (1 - proporcion_repetidas)), azar)
+    cuits = [cuit_al_azar(azar) for _ in entidades]
+    filas = {}
+    for entidad, nombre in enumerate(entidades):
+        filas.setdefault(f'{nombre} {azar.choice(FORMAS_EMPRESAS)}'.strip(), (cuits[entidad], entidad))
+    while len(filas) < cantidad:
+        entidad = azar.randrange(len(entidades))
+        nombre = variante_empresa(entidades[entidad], azar)
+        filas.setdefault(nombre, ('00-00000000-0' if azar.random() < 0.4 else cuits[entidad], entidad))
+    return [(nombre, cuit, entidad) for nombre, (cuit, entidad) in filas.items()]
+
+
+def pares_en_comun(grupos_a, grupos_b):
+    """Pares de elementos que están juntos en un grupo de `grupos_a` y en uno de `grupos_b`
+    (cada uno {elemento: grupo})."""
+    celdas = collections.Counter((grupo, grupos_b[elemento]) for elemento, grupo in grupos_a.items())
+    return sum(n * (n - 1) // 2 for n in celdas.values())
+
+
+def benchmark_empresas(cantidades, repeticiones=1):
+    """Resolución de entidades de empresas sobre nombres sintéticos con repetidas
+    conocidas: tiempo, pares puntuados contra todos los pares, precisión y
+    cobertura (por pares), y la fusión en la base con una obra por empresa."""
+    from peewee import chunked
+    from modelo_orm import sqlite_db, Empresa_licitadora, Obra
+    import empresas
+
+    resultados = []
+    for cantidad in cantidades:
+        filas = generar_empresas_repetidas(cantidad, random.Random(0))
+        with tempfile.TemporaryDirectory() as carpeta:
+            preparar_base(os.path.join(carpeta, 'obras.db'))
+            with sqlite_db.atomic():
+                for lote in chunked(filas, 500):
+                    Empresa_licitadora.insert_many([(nombre, cuit) for nombre, cuit, _ in lote],
+                                                   fields=[Empresa_licitadora.Empresa,
+                                                           Empresa_licitadora.cuit_contratista]).execute()
+                Obra.insert_from(
+                    Empresa_licitadora.select(Empresa_licitadora.Empresa, Empresa_licitadora.Id_Empresa_licitadora),
+                    [Obra.Nombre_obra, Obra.Empresa_licitadora]).execute()
+            filas_db = list(Empresa_licitadora.select(
+                Empresa_licitadora.Id_Empresa_licitadora, Empresa_licitadora.Empresa,
+                Empresa_licitadora.cuit_contratista).tuples())
+            entidad_por_nombre = {nombre: entidad for nombre, _, entidad in filas}
+            entidad_de = {id_: entidad_por_nombre[nombre] for id_, nombre, _ in filas_db}
+            inicio = time.perf_counter()
+            for _ in range(repeticiones):
+                grupos, estadisticas = empresas.resolver_empresas(filas_db)
+            segundos_resolver = (time.perf_counter() - inicio) / repeticiones
+
+            grupo_de = {id_: id_ for id_ in entidad_de}
+            for grupo in grupos:
+                for id_ in grupo.fusionadas:
+                    grupo_de[id_] = grupo.conservar
+            aciertos = pares_en_comun(grupo_de, entidad_de)
+            predichos = pares_en_comun(grupo_de, grupo_de)
+            verdaderos = pares_en_comun(entidad_de, entidad_de)
+
+            inicio = time.perf_counter()
+            fusionadas = empresas.fusionar_empresas(grupos)
+            segundos_fusion = time.perf_counter() - inicio
+            huerfanas = (Obra.select()
+                         .where(Obra.Empresa_licitadora.not_in(Empresa_licitadora.select(
+                             Empresa_licitadora.Id_Empresa_licitadora)))
+                         .count())
+            resultado = {
+                'empresas': len(filas), 'entidades': len(set(entidad_de.values())),
+                **estadisticas,
+                'pares_todos_contra_todos': len(filas) * (len(filas) - 1) // 2,
+                's_resolver': round(segundos_resolver, 3),
+                'us_por_empresa': round(segundos_resolver / len(filas) * 1e6, 1),
+                'precision': round(aciertos / predichos, 4) if predichos else None,
+                'cobertura': round(aciertos / verdaderos, 4) if verdaderos else None,
+                'fusionadas': fusionadas,
+                's_fusionar': round(segundos_fusion, 3),
+                'obras_sin_empresa': huerfanas,
+            }
+            print(json.dumps(resultado))
+            resultados.append(resultado)
+            sqlite_db.close()
+    return resultados
+
+
+def benchmark_instantaneas(veces, repeticiones=5):
+    """Volver a un estado conocido de la base: reconstruirla desde el CSV
+    (mapear_orm más cargar_datos fila a fila o la carga por bloques) vs. restaurar
+    una instantánea tomada con la API de backup o con VACUUM INTO; y trabajar
+    sobre una copia en memoria: abrirla, consultarla y guardarla de vuelta."""
+    from modelo_orm import sqlite_db, Obra
+
+    def indicadores():
+        with contextlib.redirect_stdout(io.StringIO()):
+            ControlObra.Obtener_indicadores(usar_cache=False)
+
+    def abrir_y_consultar(guardar=False):
+        with sqlite_db.copia_en_memoria(guardar=guardar):
+            Obra.select().count()
+
+    resultados = []
+    for n in veces:
+        with tempfile.TemporaryDirectory() as carpeta:
+            ruta_csv = replicar_csv(os.path.join(carpeta, 'obras.csv'), n)
+            segundos_reingesta = {}
+            for carga in ('fila_a_fila', 'bloques'):
+                inicio = time.perf_counter()
+                ControlObra = preparar_base(os.path.join(carpeta, f'{carga}.db'))
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if carga == 'bloques':
+                        filas = ControlObra.cargar_csv_por_bloques(ruta_csv)
+                    else:
+                        ControlObra.cargar_datos(ControlObra.extraer_datos(ruta_csv))
+                segundos_reingesta[carga] = round(time.perf_counter() - inicio, 3)
+                if carga == 'fila_a_fila':
+                    sqlite_db.close()
+
+            ruta_db = os.path.join(carpeta, 'bloques.db')
+            huella = huella_base(ruta_db, con_historial=True)
+            rutas = {metodo: os.path.join(carpeta, f'instantanea_{metodo}.db') for metodo in ('backup', 'vacuum')}
+            resultado = {
+                'filas_obras': filas,
+                's_reingesta_fila_a_fila': segundos_reingesta['fila_a_fila'],
+                's_reingesta_bloques': segundos_reingesta['bloques'],
+                'mb_base': round(sqlite_db.pragma('page_count') * sqlite_db.pragma('page_size') / 2**20, 1),
+            }
+            for metodo, ruta in rutas.items():
+                resultado[f'ms_instantanea_{metodo}'] = cronometrar(
+                    lambda: sqlite_db.tomar_instantanea(ruta, vacuum=metodo == 'vacuum'), repeticiones)
+                resultado[f'mb_instantanea_{metodo}'] = round(os.path.getsize(ruta) / 2**20, 1)
+            for metodo, ruta in rutas.items():
+                Obra.delete().where(Obra.Id_Obra % 2 == 0).execute()
+                resultado[f'ms_restaurar_{metodo}'] = cronometrar(
+                    lambda: sqlite_db.restaurar_instantanea(ruta), repeticiones)
+                resultado[f'restaurada_igual_{metodo}'] = huella_base(ruta_db, con_historial=True) == huella
+
+            resultado['ms_indicadores_archivo'] = cronometrar(indicadores, repeticiones)
+            resultado['ms_abrir_copia_en_memoria'] = cronometrar(abrir_y_consultar, repeticiones)
+            resultado['ms_abrir_y_guardar_copia'] = cronometrar(lambda: abrir_y_consultar(True), repeticiones)
+            with sqlite_db.copia_en_memoria(rutas['vacuum']):
+                resultado['ms_indicadores_memoria'] = cronometrar(indicadores, repeticiones)
+            print(json.dumps(resultado))
+            resultados.append(resultado)
+            sqlite_db.close()
+    return resultados
+
+
+def benchmark_ciudades(cantidades, filas=5000, repeticiones=20):
+    """Indicadores combinados de N ciudades sintéticas (una base cada una, con un
+    CSV de `filas` filas): en serie, en hilos (sin y con los indicadores de cada
+    ciudad reutilizados) y con ATTACH, contra los de una sola ciudad."""
+    from ciudades_obras import CiudadesObras, MAXIMO_ATTACH
+
+    def sin_cache(federacion, **kwargs):
+        federacion._parciales.clear()
+        return federacion.indicadores(**kwargs)
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        ciudades = CiudadesObras(os.path.join(carpeta, 'ciudades'))
+        en_serie = CiudadesObras(ciudades.carpeta, trabajadores=1)
+        segundos_carga = []
+        for numero in range(max(cantidades)):
+            ruta_csv = generar_csv_sintetico(os.path.join(carpeta, 'ciudad.csv'), filas, semilla=numero)
+            inicio = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                ciudades.cargar_csv(f'ciudad_{numero:03d}', ruta_csv)
+            segundos_carga.append(time.perf_counter() - inicio)
+
+        nombres = ciudades.ciudades()
+        una = cronometrar(lambda: sin_cache(ciudades, ciudades=nombres[:1], modo='hilos'), repeticiones)
+        for cantidad in cantidades:
+            elegidas = nombres[:cantidad]
+            resultado = {
+                'ciudades': cantidad, 'filas_por_ciudad': filas,
+                's_carga_por_ciudad': round(statistics.median(segundos_carga), 3),
+                'ms_una_ciudad': una,
+                'ms_serie': cronometrar(lambda: sin_cache(en_serie, ciudades=elegidas, modo='hilos'), repeticiones),
+                'ms_hilos': cronometrar(lambda: sin_cache(ciudades, ciudades=elegidas, modo='hilos'), repeticiones),
+                'ms_hilos_reutilizando': cronometrar(
+                    lambda: ciudades.indicadores(elegidas, modo='hilos'), repeticiones),
+                'ms_attach': (cronometrar(lambda: ciudades.indicadores(elegidas, modo='attach'), repeticiones)
+                              if cantidad <= MAXIMO_ATTACH else None),
+                'hilos_igual_attach': (ciudades.indicadores(elegidas, modo='hilos')
+                                       == ciudades.indicadores(elegidas, modo='attach')
+                                       if cantidad <= MAXIMO_ATTACH else None),
+                'cpus': os.cpu_count(),
+            }
+            print(json.dumps(resultado))
+            resultados.append(resultado)
+        ciudades.cerrar()
+        en_serie.cerrar()
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    streaming = sub.add_parser('streaming', help='memoria y velocidad de carga vs. tamaño del CSV')
+    streaming.add_argument('--veces', type=int, nargs='+', default=[1, 10, 50])
+    streaming.add_argument('--bloque', type=int, default=5000)
+
+    indices = sub.add_parser('indices', help='EXPLAIN QUERY PLAN y tiempos sin/con los índices del esquema')
+    indices.add_argument('--veces', type=int, default=20)
+    indices.add_argument('--repeticiones', type=int, default=50)
+
+    espacial = sub.add_parser('espacial', help='consultas por radio, rectángulo y k más cercanas')
+    espacial.add_argument('--veces', type=int, default=20)
+    espacial.add_argument('--repeticiones', type=int, default=200)
+
+    texto = sub.add_parser('texto', help='búsqueda con LIKE vs. índice FTS5')
+    texto.add_argument('--veces', type=int, nargs='+', default=[1, 100, 760])
+    texto.add_argument('--repeticiones', type=int, default=5)
+
+    paralelo = sub.add_parser('paralelo', help='carga serie vs. normalización en varios procesos')
+    paralelo.add_argument('--veces', type=int, default=20)
+    paralelo.add_argument('--procesos', type=int, nargs='+', default=[1, 2, 4])
+    paralelo.add_argument('--bloque', type=int, default=20_000)
+
+    transiciones = sub.add_parser('transiciones', help='save() por obra vs. API de transiciones en lote')
+    transiciones.add_argument('--veces', type=int, default=20)
+    transiciones.add_argument('--cantidad', type=int, default=5000)
+
+    sugerencias = sub.add_parser('sugerencias', help='listar la tabla vs. sugerencias del prompt de empresas')
+    sugerencias.add_argument('--cantidad', type=int, nargs='+', default=[500, 5000, 50000])
+    sugerencias.add_argument('--repeticiones', type=int, default=200)
+
+    columnar = sub.add_parser('columnar', help='indicadores desde SQLite vs. Parquet / Arrow IPC')
+    columnar.add_argument('--veces', type=int, nargs='+', default=[1, 10, 40])
+    columnar.add_argument('--repeticiones', type=int, default=5)
+
+    escaneo = sub.add_parser('escaneo', help='memoria y velocidad de Obra.select() vs. recorridos compactos')
+    escaneo.add_argument('--veces', type=int, nargs='+', default=[1, 10, 40])
+    escaneo.add_argument('--repeticiones', type=int, default=3)
+
+    suite = sub.add_parser('suite', help='CSV sintéticos: parseo, normalización, carga e indicadores')
+    suite.add_argument('--filas', type=int, nargs='+', default=list(TAMANIOS_SUITE))
+    suite.add_argument('--carga', choices=CARGAS_SUITE, default='masivo')
+    suite.add_argument('--semilla', type=int, default=0)
+    suite.add_argument('--salida', help='archivo JSON con las mediciones y el entorno')
+
+    comparacion = sub.add_parser('comparar', help='diferencias entre dos salidas de suite')
+    comparacion.add_argument('base')
+    comparacion.add_argument('nueva')
+    comparacion.add_argument('--umbral', type=float, default=0.10)
+
+    medicion = sub.add_parser('instrumentacion', help='costo de la instrumentación y su reporte')
+    medicion.add_argument('--veces', type=int, default=20)
+    medicion.add_argument('--formato', choices=['json', 'prometheus'], default='json')
+    medicion.add_argument('--repeticiones', type=int, default=3)
+
+    pragmas = sub.add_parser('pragmas', help='carga y consultas con cada perfil de PRAGMAs y en memoria')
+    pragmas.add_argument('--veces', type=int, default=20)
+    pragmas.add_argument('--repeticiones', type=int, default=5)
+
+    servicio = sub.add_parser('servicio', help='latencia y pedidos por segundo del servicio de consultas')
+    servicio.add_argument('--veces', type=int, default=20)
+    servicio.add_argument('--clientes', type=int, nargs='+', default=[1, 8, 32])
+    servicio.add_argument('--segundos', type=float, default=5)
+    servicio.add_argument('--lectores', type=int, default=4)
+    servicio.add_argument('--ingesta', action='store_true', help='con otro proceso cargando obras a la vez')
+
+    listado = sub.add_parser('listado', help='página del listado de obras: OFFSET vs. keyset')
+    listado.add_argument('--veces', type=int, nargs='+', default=[40, 200])
+    listado.add_argument('--repeticiones', type=int, default=20)
+
+    arranque = sub.add_parser('arranque', help='arranque en frío de cada subcomando de cli_obras.py vs. main')
+    arranque.add_argument('--veces', type=int, nargs='+', default=[1, 10])
+    arranque.add_argument('--repeticiones', type=int, default=5)
+
+    historial = sub.add_parser('historial', help='historial de cambios: costo en la carga, curvas y estado_al')
+    historial.add_argument('--veces', type=int, default=40)
+    historial.add_argument('--rondas', type=int, default=20)
+    historial.add_argument('--repeticiones', type=int, default=5)
+
+    deduplicacion = sub.add_parser('empresas', help='resolución de entidades de empresas: tiempo, pares y aciertos')
+    deduplicacion.add_argument('--cantidad', type=int, nargs='+', default=[10_000, 50_000, 100_000])
+    deduplicacion.add_argument('--repeticiones', type=int, default=1)
+
+    instantaneas = sub.add_parser('instantaneas', help='reconstruir la base desde el CSV vs. instantáneas y copia en memoria')
+    instantaneas.add_argument('--veces', type=int, nargs='+', default=[1, 10, 40])
+    instantaneas.add_argument('--repeticiones', type=int, default=5)
+
+    multiciudad = sub.add_parser('ciudades', help='indicadores de N ciudades: en serie, en hilos y con ATTACH')
+    multiciudad.add_argument('--ciudades', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    multiciudad.add_argument('--filas', type=int, default=5000, help='filas del CSV de cada ciudad')
+    multiciudad.add_argument('--repeticiones', type=int, default=20)
+
+    # Subcomandos internos usados para aislar cada medición en su propio proceso
+    medir = sub.add_parser('_medir_carga')
+    medir.add_argument('ruta_csv')
+    medir.add_argument('ruta_db')
+    medir.add_argument('modo', choices=['bloques', 'completo'])
+    medir.add_argument('bloque', type=int)
+    fases = sub.add_parser('_fases')
+    fases.add_argument('ruta_csv')
+    fases.add_argument('ruta_db')
+    fases.add_argument('carga', choices=CARGAS_SUITE)
+
+    args = parser.parse_args(argv)
+    if args.comando == 'streaming':
+        benchmark_streaming(args.veces, args.bloque)
+    elif args.comando == 'indices':
+        benchmark_indices(args.veces, args.repeticiones)
+    elif args.comando == 'espacial':
+        benchmark_espacial(args.veces, args.repeticiones)
+    elif args.comando == 'texto':
+        benchmark_texto(args.veces, args.repeticiones)
+    elif args.comando == 'paralelo':
+        benchmark_paralelo(args.veces, args.procesos, args.bloque)
+    elif args.comando == 'transiciones':
+        benchmark_transiciones(args.veces, args.cantidad)
+    elif args.comando == 'sugerencias':
+        benchmark_sugerencias(args.cantidad, args.repeticiones)
+    elif args.comando == 'columnar':
+        benchmark_columnar(args.veces, args.repeticiones)
+    elif args.comando == 'escaneo':
+        benchmark_escaneo(args.veces, args.repeticiones)
+    elif args.comando == 'suite':
+        benchmark_suite(args.filas, args.carga, args.salida, args.semilla)
+    elif args.comando == 'comparar':
+        # Código de salida distinto de cero si hubo regresiones, para usarlo en scripts
+        return 1 if comparar(args.base, args.nueva, args.umbral) else 0
+    elif args.comando == 'instrumentacion':
+        benchmark_instrumentacion(args.veces, args.formato, args.repeticiones)
+    elif args.comando == 'pragmas':
+        benchmark_pragmas(args.veces, args.repeticiones)
+    elif args.comando == 'servicio':
+        benchmark_servicio(args.veces, args.clientes, args.segundos, args.lectores, args.ingesta)
+    elif args.comando == 'listado':
+        benchmark_listado(args.veces, args.repeticiones)
+    elif args.comando == 'arranque':
+        benchmark_arranque(args.veces, args.repeticiones)
+    elif args.comando == 'historial':
+        benchmark_historial(args.veces, args.rondas, args.repeticiones)
+    elif args.comando == 'empresas':
+        benchmark_empresas(args.cantidad, args.repeticiones)
+    elif args.comando == 'instantaneas':
+        benchmark_instantaneas(args.veces, args.repeticiones)
+    elif args.comando == 'ciudades':
+        benchmark_ciudades(args.ciudades, args.filas, args.repeticiones)
+    elif args.comando == '_medir_carga':
+        print(json.dumps(medir_carga(args.ruta_csv, args.ruta_db, args.modo, args.bloque)))
+    elif args.comando == '_fases':
+        print(json.dumps(correr_fases(args.ruta_csv, args.ruta_db, args.carga)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+"""Varias ciudades con el mismo esquema, una base SQLite por ciudad.
+
+Cada ciudad es un archivo <carpeta>/<ciudad>.db (la carpeta, por defecto, es
+OBRAS_CIUDADES o ciudades/ al lado de este archivo): la carga de una no espera
+a la de otra (SQLite admite un solo escritor por archivo) y se pueden cargar
+en paralelo desde procesos distintos.
+
+    ciudades = CiudadesObras('ciudades')
+    with ciudades.usar('rosario'):
+        ControlObra.mapear_orm()
+        ControlObra.sincronizar_csv_por_bloques('rosario.csv')
+    indicadores = ciudades.indicadores()
+
+Los indicadores de todas las ciudades se arman con la misma consulta de
+ControlObra.indicadores corrida en cada base, en hilos con una conexión de
+solo lectura por ciudad (sqlite3 suelta el GIL mientras ejecuta); los de cada
+ciudad se reutilizan mientras su base no cambie (PRAGMA data_version) y al
+final se combinan. Con modo='attach' se hace en una sola consulta sobre una
+conexión con hasta 10 bases adjuntas: cuesta lo mismo que los hilos sin
+reutilizar nada, y sirve donde no se quieren hilos ni una conexión por ciudad.
+"""
+import concurrent.futures
+import contextlib
+import os
+import pathlib
+import re
+import threading
+
+from conexion import PRAGMAS_DE_CONEXION, abrir_sqlite, pragmas_de
+from gestionar_obras import ControlObra
+from modelo_orm import sqlite_db
+
+CARPETA_PREDETERMINADA = os.environ.get(
+    'OBRAS_CIUDADES', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ciudades'))
+EXTENSION = '.db'
+# SQLite admite hasta 10 bases adjuntas por conexión (SQLITE_MAX_ATTACHED)
+MAXIMO_ATTACH = 10
+MODOS = ('hilos', 'attach')
+
+_NOMBRE_CIUDAD = re.compile(r'^[\w-]+$')
+# Tablas de la consulta de indicadores, para calificarlas con el esquema adjunto
+_TABLA_SQL = re.compile(r'\b(FROM|JOIN) "(\w+)"')
+
+
+def _conexion_lectura(ruta, **opciones):
+    """Conexión sqlite3 de solo lectura con los PRAGMAs de conexión del perfil 'consulta'."""
+    conexion = abrir_sqlite(ruta, **opciones)
+    pragmas = {pragma: valor for pragma, valor in pragmas_de('consulta').items() if pragma in PRAGMAS_DE_CONEXION}
+    for pragma, valor in {**pragmas, 'query_only': 1}.items():
+        conexion.execute(f'PRAGMA {pragma} = {valor}')
+    return conexion
+
+
+def _sumar(filas, clave, campos):
+    """Suma `campos` de las filas que comparten `clave` (la descripción: los ids son de cada ciudad)."""
+    sumadas = {}
+    for fila in filas:
+        actual = sumadas.setdefault(fila[clave], {clave: fila[clave], **{campo: 0 for campo in campos}})
+        for campo in campos:
+            actual[campo] += fila[campo] or 0
+    return sorted(sumadas.values(), key=lambda fila: fila[clave])
+
+
+def _numerar(filas):
+    return [{'id': numero, **fila} for numero, fila in enumerate(filas, 1)]
+
+
+def combinar_indicadores(por_ciudad):
+    """Un solo juego de indicadores a partir de los de cada ciudad ({ciudad: indicadores}).
+
+    Cuentas y montos se suman por descripción. Los ids de áreas, tipos y
+    etapas son de cada base, así que en el resultado numeran las descripciones
+    en orden alfabético; los barrios quedan con el id y la comuna de su ciudad."""
+    def todas(clave):
+        return [fila for indicadores in por_ciudad.values() for fila in indicadores[clave]]
+
+    return {
+        'areas_responsables': _numerar(_sumar(todas('areas_responsables'), 'area', ())),
+        'tipos_obra': _numerar(_sumar(todas('tipos_obra'), 'tipo', ())),
+        'obras_por_etapa': _numerar(_sumar(todas('obras_por_etapa'), 'etapa', ('cantidad_obras',))),
+        'obras_y_monto_por_tipo': _numerar(_sumar(
+            todas('obras_y_monto_por_tipo'), 'tipo', ('cantidad_obras', 'monto_por_tipo'))),
+        'barrios_comunas_123': [{**barrio, 'ciudad': ciudad}
+                                for ciudad, indicadores in sorted(por_ciudad.items())
+                                for barrio in indicadores['barrios_comunas_123']],
+        'obras_finalizadas_en_24_meses': sum(
+            indicadores['obras_finalizadas_en_24_meses'] or 0 for indicadores in por_ciudad.values()),
+        'monto_total_inversion': sum(
+            indicadores['monto_total_inversion'] or 0 for indicadores in por_ciudad.values()),
+        'por_ciudad': {
+            ciudad: {'cantidad_obras': sum(fila['cantidad_obras'] for fila in indicadores['obras_por_etapa']),
+                     'monto_total_inversion': indicadores['monto_total_inversion']}
+            for ciudad, indicadores in sorted(por_ciudad.items())
+        },
+    }
+
+
+class CiudadesObras:
+    def __init__(self, carpeta=None, perfil=None, trabajadores=None):
+        self.carpeta = carpeta or CARPETA_PREDETERMINADA
+        self.perfil = perfil
+        self.trabajadores = trabajadores
+        self._lock = threading.Lock()
+        self._conexiones = {}
+        self._parciales = {}
+        self._ejecutor = None
+        self._adjuntas = None
+        self._sql = None
+
+    def ruta(self, ciudad):
+        if not _NOMBRE_CIUDAD.match(ciudad):
+            raise ValueError(f"Nombre de ciudad inválido: {ciudad!r} (letras, números, '_' o '-')")
+        return os.path.join(self.carpeta, ciudad + EXTENSION)
+
+    def ciudades(self):
+        if not os.path.isdir(self.carpeta):
+            return []
+        return sorted(nombre[:-len(EXTENSION)] for nombre in os.listdir(self.carpeta)
+                      if nombre.endswith(EXTENSION) and _NOMBRE_CIUDAD.match(nombre[:-len(EXTENSION)]))
+
+    @contextlib.contextmanager
+    def usar(self, ciudad):
+        """Apunta los modelos (y ControlObra) a la base de `ciudad` mientras dure el bloque;
+        la crea si no existe. Para cargar o modificar una ciudad; no es para varios hilos."""
+        os.makedirs(self.carpeta, exist_ok=True)
+        with sqlite_db.otra_base(self.ruta(ciudad), self.perfil):
+            yield sqlite_db
+
+    def cargar_csv(self, ciudad, ruta_csv, tamanio_bloque=50_000, marcar_ausentes=False):
+        """Crea o migra la base de `ciudad` y la sincroniza con `ruta_csv` por bloques."""
+        with self.usar(ciudad):
+            ControlObra.mapear_orm()
+            return ControlObra.sincronizar_csv_por_bloques(ruta_csv, tamanio_bloque, marcar_ausentes)
+
+    def _sql_indicadores(self):
+        if self._sql is None:
+            self._sql = ControlObra.consulta_indicadores().sql()
+        return self._sql
+
+    def _conexion(self, ciudad):
+        # Una conexión por ciudad, abierta la primera vez; la usa un hilo por vez
+        with self._lock:
+            if ciudad not in self._conexiones:
+                self._conexiones[ciudad] = _conexion_lectura(self.ruta(ciudad), check_same_thread=False)
+            return self._conexiones[ciudad]
+
+    def _indicadores_ciudad(self, ciudad):
+        conexion = self._conexion(ciudad)
+        version = conexion.execute('PRAGMA data_version').fetchone()[0]
+        parcial = self._parciales.get(ciudad)
+        if parcial and parcial[0] == version:
+            return parcial[1]
+        sql, parametros = self._sql_indicadores()
+        indicadores = ControlObra.armar_indicadores(conexion.execute(sql, parametros))
+        self._parciales[ciudad] = (version, indicadores)
+        return indicadores
+
+    def _por_hilos(self, ciudades):
+        if self._ejecutor is None:
+            self._ejecutor = concurrent.futures.ThreadPoolExecutor(
+                self.trabajadores, thread_name_prefix='ciudad')
+        return dict(zip(ciudades, self._ejecutor.map(self._indicadores_ciudad, ciudades)))
+
+    def _por_attach(self, ciudades):
+        """Una sola consulta UNION ALL sobre una conexión con las bases adjuntas. La
+        conexión se guarda mientras se pidan las mismas ciudades."""
+        clave = tuple(ciudades)
+        with self._lock:
+            if self._adjuntas is None or self._adjuntas[0] != clave:
+                if self._adjuntas is not None:
+                    self._adjuntas[1].close()
+                sql, parametros = self._sql_indicadores()
+                conexion = _conexion_lectura('file::memory:', check_same_thread=False)
+                consultas, todos = [], []
+                for numero, ciudad in enumerate(ciudades):
+                    uri = pathlib.Path(self.ruta(ciudad)).absolute().as_uri() + '?mode=ro'
+                    conexion.execute(f'ATTACH DATABASE ? AS c{numero}', (uri,))
+                    adjunta = _TABLA_SQL.sub(rf'\1 c{numero}."\2"', sql)
+                    consultas.append(f'SELECT ? AS ciudad, * FROM ({adjunta})')
+                    todos += [ciudad, *parametros]
+                self._adjuntas = (clave, conexion, ' UNION ALL '.join(consultas), todos)
+            _, conexion, sql, parametros = self._adjuntas
+            filas = {ciudad: [] for ciudad in ciudades}
+            for ciudad, *fila in conexion.execute(sql, parametros):
+                filas[ciudad].append(fila)
+        return {ciudad: ControlObra.armar_indicadores(filas[ciudad]) for ciudad in ciudades}
+
+    def indicadores(self, ciudades=None, modo='hilos'):
+        """Los indicadores combinados de `ciudades` (por defecto todas), ver combinar_indicadores."""
+        ciudades = list(ciudades or self.ciudades())
+        if not ciudades:
+            raise ValueError(f'No hay ciudades en {self.carpeta}')
+        if modo not in MODOS:
+            raise ValueError(f"Modo desconocido: {modo!r} (opciones: {', '.join(MODOS)})")
+        if modo == 'attach':
+            if len(ciudades) > MAXIMO_ATTACH:
+                raise ValueError(f'Con ATTACH se pueden consultar hasta {MAXIMO_ATTACH} ciudades')
+            por_ciudad = self._por_attach(ciudades)
+        else:
+            por_ciudad = self._por_hilos(ciudades)
+        return combinar_indicadores(por_ciudad)
+
+    def cerrar(self):
+        if self._ejecutor is not None:
+            self._ejecutor.shutdown()
+            self._ejecutor = None
+        with self._lock:
+            for conexion in self._conexiones.values():
+                conexion.close()
+            if self._adjuntas is not None:
+                self._adjuntas[1].close()
+                self._adjuntas = None
+            self._conexiones.clear()
+            self._parciales.clear()
@@ -0,0 +1,225 @@
+"""Línea de comandos para la base de obras, sin los pasos interactivos de
+ControlObra.main ni la recarga del CSV en cada arranque.
+
+    python cli_obras.py init                              crea o migra las tablas
+    python cli_obras.py ingest obras.csv [--modo bloques] sincroniza la base con el CSV
+    python cli_obras.py indicators [--json]               los de ControlObra.Obtener_indicadores
+    python cli_obras.py search escuela [--limite 10]      búsqueda de texto (FTS5)
+    python cli_obras.py new                               alta interactiva de una obra
+    python cli_obras.py dedup [--simular]                 fusiona empresas licitadoras repetidas
+    python cli_obras.py snapshot cargada.db [--vacuum]    copia la base a un archivo (instantánea)
+    python cli_obras.py restore cargada.db                vuelve la base al estado de una instantánea
+
+Todos aceptan --db y --perfil antes del subcomando (ver conexion.py), o
+--ciudad para usar la base de esa ciudad (ver ciudades_obras.py); con
+indicators --todas se combinan los de todas las ciudades. Cada
+subcomando importa solo lo que usa: pandas se carga recién al leer el CSV en
+ingest, así que indicators y search no pagan su importación.
+"""
+import argparse
+import json
+import os
+import time
+
+MODOS_INGESTA = ('sincronizar', 'bloques', 'paralelo')
+
+
+def _conectar(ruta_db):
+    """Abre la conexión sin mensajes y verifica que la base ya tenga las tablas."""
+    from modelo_orm import sqlite_db, Obra
+
+    sqlite_db.connect()
+    if not sqlite_db.table_exists(Obra._meta.table_name):
+        sqlite_db.close()
+        raise SystemExit(f"La base {ruta_db or 'predeterminada'} no tiene las tablas; correr antes 'init'.")
+
+
+def _json(datos):
+    return json.dumps(datos, ensure_ascii=False, indent=2, default=str)
+
+
+def init(args):
+    from gestionar_obras import ControlObra
+
+    ControlObra.conectar_db()
+    ControlObra.mapear_orm()
+
+
+def ingest(args):
+    from gestionar_obras import ControlObra
+
+    ControlObra.conectar_db()
+    ControlObra.mapear_orm()
+    if args.modo == 'sincronizar':
+        totales = ControlObra.sincronizar_datos(ControlObra.extraer_datos(args.csv), args.marcar_ausentes)
+        if totales is None:
+            raise SystemExit(1)
+    elif args.modo == 'bloques':
+        totales = ControlObra.sincronizar_csv_por_bloques(args.csv, args.bloque, args.marcar_ausentes)
+        if totales is None:
+            raise SystemExit(1)
+    elif ControlObra.cargar_csv_en_paralelo(args.csv, args.trabajadores) is None:
+        raise SystemExit(1)
+
+
+def indicators(args):
+    from gestionar_obras import ControlObra
+
+    if args.todas:
+        from ciudades_obras import CiudadesObras
+
+        ciudades = CiudadesObras(args.ciudades)
+        try:
+            indicadores = ciudades.indicadores()
+        except ValueError as error:
+            raise SystemExit(str(error))
+        finally:
+            ciudades.cerrar()
+    else:
+        _conectar(args.db)
+        indicadores = ControlObra.indicadores()
+    if args.json:
+        print(_json(indicadores))
+    else:
+        ControlObra.mostrar_indicadores(indicadores)
+
+
+def search(args):
+    from modelo_orm import Obra
+
+    _conectar(args.db)
+    obras = Obra.buscar(args.texto, args.limite)
+    if args.json:
+        print(_json([{'Id_Obra': obra.Id_Obra, 'Nombre_obra': obra.Nombre_obra, 'Direccion': obra.Direccion,
+                      'fragmento': obra.fragmento, 'relevancia': obra.relevancia} for obra in obras]))
+        return
+    for obra in obras:
+        print(f"- {obra.Id_Obra} | {obra.Nombre_obra} | {obra.Direccion or ''}")
+    if not obras:
+        print(f"\U0001F50D No hay obras que coincidan con {args.texto!r}.")
+
+
+def new(args):
+    from gestionar_obras import ControlObra
+
+    _conectar(args.db)
+    ControlObra.nueva_obra()
+
+
+def dedup(args):
+    from modelo_orm import Empresa_licitadora
+    from empresas import deduplicar_empresas
+
+    _conectar(args.db)
+    resultado = deduplicar_empresas(aplicar=not args.simular)
+    if args.json:
+        print(_json({**resultado, 'grupos': [grupo._asdict() for grupo in resultado['grupos']]}))
+        return
+    grupos = resultado['grupos']
+    ids = [id_ for grupo in grupos for id_ in (grupo.conservar, *grupo.fusionadas)]
+    if args.simular:
+        nombres = dict(Empresa_licitadora
+                       .select(Empresa_licitadora.Id_Empresa_licitadora, Empresa_licitadora.Empresa)
+                       .where(Empresa_licitadora.Id_Empresa_licitadora.in_(ids))
+                       .tuples())
+        for grupo in grupos:
+            print(f"- {grupo.conservar} | {nombres[grupo.conservar]} | {grupo.cuit or 'sin CUIT'}")
+            for id_ in grupo.fusionadas:
+                print(f"    {id_} | {nombres[id_]}")
+    print(f"\U0001F3E2 {resultado['empresas']} empresas, {len(grupos)} grupos de repetidas "
+          f"({resultado['pares_puntuados']} pares comparados en {resultado['bloques']} bloques).")
+    if args.simular:
+        print(f"\U0001F50D Se fusionarían {len(ids) - len(grupos)} empresas (sin cambios en la base).")
+    else:
+        print(f"\u2705 Se fusionaron {resultado['fusionadas']} empresas.")
+
+
+def snapshot(args):
+    from modelo_orm import sqlite_db
+
+    _conectar(args.db)
+    inicio = time.perf_counter()
+    tamanio = sqlite_db.tomar_instantanea(args.destino, args.vacuum)
+    print(f"\U0001F4F8 Instantánea en {args.destino}: {tamanio / 2**20:.1f} MB "
+          f"en {time.perf_counter() - inicio:.2f} s.")
+
+
+def restore(args):
+    from modelo_orm import sqlite_db
+
+    sqlite_db.connect()
+    inicio = time.perf_counter()
+    try:
+        sqlite_db.restaurar_instantanea(args.origen)
+    except FileNotFoundError:
+        raise SystemExit(f"No existe la instantánea {args.origen}.")
+    print(f"\u2705 Base restaurada desde {args.origen} en {time.perf_counter() - inicio:.2f} s.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help='archivo de la base (por defecto OBRAS_DB)')
+    parser.add_argument('--perfil', help='perfil de PRAGMAs (por defecto OBRAS_DB_PERFIL)')
+    parser.add_argument('--ciudad', help='usar la base de esta ciudad en lugar de --db')
+    parser.add_argument('--ciudades', help='carpeta con una base por ciudad (por defecto OBRAS_CIUDADES)')
+    subcomandos = parser.add_subparsers(dest='subcomando', required=True)
+
+    subcomandos.add_parser('init', help='crea las tablas o aplica las migraciones pendientes')
+
+    p_ingest = subcomandos.add_parser('ingest', help='carga o sincroniza la base con un CSV')
+    p_ingest.add_argument('csv')
+    p_ingest.add_argument('--modo', choices=MODOS_INGESTA, default='sincronizar',
+                          help='sincronizar: todo el CSV en memoria; bloques: sincroniza de a '
+                               '--bloque filas; paralelo: normaliza en varios procesos (como sincronizar, '
+                               'sin marcar ausentes)')
+    p_ingest.add_argument('--bloque', type=int, default=50_000, help='filas por bloque (modo bloques)')
+    p_ingest.add_argument('--trabajadores', type=int, help='procesos (modo paralelo)')
+    p_ingest.add_argument('--marcar-ausentes', action='store_true',
+                          help='marca con Baja_origen las obras que ya no están en el CSV')
+
+    p_indicadores = subcomandos.add_parser('indicators', help='muestra los indicadores')
+    p_indicadores.add_argument('--json', action='store_true')
+    p_indicadores.add_argument('--todas', action='store_true', help='combina los de todas las ciudades')
+
+    p_buscar = subcomandos.add_parser('search', help='busca obras por nombre, descripción o dirección')
+    p_buscar.add_argument('texto')
+    p_buscar.add_argument('--limite', type=int, default=20)
+    p_buscar.add_argument('--json', action='store_true')
+
+    subcomandos.add_parser('new', help='da de alta una obra pidiendo los datos por consola')
+
+    p_dedup = subcomandos.add_parser('dedup', help='fusiona las empresas licitadoras repetidas (CUIT y nombre)')
+    p_dedup.add_argument('--simular', action='store_true', help='muestra los grupos sin modificar la base')
+    p_dedup.add_argument('--json', action='store_true')
+
+    p_snapshot = subcomandos.add_parser('snapshot', help='copia la base a un archivo sin cortar otras conexiones')
+    p_snapshot.add_argument('destino')
+    p_snapshot.add_argument('--vacuum', action='store_true',
+                            help='VACUUM INTO (compacta, más lento) en lugar de la API de backup')
+
+    p_restore = subcomandos.add_parser('restore', help='reemplaza el contenido de la base por una instantánea')
+    p_restore.add_argument('origen')
+
+    args = parser.parse_args(argv)
+    if args.subcomando == 'ingest' and args.modo == 'paralelo' and args.marcar_ausentes:
+        parser.error('--marcar-ausentes no se puede usar con --modo paralelo')
+
+    if args.ciudad and args.db:
+        parser.error('--ciudad y --db no se pueden usar juntos')
+    if args.ciudad:
+        from ciudades_obras import CiudadesObras
+        ciudades = CiudadesObras(args.ciudades)
+        try:
+            args.db = ciudades.ruta(args.ciudad)
+        except ValueError as error:
+            parser.error(str(error))
+        os.makedirs(ciudades.carpeta, exist_ok=True)
+    if args.db or args.perfil:
+        from modelo_orm import sqlite_db
+        sqlite_db.configurar(args.db, args.perfil)
+    {'init': init, 'ingest': ingest, 'indicators': indicators, 'search': search, 'new': new,
+     'dedup': dedup, 'snapshot': snapshot, 'restore': restore}[args.subcomando](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+"""Exportación de las obras a archivos columnares (Parquet o Arrow IPC) e
+indicadores calculados directamente sobre esos archivos.
+
+Las obras se escriben desnormalizadas (cada obra con las descripciones de
+todas sus dimensiones) en un dataset particionado por Etapa y año de
+licitación; las dimensiones van aparte, una tabla por archivo:
+
+    destino/obras/Etapa=Finalizada/año_licitacion=2019/part-0.parquet
+    destino/dimensiones/Areas_Responsables.parquet
+
+pyarrow es opcional: solo lo necesita este módulo.
+"""
+import os
+import shutil
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from peewee import JOIN
+
+from modelo_orm import (
+    sqlite_db, Obra, Etapa, Entorno, Tipo_obra, Area_responsable, Comuna, Barrio,
+    Tipo_contratacion, Empresa_licitadora, Financiamiento
+)
+
+FORMATOS = ('parquet', 'ipc')
+EXTENSIONES = {'parquet': 'parquet', 'ipc': 'arrow'}
+PARTICIONES = (('Etapa', 'string'), ('año_licitacion', 'string'))
+DIMENSIONES = (Etapa, Entorno, Tipo_obra, Area_responsable, Comuna, Barrio,
+               Tipo_contratacion, Empresa_licitadora, Financiamiento)
+
+# (columna, expresión, tipo de Arrow) de la estrella: obra + descripciones de sus dimensiones
+COLUMNAS_ESTRELLA = (
+    ('Id_Obra', Obra.Id_Obra, 'int64'),
+    ('Nombre_obra', Obra.Nombre_obra, 'string'),
+    ('Id_Entorno', Obra.Entorno, 'int64'),
+    ('Entorno', Entorno.Desc_entorno, 'string'),
+    ('Id_Etapa', Obra.Etapa, 'int64'),
+    ('Etapa', Etapa.Desc_etapa, 'string'),
+    ('Id_Tipo_obra', Obra.Tipo_obra, 'int64'),
+    ('Tipo_obra', Tipo_obra.Desc_tipo, 'string'),
+    ('Id_Area_responsable', Obra.Area_responsable, 'int64'),
+    ('Area_responsable', Area_responsable.Area, 'string'),
+    ('Descripcion', Obra.Descripcion, 'string'),
+    ('Monto_contrato', Obra.Monto_contrato, 'float64'),
+    ('Id_barrio', Obra.Barrio, 'int64'),
+    ('Barrio', Barrio.Barrio, 'string'),
+    ('Id_Comuna', Barrio.Comuna, 'int64'),
+    ('Direccion', Obra.Direccion, 'string'),
+    ('Latitud', Obra.Latitud, 'float64'),
+    ('Longitud', Obra.Longitud, 'float64'),
+    ('Fecha_inicio', Obra.Fecha_inicio, 'date32'),
+    ('Fecha_fin_inicial', Obra.Fecha_fin_inicial, 'date32'),
+    ('Id_Financiamiento', Obra.Financiamiento, 'int64'),
+    ('Financiamiento', Financiamiento.Desc_financiamiento, 'string'),
+    ('Plazo', Obra.Plazo, 'float64'),
+    ('Porcentaje_avance', Obra.Porcentaje_avance, 'float64'),
+    ('Id_Empresa_licitadora', Obra.Empresa_licitadora, 'int64'),
+    ('Empresa_licitadora', Empresa_licitadora.Empresa, 'string'),
+    ('cuit_contratista', Empresa_licitadora.cuit_contratista, 'string'),
+    ('año_licitacion', Obra.año_licitacion, 'string'),
+    ('Id_Tipo_contratacion', Obra.Tipo_contratacion, 'int64'),
+    ('Tipo_contratacion', Tipo_contratacion.Desc_contrataciones, 'string'),
+    ('Nro_contratacion', Obra.Nro_contratacion, 'string'),
+    ('Mano_de_obra', Obra.Mano_de_obra, 'int64'),
+    ('Compromiso', Obra.Compromiso, 'string'),
+    ('Destacada', Obra.Destacada, 'string'),
+    ('ba_elige', Obra.ba_elige, 'string'),
+    ('Expediente', Obra.Expediente, 'string'),
+)
+
+
+def _requerir_pyarrow():
+    if pa is None:
+        raise ImportError("La exportación columnar necesita pyarrow (pip install pyarrow).")
+
+
+def _validar_formato(formato):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato!r} (opciones: {', '.join(FORMATOS)})")
+
+
+def esquema_estrella():
+    _requerir_pyarrow()
+    return pa.schema([(nombre, getattr(pa, tipo)()) for nombre, _, tipo in COLUMNAS_ESTRELLA])
+
+
+def _particionado():
+    return ds.partitioning(pa.schema([(nombre, getattr(pa, tipo)()) for nombre, tipo in PARTICIONES]),
+                           flavor='hive')
+
+
+def _ruta_dimension(carpeta, modelo, formato):
+    return os.path.join(carpeta, 'dimensiones', f'{modelo._meta.table_name}.{EXTENSIONES[formato]}')
+
+
+def _escribir_tabla(tabla, ruta, formato):
+    if formato == 'parquet':
+        pq.write_table(tabla, ruta)
+    else:
+        with pa.ipc.new_file(ruta, tabla.schema) as archivo:
+            archivo.write_table(tabla)
+
+
+def consulta_estrella():
+    """SELECT de Obras con un LEFT JOIN por dimensión, en el orden de COLUMNAS_ESTRELLA."""
+    consulta = Obra.select(*[expresion.alias(nombre) for nombre, expresion, _ in COLUMNAS_ESTRELLA])
+    for modelo in (Entorno, Etapa, Tipo_obra, Area_responsable, Barrio, Financiamiento,
+                   Empresa_licitadora, Tipo_contratacion):
+        consulta = consulta.join_from(Obra, modelo, JOIN.LEFT_OUTER)
+    return consulta.order_by(Obra.Id_Obra)
+
+
+def _lotes_estrella(esquema, tamanio_lote):
+    """RecordBatches de la estrella, armados columna por columna cada `tamanio_lote` filas."""
+    cursor = consulta_estrella().tuples().iterator()
+    while True:
+        filas = [fila for _, fila in zip(range(tamanio_lote), cursor)]
+        if not filas:
+            return
+        columnas = zip(*filas)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, esquema)],
+            schema=esquema)
+
+
+def exportar_columnar(destino, formato='parquet', tamanio_lote=50_000):
+    """Escribe la estrella de obras particionada por Etapa y año de licitación y
+    las tablas de dimensiones. Reemplaza una exportación anterior en `destino`.
+    Devuelve la cantidad de obras exportadas."""
+    _requerir_pyarrow()
+    _validar_formato(formato)
+    carpeta_obras = os.path.join(destino, 'obras')
+    carpeta_dimensiones = os.path.join(destino, 'dimensiones')
+    for carpeta in (carpeta_obras, carpeta_dimensiones):
+        shutil.rmtree(carpeta, ignore_errors=True)
+    os.makedirs(carpeta_dimensiones)
+
+    esquema = esquema_estrella()
+    cantidad = 0
+
+    def contar(lotes):
+        nonlocal cantidad
+        for lote in lotes:
+            cantidad += lote.num_rows
+            yield lote
+
+    # Una sola transacción de lectura: obras y dimensiones salen de la misma foto de la base
+    with sqlite_db.atomic():
+        ds.write_dataset(
+            contar(_lotes_estrella(esquema, tamanio_lote)), carpeta_obras, schema=esquema,
+            format=formato, partitioning=_particionado(),
+            basename_template=f'part-{{i}}.{EXTENSIONES[formato]}')
+        for modelo in DIMENSIONES:
+            tabla = pa.Table.from_pylist(list(modelo.select().dicts()))
+            _escribir_tabla(tabla, _ruta_dimension(destino, modelo, formato), formato)
+    return cantidad
+
+
+def leer_obras(origen, formato='parquet'):
+    """Dataset de Arrow con la estrella de obras exportada en `origen`.
+
+    Sirve para análisis ad hoc: dataset.to_table(columns=..., filter=...)
+    lee solo las columnas y particiones necesarias, y .to_pandas() lo pasa a pandas.
+    """
+    _requerir_pyarrow()
+    _validar_formato(formato)
+    return ds.dataset(os.path.join(origen, 'obras'), format=formato, partitioning=_particionado())
+
+
+def leer_dimension(origen, modelo, formato='parquet'):
+    _requerir_pyarrow()
+    _validar_formato(formato)
+    return ds.dataset(_ruta_dimension(origen, modelo, formato), format=formato).to_table()
+
+
+def _por_grupo(tabla, claves, agregaciones):
+    """[{clave: valor, ..., columna_agregación: valor}] de un group_by, ordenado por la primera clave."""
+    return sorted(tabla.group_by(claves).aggregate(agregaciones).to_pylist(), key=lambda fila: fila[claves[0]])
+
+
+def indicadores_columnares(origen, formato='parquet'):
+    """Los mismos indicadores que ControlObra.Obtener_indicadores, calculados con
+    compute de Arrow sobre los archivos exportados por exportar_columnar."""
+    obras = leer_obras(origen, formato)
+    tabla = obras.to_table(columns=['Id_Etapa', 'Etapa', 'Id_Tipo_obra', 'Monto_contrato', 'Plazo'])
+    dimension = lambda modelo: leer_dimension(origen, modelo, formato)
+
+    areas = dimension(Area_responsable).sort_by('Id_Area_responsable').to_pylist()
+    tipos = dimension(Tipo_obra).sort_by('Id_Tipo_obra')
+    barrios = dimension(Barrio)
+    barrios = barrios.filter(pc.is_in(barrios['Comuna'], pa.array([1, 2, 3], type=barrios['Comuna'].type)))
+
+    con_etapa = tabla.filter(pc.and_(pc.is_valid(tabla['Id_Etapa']), pc.is_valid(tabla['Etapa'])))
+    por_etapa = _por_grupo(con_etapa, ['Id_Etapa', 'Etapa'], [([], 'count_all')])
+
+    con_tipo = tabla.filter(pc.is_valid(tabla['Id_Tipo_obra']))
+    por_tipo = {fila['Id_Tipo_obra']: fila for fila in _por_grupo(
+        con_tipo, ['Id_Tipo_obra'], [([], 'count_all'), ('Monto_contrato', 'sum')])}
+    descripcion_tipo = dict(zip(tipos['Id_Tipo_obra'].to_pylist(), tipos['Desc_tipo'].to_pylist()))
+
+    finalizadas_24_meses = pc.sum(pc.and_(pc.equal(tabla['Id_Etapa'], 3),
+                                          pc.less_equal(tabla['Plazo'], 24))).as_py()
+    monto_total = pc.sum(tabla['Monto_contrato']).as_py()
+
+    return {
+        'areas_responsables': [{'id': fila['Id_Area_responsable'], 'area': fila['Area']} for fila in areas],
+        'tipos_obra': [{'id': id_, 'tipo': desc} for id_, desc in descripcion_tipo.items()],
+        'obras_por_etapa': [{'id': fila['Id_Etapa'], 'etapa': fila['Etapa'], 'cantidad_obras': fila['count_all']}
+                            for fila in por_etapa],
+        'obras_y_monto_por_tipo': [
+            {'id': id_, 'tipo': descripcion_tipo[id_], 'cantidad_obras': fila['count_all'],
+             'monto_por_tipo': fila['Monto_contrato_sum'] or 0}
+            for id_, fila in por_tipo.items() if id_ in descripcion_tipo],
+        'barrios_comunas_123': [{'id': fila['Id_barrio'], 'barrio': fila['Barrio'], 'id_comuna': fila['Comuna']}
+                                for fila in barrios.sort_by('Id_barrio').to_pylist()],
+        'obras_finalizadas_en_24_meses': finalizadas_24_meses or 0,
+        'monto_total_inversion': monto_total or 0,
+    }
@@ -0,0 +1,229 @@
+"""Conexión a la base de datos: ruta configurable, pool de conexiones y perfiles de PRAGMAs.
+
+La ruta puede ser un archivo, ':memory:' (una base vacía por conexión) o una
+base en memoria compartida entre conexiones del mismo proceso, útil en pruebas:
+
+    sqlite_db.configurar(memoria_compartida('pruebas'), pool=True)
+
+Sin argumentos se usa la variable de entorno OBRAS_DB, o obras_urbanas.db al
+lado de este archivo, con el perfil de OBRAS_DB_PERFIL (o 'predeterminado').
+
+Los perfiles ajustan PRAGMAs que valen por conexión (se aplican a cada una al
+abrirla); journal_mode=wal queda grabado en el archivo:
+
+    predeterminado  lo de siempre: solo WAL, el resto con los valores de SQLite
+    carga_masiva    synchronous=OFF, 256 MB de cache y temporales en memoria.
+                    Una caída del sistema operativo durante la carga puede dejar
+                    la base inconsistente: usarlo para cargas que se pueden repetir.
+    consulta        synchronous=NORMAL, 64 MB de cache, 256 MB de mmap y
+                    temporales en memoria; pensado para muchos lectores.
+
+Instantáneas: en lugar de reconstruir la base desde el CSV, se copia una ya
+cargada con la API de backup de SQLite (o VACUUM INTO) y se restaura cuando
+haga falta volver a ese estado. Las dos copias se hacen sin cortar a las demás
+conexiones; también se puede trabajar sobre una copia en memoria:
+
+    sqlite_db.tomar_instantanea('obras_cargadas.db')
+    sqlite_db.restaurar_instantanea('obras_cargadas.db')
+    with sqlite_db.copia_en_memoria('obras_cargadas.db', guardar=True):
+        ...  # los modelos usan la copia; al salir reemplaza a la base configurada
+"""
+import contextlib
+import os
+import sqlite3
+
+from peewee import DatabaseProxy
+
+from instrumentacion import SqliteInstrumentada, PooledSqliteInstrumentada
+
+RUTA_PREDETERMINADA = os.environ.get(
+    'OBRAS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'obras_urbanas.db'))
+PERFIL_PREDETERMINADO = os.environ.get('OBRAS_DB_PERFIL', 'predeterminado')
+MAXIMO_CONEXIONES = 8
+
+PERFILES = {
+    'predeterminado': {'journal_mode': 'wal'},
+    'carga_masiva': {
+        'journal_mode': 'wal',
+        'synchronous': 'off',
+        'cache_size': -256 * 1024,  # en KiB cuando es negativo
+        'temp_store': 'memory',
+    },
+    'consulta': {
+        'journal_mode': 'wal',
+        'synchronous': 'normal',
+        'cache_size': -64 * 1024,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'memory',
+    },
+}
+# PRAGMAs que se pueden cambiar sobre una conexión abierta (ver perfil_temporal)
+PRAGMAS_DE_CONEXION = ('synchronous', 'cache_size', 'mmap_size', 'temp_store')
+
+
+def memoria_compartida(nombre='obras'):
+    """URI de una base en memoria que comparten todas las conexiones del proceso
+    que la abran con el mismo nombre. Existe mientras quede alguna abierta."""
+    return f'file:{nombre}?mode=memory&cache=shared'
+
+
+def pragmas_de(perfil, **pragmas):
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil desconocido: {perfil!r} (opciones: {', '.join(PERFILES)})")
+    return {**PERFILES[perfil], **pragmas}
+
+
+def crear_db(ruta=None, perfil=None, pool=False, max_conexiones=MAXIMO_CONEXIONES, **pragmas):
+    """Base de peewee (instrumentada) para `ruta` con los PRAGMAs de `perfil`,
+    más los que se pasen sueltos. Con pool=True cada hilo toma una conexión de
+    un pool de hasta `max_conexiones` y la devuelve al cerrar."""
+    ruta = ruta or RUTA_PREDETERMINADA
+    pragmas = pragmas_de(perfil or PERFIL_PREDETERMINADO, **pragmas)
+    opciones = {'pragmas': pragmas}
+    if ruta.startswith('file:'):
+        opciones['uri'] = True
+    if not pool:
+        return SqliteInstrumentada(ruta, **opciones)
+    if ruta == ':memory:':
+        # Cada conexión del pool vería su propia base vacía
+        raise ValueError("':memory:' no se puede usar con pool; usar memoria_compartida()")
+    # Una conexión del pool la usa un hilo por vez, pero no siempre el que la abrió
+    return PooledSqliteInstrumentada(ruta, max_connections=max_conexiones, check_same_thread=False, **opciones)
+
+
+def abrir_sqlite(ruta, **opciones):
+    """Conexión sqlite3 sin PRAGMAs a un archivo o URI (por ejemplo memoria_compartida())."""
+    return sqlite3.connect(ruta, uri=ruta.startswith('file:'), **opciones)
+
+
+def copiar_base(origen, destino):
+    """Copia toda la base de la conexión `origen` sobre la de `destino` con la API
+    de backup, en un único paso: es una sola transacción en el destino, así que
+    las demás conexiones ven la base anterior o la copia completa, nunca una mezcla."""
+    origen.backup(destino, pages=-1)
+
+
+class BaseConfigurable(DatabaseProxy):
+    """La base que usan los modelos. Se puede apuntar a otra (configurar) sin
+    tocar los modelos; todo lo demás se delega en la base configurada."""
+    __slots__ = ()
+
+    def __setattr__(self, atributo, valor):
+        # Propiedades de la base como user_version se asignan en la base real
+        if atributo in ('obj', '_callbacks', '_Model'):
+            return object.__setattr__(self, atributo, valor)
+        setattr(self.obj, atributo, valor)
+
+    # El cache de dimensiones las consulta en cada búsqueda: sin pasar por __getattr__
+    def connection(self):
+        return self.obj.connection()
+
+    def top_transaction(self):
+        return self.obj.top_transaction()
+
+    def configurar(self, ruta=None, perfil=None, pool=False, max_conexiones=MAXIMO_CONEXIONES, **pragmas):
+        """Reemplaza la base configurada (cerrando sus conexiones) y devuelve la nueva."""
+        anterior = self.obj
+        self.initialize(crear_db(ruta, perfil, pool, max_conexiones, **pragmas))
+        if anterior is not None:
+            if hasattr(anterior, 'close_all'):
+                anterior.close_all()
+            else:
+                anterior.close()
+        return self.obj
+
+    @contextlib.contextmanager
+    def perfil_temporal(self, perfil):
+        """Aplica a la conexión actual los PRAGMAs de conexión de `perfil` y al
+        salir restaura los anteriores; por ejemplo, 'carga_masiva' durante una carga."""
+        cambios = {pragma: valor for pragma, valor in pragmas_de(perfil).items()
+                   if pragma in PRAGMAS_DE_CONEXION}
+        anteriores = {pragma: self.pragma(pragma) for pragma in cambios}
+        for pragma, valor in cambios.items():
+            self.pragma(pragma, valor)
+        try:
+            yield self
+        finally:
+            for pragma, valor in anteriores.items():
+                self.pragma(pragma, valor)
+
+    @contextlib.contextmanager
+    def otra_base(self, ruta, perfil=None, **pragmas):
+        """Apunta los modelos a la base `ruta` mientras dure el bloque y al salir la
+        cierra y vuelve a la anterior (sin cerrarla). No es para varios hilos: los
+        modelos de todos cambian de base."""
+        anterior = self.obj
+        base = crear_db(ruta, perfil, **pragmas)
+        self.initialize(base)
+        try:
+            yield self
+        finally:
+            base.close()
+            self.initialize(anterior)
+
+    def _contenido_reemplazado(self):
+        # Los mismos avisos que al configurar otra base: que se descarte lo cacheado
+        for callback in self._callbacks:
+            callback(self.obj)
+
+    def tomar_instantanea(self, destino, vacuum=False):
+        """Copia la base configurada al archivo `destino` y devuelve su tamaño en bytes.
+        Por defecto usa la API de backup (copia las páginas tal cual); con vacuum=True,
+        VACUUM INTO, que la reescribe compacta. Se escribe en un temporal que después
+        se renombra: `destino` nunca queda a medio copiar."""
+        temporal = f'{destino}.tmp'
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        if vacuum:
+            self.execute_sql('VACUUM INTO ?', (temporal,))
+        else:
+            copia = abrir_sqlite(temporal)
+            try:
+                copiar_base(self.connection(), copia)
+            finally:
+                copia.close()
+        os.replace(temporal, destino)
+        return os.path.getsize(destino)
+
+    def restaurar_instantanea(self, origen):
+        """Reemplaza el contenido de la base configurada por el de `origen` (un archivo
+        o URI) en una sola transacción, con la conexión ya abierta: no hace falta
+        que los demás procesos la cierren."""
+        if not origen.startswith('file:') and not os.path.exists(origen):
+            raise FileNotFoundError(origen)
+        fuente = abrir_sqlite(origen)
+        try:
+            copiar_base(fuente, self.connection())
+        finally:
+            fuente.close()
+        self._contenido_reemplazado()
+
+    @contextlib.contextmanager
+    def copia_en_memoria(self, origen=None, guardar=False, nombre='copia_obras'):
+        """Apunta los modelos a una copia en memoria de `origen` (un archivo o URI; por
+        defecto la base configurada) mientras dure el bloque, y al salir vuelve a la
+        base anterior. Con guardar=True, si el bloque termina sin errores, la copia
+        reemplaza de una vez el contenido de la base anterior (como restaurar_instantanea).
+        La copia es memoria_compartida(nombre): otros hilos del proceso la ven."""
+        anterior = self.obj
+        memoria = crear_db(memoria_compartida(nombre))
+        # La base en memoria existe mientras esta conexión siga abierta
+        memoria.connect()
+        try:
+            if origen is None:
+                copiar_base(anterior.connection(), memoria.connection())
+            else:
+                fuente = abrir_sqlite(origen)
+                try:
+                    copiar_base(fuente, memoria.connection())
+                finally:
+                    fuente.close()
+            self.initialize(memoria)
+            try:
+                yield self
+                if guardar:
+                    copiar_base(memoria.connection(), anterior.connection())
+            finally:
+                self.initialize(anterior)
+        finally:
+            memoria.close()
@@ -0,0 +1,270 @@
+"""Resolución de entidades de Empresa_licitadora: encuentra las empresas que son
+la misma con otro nombre ("Criba S.A.", "CRIBA SA", "Criva SA") y las fusiona.
+
+    resultado = deduplicar_empresas(aplicar=False)   # solo informa los grupos
+    resultado = deduplicar_empresas()                # y además los fusiona
+
+No se compara cada par de empresas. Cada una cae en unos pocos bloques: su CUIT
+(si es válido), la clave fonética de su nombre y bandas de una firma MinHash de
+los trigramas del nombre (LSH). Solo se puntúan los pares que comparten algún
+bloque, así que el costo crece casi linealmente con la cantidad de empresas.
+
+Dos empresas son la misma si tienen el mismo CUIT y nombres parecidos
+(UMBRAL_MISMO_CUIT), o si a alguna le falta el CUIT y los nombres suenan igual
+y son parecidos (UMBRAL_MISMO_SONIDO) o son muy parecidos (UMBRAL_NOMBRE). Con
+CUIT válidos distintos nunca se fusionan, ni siquiera a través de una tercera. Se conserva la de id más bajo, con el CUIT
+del grupo si no tenía; las Obras que apuntaban a las demás pasan a apuntarle a ella.
+"""
+import collections
+import difflib
+import re
+import zlib
+
+from peewee import Case, chunked
+
+from modelo_orm import sqlite_db, Empresa_licitadora, normalizar_texto
+
+# Palabras que no distinguen a una empresa de otra
+FORMAS_SOCIETARIAS = frozenset((
+    'sa', 'sai', 'saic', 'saci', 'sacif', 'sacifi', 'saciyf', 'sau', 'sas', 'srl', 'sca', 'scs', 'sh',
+    'ltda', 'ute', 'sociedad', 'anonima', 'responsabilidad', 'limitada', 'union', 'transitoria',
+))
+PALABRAS_VACIAS = frozenset(('de', 'del', 'la', 'las', 'el', 'los', 'y', 'e'))
+# Parecido de clave_nombre (ver parecido) a partir del cual dos empresas son la misma:
+# con el mismo CUIT, si suenan igual (clave_fonetica) o por el nombre solo
+UMBRAL_MISMO_CUIT = 0.5
+UMBRAL_MISMO_SONIDO = 0.8
+UMBRAL_NOMBRE = 0.9
+# LSH: la probabilidad de que dos nombres cuyos trigramas tienen un Jaccard j compartan
+# una banda es 1 - (1 - j ** FILAS_POR_BANDA) ** BANDAS_MINHASH (0.99 con j = 0.8,
+# 0.77 con j = 0.6, 0.33 con j = 0.4)
+BANDAS_MINHASH = 6
+FILAS_POR_BANDA = 3
+# Un bloque más grande no se compara todo contra todo sino cada empresa con las
+# VENTANA_BLOQUE_GRANDE siguientes en orden de nombre
+MAXIMO_BLOQUE = 100
+VENTANA_BLOQUE_GRANDE = 10
+
+PESOS_CUIT = (5, 4, 3, 2, 7, 6, 5, 4, 3, 2)
+_PRIMO_MINHASH = (1 << 31) - 1
+_FONEMAS = re.compile(r'ch|ll|qu|(?P<s>c(?=[ei]))|(?P<j>g(?=[ei]))|[czvwh]')
+_SONIDOS = {'ch': 'x', 'll': 'y', 'qu': 'k', 'c': 'k', 'z': 's', 'v': 'b', 'w': 'u', 'h': ''}
+_REPETIDAS = re.compile(r'(.)\1+')
+_VOCALES = re.compile(r'[aeiouy]')
+
+GrupoEmpresas = collections.namedtuple('GrupoEmpresas', 'conservar fusionadas cuit')
+# Lo que resolver_empresas calcula una vez por empresa
+EmpresaResolver = collections.namedtuple('EmpresaResolver', 'id nombre cuit clave fonetica trigramas')
+
+
+def normalizar_cuit(cuit):
+    """'30-71234567-8' -> '30712345678' si es un CUIT válido (11 dígitos y dígito
+    verificador correcto); None si falta, es el comodín 00-00000000-0 o no es válido."""
+    digitos = re.sub(r'\D', '', str(cuit or ''))
+    if len(digitos) != 11 or not digitos.strip('0'):
+        return None
+    verificador = 11 - sum(int(d) * peso for d, peso in zip(digitos, PESOS_CUIT)) % 11
+    verificador = {11: 0, 10: 9}.get(verificador, verificador)
+    return digitos if verificador == int(digitos[10]) else None
+
+
+def clave_nombre(nombre):
+    """Nombre en minúsculas, sin acentos, puntuación, forma societaria ni
+    artículos, con las palabras ordenadas: 'CRIBA S.A.' -> 'criba'."""
+    texto = normalizar_texto(nombre).replace('.', '').replace('&', ' y ')
+    palabras = re.findall(r'\w+', texto)
+    propias = [palabra for palabra in palabras
+               if palabra not in FORMAS_SOCIETARIAS and palabra not in PALABRAS_VACIAS]
+    return ' '.join(sorted(propias or palabras))
+
+
+def _sonido(fonema):
+    if fonema.group('s'):
+        return 's'
+    if fonema.group('j'):
+        return 'j'
+    return _SONIDOS[fonema.group()]
+
+
+def clave_fonetica(clave):
+    """Código de cómo suena cada palabra de clave_nombre (primera letra y
+    consonantes, con c/k/qu, s/z, b/v, y/ll iguales y sin h): 'criba' y 'kriva' -> 'krb'."""
+    codigos = []
+    for palabra in clave.split():
+        palabra = _FONEMAS.sub(_sonido, palabra)
+        palabra = _REPETIDAS.sub(r'\1', palabra)
+        if palabra:
+            codigos.append(palabra[0] + _VOCALES.sub('', palabra[1:]))
+    return ' '.join(sorted(codigos))
+
+
+def trigramas(clave):
+    relleno = f' {clave} '
+    return frozenset(relleno[i:i + 3] for i in range(len(relleno) - 2))
+
+
+def parecido(clave_a, clave_b, minimo=0.0):
+    """Entre 0 y 1, cuánto del texto tienen en común dos claves ('criba' y 'criva': 0.8).
+    Devuelve 0 sin hacer la cuenta completa si no puede llegar a `minimo`."""
+    comparador = difflib.SequenceMatcher(None, clave_a, clave_b, autojunk=False)
+    if comparador.real_quick_ratio() < minimo or comparador.quick_ratio() < minimo:
+        return 0.0
+    return comparador.ratio()
+
+
+def firmas_minhash(conjuntos, tamanio_lote=10_000):
+    """Matriz (empresas, BANDAS_MINHASH * FILAS_POR_BANDA) con el mínimo de cada
+    función de hash sobre los trigramas de cada empresa."""
+    import numpy as np
+
+    cantidad_hashes = BANDAS_MINHASH * FILAS_POR_BANDA
+    azar = np.random.default_rng(0)
+    a = azar.integers(1, _PRIMO_MINHASH, cantidad_hashes, dtype=np.uint64)[:, None]
+    b = azar.integers(0, _PRIMO_MINHASH, cantidad_hashes, dtype=np.uint64)[:, None]
+    hash_trigrama = {}
+    firmas = np.empty((len(conjuntos), cantidad_hashes), dtype=np.uint64)
+    for inicio in range(0, len(conjuntos), tamanio_lote):
+        lote = conjuntos[inicio:inicio + tamanio_lote]
+        valores = np.fromiter(
+            (hash_trigrama.get(t) or hash_trigrama.setdefault(t, zlib.crc32(t.encode()) & _PRIMO_MINHASH)
+             for conjunto in lote for t in conjunto),
+            dtype=np.uint64, count=sum(map(len, lote)))
+        comienzos = np.cumsum([0] + [len(conjunto) for conjunto in lote[:-1]])
+        permutados = (a * valores + b) % _PRIMO_MINHASH
+        firmas[inicio:inicio + len(lote)] = np.minimum.reduceat(permutados, comienzos, axis=1).T
+    return firmas
+
+
+def bloques(empresas):
+    """{clave de bloque: [índices en `empresas`]} para una lista de EmpresaResolver."""
+    import numpy as np
+
+    bloques_ = collections.defaultdict(list)
+    firmas = firmas_minhash([empresa.trigramas for empresa in empresas])
+    pesos = np.array([1, 1_000_003, 998_244_353][:FILAS_POR_BANDA], dtype=np.uint64)
+    por_banda = [(firmas[:, banda * FILAS_POR_BANDA:(banda + 1) * FILAS_POR_BANDA] * pesos).sum(axis=1).tolist()
+                 for banda in range(BANDAS_MINHASH)]
+    for i, empresa in enumerate(empresas):
+        if empresa.cuit:
+            bloques_[('cuit', empresa.cuit)].append(i)
+        bloques_[('fonetica', empresa.fonetica)].append(i)
+        for banda, claves in enumerate(por_banda):
+            bloques_[('minhash', banda, claves[i])].append(i)
+    return bloques_
+
+
+class _Grupos:
+    """Unión de conjuntos de empresas que recuerda el CUIT válido de cada grupo,
+    para no unir dos grupos con CUIT distintos."""
+
+    def __init__(self, cuits):
+        self.padre = list(range(len(cuits)))
+        self.cuit = list(cuits)
+
+    def raiz(self, i):
+        while self.padre[i] != i:
+            self.padre[i] = self.padre[self.padre[i]]
+            i = self.padre[i]
+        return i
+
+    def unir(self, i, j):
+        i, j = self.raiz(i), self.raiz(j)
+        if i == j or (self.cuit[i] and self.cuit[j] and self.cuit[i] != self.cuit[j]):
+            return False
+        i, j = min(i, j), max(i, j)
+        self.padre[j] = i
+        self.cuit[i] = self.cuit[i] or self.cuit[j]
+        return True
+
+
+def resolver_empresas(filas):
+    """Agrupa las empresas repetidas de `filas` [(id, nombre, cuit)].
+
+    Devuelve (grupos, estadisticas): un GrupoEmpresas por cada grupo de dos o más
+    empresas, con el id a conservar (el más bajo), los ids a fusionar en él y el
+    CUIT del grupo, y cuántos bloques y pares se puntuaron.
+    """
+    empresas = []
+    for id_, nombre, cuit in sorted(filas):
+        clave = clave_nombre(nombre)
+        empresas.append(EmpresaResolver(id_, nombre, normalizar_cuit(cuit), clave, clave_fonetica(clave),
+                                        trigramas(clave)))
+    grupos = _Grupos([empresa.cuit for empresa in empresas])
+    pares = 0
+
+    def comparar(i, j):
+        nonlocal pares
+        if grupos.raiz(i) == grupos.raiz(j):
+            return
+        a, b = empresas[i], empresas[j]
+        if a.cuit and b.cuit and a.cuit != b.cuit:
+            return
+        pares += 1
+        if a.cuit and a.cuit == b.cuit:
+            umbral = UMBRAL_MISMO_CUIT
+        elif a.fonetica == b.fonetica:
+            umbral = UMBRAL_MISMO_SONIDO
+        else:
+            umbral = UMBRAL_NOMBRE
+        if a.clave == b.clave or parecido(a.clave, b.clave, umbral) >= umbral:
+            grupos.unir(i, j)
+
+    todos = bloques(empresas) if empresas else {}
+    grandes = 0
+    for indices in todos.values():
+        if len(indices) <= MAXIMO_BLOQUE:
+            for posicion, i in enumerate(indices):
+                for j in indices[posicion + 1:]:
+                    comparar(i, j)
+        else:
+            grandes += 1
+            indices = sorted(indices, key=lambda i: empresas[i].clave)
+            for posicion, i in enumerate(indices):
+                for j in indices[posicion + 1:posicion + 1 + VENTANA_BLOQUE_GRANDE]:
+                    comparar(i, j)
+
+    miembros = collections.defaultdict(list)
+    for i in range(len(empresas)):
+        miembros[grupos.raiz(i)].append(empresas[i].id)
+    resultado = [GrupoEmpresas(ids[0], ids[1:], grupos.cuit[raiz])
+                 for raiz, ids in miembros.items() if len(ids) > 1]
+    estadisticas = {'empresas': len(empresas), 'bloques': len(todos), 'bloques_grandes': grandes,
+                    'pares_puntuados': pares}
+    return resultado, estadisticas
+
+
+def fusionar_empresas(grupos, tamanio_lote=500):
+    """Reapunta en bloque las FK de las empresas fusionadas a la que se conserva,
+    completa el CUIT de esta si no tenía uno válido y borra las demás."""
+    reemplazos = {id_: grupo.conservar for grupo in grupos for id_ in grupo.fusionadas}
+    cuits = {grupo.conservar: grupo.cuit for grupo in grupos if grupo.cuit}
+    pk = Empresa_licitadora.Id_Empresa_licitadora
+    with sqlite_db.atomic():
+        for ids in chunked(sorted(reemplazos), tamanio_lote):
+            for campo, modelo in Empresa_licitadora._meta.backrefs.items():
+                (modelo
+                 .update({campo: Case(campo, [(id_, reemplazos[id_]) for id_ in ids])})
+                 .where(campo.in_(ids))
+                 .execute())
+            Empresa_licitadora.delete().where(pk.in_(ids)).execute()
+        for ids in chunked(sorted(cuits), tamanio_lote):
+            sin_cuit = [id_ for id_, cuit in Empresa_licitadora.select(pk, Empresa_licitadora.cuit_contratista)
+                        .where(pk.in_(ids)).tuples() if normalizar_cuit(cuit) is None]
+            if sin_cuit:
+                (Empresa_licitadora
+                 .update(cuit_contratista=Case(pk, [(id_, cuits[id_]) for id_ in sin_cuit]))
+                 .where(pk.in_(sin_cuit))
+                 .execute())
+    return len(reemplazos)
+
+
+def deduplicar_empresas(aplicar=True, tamanio_lote=500):
+    """Busca las empresas repetidas y, con aplicar=True, las fusiona.
+    Devuelve las estadísticas de resolver_empresas más los grupos y cuántas se fusionaron."""
+    filas = (Empresa_licitadora
+             .select(Empresa_licitadora.Id_Empresa_licitadora, Empresa_licitadora.Empresa,
+                     Empresa_licitadora.cuit_contratista)
+             .tuples())
+    grupos, estadisticas = resolver_empresas(list(filas))
+    fusionadas = fusionar_empresas(grupos, tamanio_lote) if aplicar else 0
+    return {**estadisticas, 'grupos': grupos, 'fusionadas': fusionadas}
@@ -1,32 +1,69 @@
 from abc import ABC, abstractmethod
-import pandas as pd
-from peewee import fn
+from collections import deque
+from peewee import chunked, ForeignKeyField, IntegrityError, JOIN, Value
 import datetime
+import functools
+import hashlib
+import os
+import time
+from instrumentacion import instrumentacion
 from modelo_orm import (
     sqlite_db, Entorno, Etapa, Empresa_licitadora, Tipo_obra,
-    Area_responsable, Comuna, Barrio, Tipo_contratacion, Financiamiento, Obra
+    Area_responsable, Comuna, Barrio, Tipo_contratacion, Financiamiento, Obra,
+    Resumen_etapa, Resumen_tipo_obra, Resumen_total, cache_dimensiones, foto_si_corresponde, migrar_esquema,
+    version_datos
 )
 
 
 # Funciones auxiliares para pedir datos por teclado y validar
+CANTIDAD_SUGERENCIAS = 10
+
+
+def mostrar_opciones(modelo, campo):
+    """Lista las opciones si son pocas; si no, solo cuántas hay (se sugieren al escribir)."""
+    sugerencias = cache_dimensiones.sugerencias(modelo, campo.name)
+    print(f"\nOpciones disponibles ({modelo.__name__}):")
+    if len(sugerencias) <= CANTIDAD_SUGERENCIAS:
+        for valor in sugerencias.sugerir('', CANTIDAD_SUGERENCIAS):
+            print(f"- {valor}")
+    else:
+        print(f"{len(sugerencias)} registros. Escriba el nombre o parte de él para ver sugerencias.")
+
+
+def elegir_sugerencia(modelo, campo, valor, mensaje):
+    """Muestra las sugerencias para `valor` y devuelve el id de la elegida, o None."""
+    sugerencias = cache_dimensiones.sugerir(modelo, campo.name, valor, CANTIDAD_SUGERENCIAS)
+    if not sugerencias:
+        return None
+    print("Quizás quiso decir:")
+    for numero, sugerencia in enumerate(sugerencias, 1):
+        print(f"  {numero}. {sugerencia}")
+    respuesta = input(mensaje).strip()
+    if respuesta.isdigit() and 1 <= int(respuesta) <= len(sugerencias):
+        return cache_dimensiones.obtener_id(modelo, **{campo.name: sugerencias[int(respuesta) - 1]})
+    return None
+
+
 def pedir_y_validar_o_crear(modelo, campo, mensaje_input, campos_extra=None):
+    mostrar_opciones(modelo, campo)
     while True:
-        print(f"\nOpciones disponibles ({modelo.__name__}):")
-        for item in modelo.select():
-            print(f"- {getattr(item, campo.name)}")
-
         valor = input(mensaje_input).strip()
-        obj = modelo.get_or_none(campo == valor)
+        obj = cache_dimensiones.obtener_id(modelo, **{campo.name: valor})
 
-        if obj:
+        if obj is not None:
             return obj
         else:
+            elegido = elegir_sugerencia(modelo, campo, valor,
+                                        "Elija un número de la lista, o Enter para seguir con lo escrito: ")
+            if elegido is not None:
+                return elegido
+
             crear = input(f"'{valor}' no existe. ¿Deseás crearlo? (SI/NO): ").strip().lower()
             if crear in ['si', 'sí']:
                 datos = {campo.name: valor}
                 if campos_extra:
                     datos.update(campos_extra())
-                nuevo = modelo.create(**datos)
+                nuevo = cache_dimensiones.crear(modelo, **datos)
                 print(f"\u2714 Nuevo {modelo.__name__} creado: {valor}")
                 return nuevo
             else:
@@ -69,6 +106,278 @@ def pedir_si_no(mensaje):
             print("\u274C Respuesta inválida. Ingrese 'SI' o 'NO'.")
 
 
+# Funciones auxiliares para normalizar el CSV columna por columna
+COLUMNAS_UTILES = [
+    'entorno', 'nombre', 'etapa', 'tipo', 'area_responsable', 'descripcion',
+    'monto_contrato', 'comuna', 'barrio', 'direccion', 'lat', 'lng',
+    'fecha_inicio', 'fecha_fin_inicial', 'plazo_meses', 'porcentaje_avance',
+    'licitacion_oferta_empresa', 'licitacion_anio', 'contratacion_tipo',
+    'nro_contratacion', 'cuit_contratista', 'beneficiarios', 'mano_obra',
+    'compromiso', 'destacada', 'ba_elige', 'expediente-numero', 'financiamiento'
+]
+FORMATO_FECHA_CSV = '%d/%m/%Y'
+COLUMNAS_FECHA = ['fecha_inicio', 'fecha_fin_inicial']
+COLUMNAS_COORDENADAS = ['lat', 'lng']
+RANGOS_COORDENADAS = {'lat': (-90.0, 90.0), 'lng': (-180.0, 180.0)}
+
+
+# Todo espacio Unicode: con el backend de pyarrow (RE2) \s solo abarca los ASCII
+_ESPACIOS = '[\\s\u00a0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000\ufeff]+'
+
+
+def montos_a_float(serie):
+    """'$67.065.700,00' -> 67065700.0 para toda la columna; lo inválido queda en NaN.
+    Se quita todo espacio, también los no separables ('\xa06595600') que float() aceptaba."""
+    import pandas as pd
+    limpia = (serie.astype('string')
+              .str.replace('$', '', regex=False)
+              .str.replace(_ESPACIOS, '', regex=True)
+              .str.replace('.', '', regex=False)
+              .str.replace(',', '.', regex=False))
+    return pd.to_numeric(limpia, errors='coerce').astype('float64')
+
+
+def decimales_a_float(serie):
+    """'-34,56715312' -> -34.56715312 para toda la columna; lo inválido queda en NaN."""
+    import pandas as pd
+    limpia = serie.astype('string').str.strip().str.replace(',', '.', regex=False)
+    return pd.to_numeric(limpia, errors='coerce').astype('float64')
+
+
+def fechas_a_datetime(serie):
+    import pandas as pd
+    return pd.to_datetime(serie, format=FORMATO_FECHA_CSV, errors='coerce')
+
+
+def a_objeto(serie):
+    """Columna de objetos Python con None en lugar de NaN/NaT."""
+    return serie.astype(object).where(serie.notna(), None)
+
+
+# Conversión vectorizada de cada columna tipada del CSV
+CONVERSIONES_CSV = {
+    'monto_contrato': montos_a_float,
+    'comuna': decimales_a_float,
+    'plazo_meses': montos_a_float,
+    'porcentaje_avance': decimales_a_float,
+    'mano_obra': decimales_a_float,
+    'lat': decimales_a_float,
+    'lng': decimales_a_float,
+    'fecha_inicio': fechas_a_datetime,
+    'fecha_fin_inicial': fechas_a_datetime,
+}
+
+
+def normalizar_df(df):
+    """Tipifica el DataFrame crudo del CSV sin recorrerlo fila por fila.
+
+    Devuelve el DataFrame tipado y un reporte {columna: [(fila, valor crudo), ...]}
+    con las celdas que no se pudieron convertir.
+    """
+    tipado = df.copy()
+    errores = {}
+
+    for columna, convertir in CONVERSIONES_CSV.items():
+        convertida = convertir(df[columna])
+        if columna == 'mano_obra':
+            # Cantidad de personas: solo se aceptan enteros
+            convertida = convertida.where(convertida == convertida.round())
+        elif columna in RANGOS_COORDENADAS:
+            # Una coordenada imposible (una coma corrida, por ejemplo) no entra al índice espacial
+            convertida = convertida.where(convertida.between(*RANGOS_COORDENADAS[columna]))
+        rechazadas = df[columna].notna() & convertida.isna()
+        if rechazadas.any():
+            errores[columna] = list(df.loc[rechazadas, columna].items())
+        tipado[columna] = convertida
+
+    # Mismos valores por defecto que usaba la carga para celdas vacías o inválidas
+    for columna in ['monto_contrato', 'plazo_meses', 'porcentaje_avance']:
+        tipado[columna] = tipado[columna].fillna(0.0)
+    tipado['mano_obra'] = tipado['mano_obra'].fillna(0).astype('int64')
+
+    # El resto de las columnas es texto
+    for columna in df.columns:
+        if columna not in CONVERSIONES_CSV:
+            tipado[columna] = a_objeto(df[columna])
+
+    return tipado, errores
+
+
+def filas_para_carga(df):
+    """Filas del DataFrame tipado como dicts con valores nativos listos para insertar."""
+    listo = df.copy()
+    for columna in COLUMNAS_FECHA:
+        listo[columna] = a_objeto(df[columna].dt.date)
+    for columna in COLUMNAS_COORDENADAS:
+        listo[columna] = a_objeto(df[columna])
+    return listo.to_dict('records')
+
+
+def claves_dimensiones(fila):
+    """Valores con los que cada fila se asocia a las tablas de dimensión."""
+    return {
+        'entorno': fila['entorno'],
+        'etapa': fila['etapa'],
+        'tipo_obra': fila['tipo'] or "No especificado",
+        'area_responsable': fila['area_responsable'],
+        'tipo_contratacion': fila['contratacion_tipo'] or "No especificado",
+        'comuna': fila['comuna'],
+        'barrio': fila['barrio'],
+        'financiamiento': fila['financiamiento'] if fila['financiamiento'] else "No especificado",
+        'empresa': fila['licitacion_oferta_empresa'] if fila['licitacion_oferta_empresa'] else "Empresa Desconocida",
+        'cuit': fila['cuit_contratista'] if fila['cuit_contratista'] else "00-00000000-0",
+    }
+
+
+def datos_obra(fila):
+    """Campos propios (no FK) de Obra a partir de una fila ya normalizada."""
+    return {
+        'Nombre_obra': fila['nombre'],
+        'Descripcion': fila['descripcion'],
+        'Monto_contrato': fila['monto_contrato'],
+        'Direccion': fila['direccion'],
+        'Latitud': fila['lat'],
+        'Longitud': fila['lng'],
+        'Fecha_inicio': fila['fecha_inicio'],
+        'Fecha_fin_inicial': fila['fecha_fin_inicial'],
+        'Plazo': fila['plazo_meses'],
+        'Porcentaje_avance': fila['porcentaje_avance'],
+        'año_licitacion': fila['licitacion_anio'],
+        'Nro_contratacion': fila['nro_contratacion'],
+        'Mano_de_obra': fila['mano_obra'],
+        'Compromiso': fila['compromiso'],
+        'Destacada': fila['destacada'],
+        'ba_elige': fila['ba_elige'],
+        'Expediente': fila['expediente-numero'],
+        'Clave_origen': fila.get('clave_origen'),
+        'Hash_origen': fila.get('hash_origen'),
+    }
+
+
+def validar_no_nulos(datos):
+    """Lanza IntegrityError si falta un campo obligatorio de Obra (como lo haría SQLite)."""
+    for campo in Obra._meta.sorted_fields:
+        if not campo.null and not campo.primary_key and datos.get(campo.name) is None:
+            raise IntegrityError(
+                f"NOT NULL constraint failed: {Obra._meta.table_name}.{campo.column_name}"
+            )
+
+
+# Columnas de Obra en el orden del upsert de cargar_csv_en_paralelo:
+# primero las FK (las resuelve el proceso que escribe) y después los datos propios
+CAMPOS_FK_OBRA = [campo for campo in Obra._meta.sorted_fields if isinstance(campo, ForeignKeyField)]
+CAMPOS_DATOS_OBRA = [campo for campo in Obra._meta.sorted_fields
+                     if not campo.primary_key and not isinstance(campo, ForeignKeyField)]
+POSICION_CLAVE_ORIGEN = [campo.name for campo in CAMPOS_DATOS_OBRA].index('Clave_origen')
+
+
+@functools.lru_cache(maxsize=None)
+def sql_insertar_obras(cantidad):
+    """INSERT de `cantidad` obras con las columnas CAMPOS_FK_OBRA + CAMPOS_DATOS_OBRA.
+    Van varias filas por sentencia porque FTS5 vuelca su índice al terminar cada
+    sentencia: fila por fila (executemany) la carga es tres veces más lenta.
+
+    Como en _sincronizar_bloque, si la Clave_origen ya existe se pisan las demás
+    columnas, salvo que la obra siga igual (mismo Hash_origen y sin Baja_origen)."""
+    campos = CAMPOS_FK_OBRA + CAMPOS_DATOS_OBRA
+    columnas = ', '.join(f'"{campo.column_name}"' for campo in campos)
+    fila = '({})'.format(', '.join('?' for _ in campos))
+    pisar = ', '.join(f'"{campo.column_name}" = excluded."{campo.column_name}"'
+                      for campo in campos if campo.name != 'Clave_origen')
+    return (
+        f'INSERT INTO "{Obra._meta.table_name}" ({columnas}) VALUES ' + ', '.join([fila] * cantidad)
+        + f' ON CONFLICT ("{Obra.Clave_origen.column_name}") DO UPDATE SET {pisar}'
+        + f' WHERE "{Obra.Hash_origen.column_name}" IS NOT excluded."{Obra.Hash_origen.column_name}"'
+        + f' OR "{Obra.Baja_origen.column_name}" IS NOT NULL'
+    )
+
+
+def normalizar_particion(bloque):
+    """Trabajo de cada proceso de cargar_csv_en_paralelo sobre un bloque crudo del CSV.
+
+    Devuelve las filas como (claves de dimensiones, valores de CAMPOS_DATOS_OBRA
+    ya convertidos para SQLite, error o None), los textos de la clave de origen
+    de cada fila y el reporte de celdas inválidas. La clave de origen depende de
+    los bloques anteriores (ver claves_origen): la completa el proceso que escribe.
+    """
+    df, errores = normalizar_df(bloque[COLUMNAS_UTILES])
+    df = df.assign(hash_origen=hashes_origen(df))
+    filas = []
+    for fila in filas_para_carga(df):
+        datos = datos_obra(fila)
+        try:
+            validar_no_nulos(datos)
+            error = None
+        except IntegrityError as e:
+            error = str(e)
+        valores = tuple(campo.db_value(datos.get(campo.name)) for campo in CAMPOS_DATOS_OBRA)
+        filas.append((claves_dimensiones(fila), valores, error))
+    return filas, textos_clave_origen(df), errores
+
+
+# Columnas que identifican una obra en el CSV de origen
+COLUMNAS_CLAVE_ORIGEN = ['expediente-numero', 'nro_contratacion', 'entorno', 'nombre']
+
+
+def _resumir(textos):
+    return [hashlib.blake2b(texto.encode('utf-8'), digest_size=16).hexdigest() for texto in textos]
+
+
+def _unir_columnas(df, columnas):
+    valores = [df[columna].tolist() for columna in columnas]
+    return ['\x1f'.join(map(str, fila)) for fila in zip(*valores)]
+
+
+def textos_clave_origen(df):
+    return _unir_columnas(df, COLUMNAS_CLAVE_ORIGEN)
+
+
+def claves_origen(textos, ocurrencias):
+    """Clave de cada fila a partir de su texto de COLUMNAS_CLAVE_ORIGEN y el número
+    de aparición de ese texto en el archivo; `ocurrencias` lleva esa cuenta entre bloques."""
+    claves = []
+    for texto in textos:
+        vista = ocurrencias.get(texto, 0)
+        ocurrencias[texto] = vista + 1
+        claves.append(f"{texto}\x1f{vista}")
+    return _resumir(claves)
+
+
+def hashes_origen(df):
+    return _resumir(_unir_columnas(df, COLUMNAS_UTILES))
+
+
+def huellas_origen(df, ocurrencias=None):
+    """Clave natural y hash de contenido de cada fila del DataFrame tipado."""
+    if ocurrencias is None:
+        ocurrencias = {}
+    return claves_origen(textos_clave_origen(df), ocurrencias), hashes_origen(df)
+
+
+def con_huellas(df, ocurrencias=None):
+    """El DataFrame tipado con las columnas clave_origen y hash_origen, que todas las
+    cargas guardan en Obra (así cualquier carga se puede sincronizar después)."""
+    if 'clave_origen' in df.columns:
+        return df
+    with instrumentacion.fase('huellas'):
+        claves, hashes = huellas_origen(df, ocurrencias)
+    return df.assign(clave_origen=claves, hash_origen=hashes)
+
+
+# Dimensiones en el orden en que cargar_datos las resuelve: (clave, modelo, campo)
+DIMENSIONES_CARGA = [
+    ('entorno', Entorno, Entorno.Desc_entorno),
+    ('etapa', Etapa, Etapa.Desc_etapa),
+    ('tipo_obra', Tipo_obra, Tipo_obra.Desc_tipo),
+    ('area_responsable', Area_responsable, Area_responsable.Area),
+    ('tipo_contratacion', Tipo_contratacion, Tipo_contratacion.Desc_contrataciones),
+    ('comuna', Comuna, Comuna.Comuna),
+    ('barrio', Barrio, Barrio.Barrio),
+    ('financiamiento', Financiamiento, Financiamiento.Desc_financiamiento),
+    ('empresa', Empresa_licitadora, Empresa_licitadora.Empresa),
+]
+
+
 # Definición de clases abstractas y concretas para la gestión
 class GestionarObra(ABC):
 
@@ -108,36 +417,36 @@ class ControlObra(GestionarObra):
     @classmethod
     def conectar_db(cls):
         sqlite_db.connect()
+        cache_dimensiones.invalidar()
         print("\U0001F4E1 Conexión establecida con la base de datos.")
 
     @classmethod
     def mapear_orm(cls):
-        sqlite_db.create_tables([
+        modelos = [
             Entorno, Etapa, Empresa_licitadora, Tipo_obra, Area_responsable,
             Comuna, Barrio, Tipo_contratacion, Financiamiento, Obra
-        ])
+        ]
+        for descripcion in migrar_esquema(modelos):
+            print(f"\U0001F527 Migración aplicada: {descripcion}")
         print("Tablas creadas correctamente \U0001F44D")
 
     @classmethod
     def extraer_datos(cls, ruta_csv):
+        import pandas as pd
         try:
             print(f"\U0001F4BB  Intentando cargar CSV desde: {ruta_csv}")
-            df = pd.read_csv(ruta_csv, sep=';', encoding='latin1')
-
-            columnas_utiles = [
-                'entorno', 'nombre', 'etapa', 'tipo', 'area_responsable', 'descripcion',
-                'monto_contrato', 'comuna', 'barrio', 'direccion', 'lat', 'lng',
-                'fecha_inicio', 'fecha_fin_inicial', 'plazo_meses', 'porcentaje_avance',
-                'licitacion_oferta_empresa', 'licitacion_anio', 'contratacion_tipo',
-                'nro_contratacion', 'cuit_contratista', 'beneficiarios', 'mano_obra',
-                'compromiso', 'destacada', 'ba_elige', 'expediente-numero', 'financiamiento'
-            ]
+            with instrumentacion.fase('lectura'):
+                df = pd.read_csv(ruta_csv, sep=';', encoding='latin1', dtype=str)
 
             print(f"\U0001F4CA Columnas en el CSV: {df.columns.tolist()}")
 
-            df = df[columnas_utiles]
-            df = df.where(pd.notna(df), None)
-            df['ba_elige'] = df['ba_elige'].apply(lambda x: None if pd.isna(x) else x)
+            with instrumentacion.fase('normalizacion'):
+                df, errores = normalizar_df(df[COLUMNAS_UTILES])
+            df.attrs['errores'] = errores
+
+            for columna, celdas in errores.items():
+                print(f"\u26A0 {columna}: {len(celdas)} valores no se pudieron convertir "
+                      f"(ej: {celdas[0][1]!r})")
 
             print("\u2714 DataFrame cargado con éxito.")
             return df
@@ -146,137 +455,474 @@ class ControlObra(GestionarObra):
             print(f"\u274C Error al cargar el DataFrame: {e}")
             return None
 
-    @classmethod
-    def Obtener_indicadores(cls):
-        indicadores = {}
-
-        indicadores['areas_responsables'] = list(Area_responsable.select())
-        indicadores['tipos_obra'] = list(Tipo_obra.select())
-        indicadores['obras_por_etapa'] = list(
-            Obra
-            .select(Etapa.Desc_etapa, Obra.Etapa, fn.COUNT(Obra.Id_Obra).alias('cantidad_obras'))
-            .join(Etapa)
-            .group_by(Obra.Etapa, Etapa.Desc_etapa)
-        )
-        indicadores['obras_y_monto_por_tipo'] = list(
-            Obra
-            .select(
-                Tipo_obra.Desc_tipo,
-                Obra.Tipo_obra,
-                fn.COUNT(Obra.Id_Obra).alias('cantidad_obras'),
-                fn.SUM(Obra.Monto_contrato).alias('monto_por_tipo')
-            )
-            .join(Tipo_obra)
-            .group_by(Obra.Tipo_obra, Tipo_obra.Desc_tipo)
+    @staticmethod
+    def _leer_csv_por_bloques(ruta_csv, tamanio_bloque):
+        import pandas as pd
+        lector = pd.read_csv(
+            ruta_csv, sep=';', encoding='latin1',
+            usecols=COLUMNAS_UTILES, dtype=str, chunksize=tamanio_bloque
         )
-        indicadores['barrios_comunas_123'] = list(
-            Barrio.select().where(Barrio.Comuna.in_([1, 2, 3]))
-        )
-        indicadores['obras_finalizadas_en_24_meses'] = (
-            Obra.select().where((Obra.Etapa == 3) & (Obra.Plazo <= 24)).count()
+        with lector:
+            yield from instrumentacion.iterar('lectura', lector)
+
+    @classmethod
+    def extraer_datos_por_bloques(cls, ruta_csv, tamanio_bloque=50_000):
+        """Lee el CSV de a bloques de tamanio_bloque filas y devuelve cada uno
+        ya normalizado, sin tener nunca el archivo entero en memoria."""
+        for bloque in cls._leer_csv_por_bloques(ruta_csv, tamanio_bloque):
+            with instrumentacion.fase('normalizacion'):
+                df, errores = normalizar_df(bloque[COLUMNAS_UTILES])
+            df.attrs['errores'] = errores
+            yield df
+
+    @classmethod
+    def cargar_csv_por_bloques(cls, ruta_csv, tamanio_bloque=50_000, tamanio_lote=500):
+        """Normaliza y carga cada bloque del CSV antes de leer el siguiente, de modo
+        que la memoria usada no crece con el tamaño del archivo."""
+        print(f"\U0001F4BB  Cargando CSV por bloques de {tamanio_bloque} filas: {ruta_csv}")
+        inicio = time.perf_counter()
+        total_insertadas = 0
+        rechazadas = 0
+        ocurrencias = {}
+
+        for df in cls.extraer_datos_por_bloques(ruta_csv, tamanio_bloque):
+            rechazadas += sum(len(celdas) for celdas in df.attrs['errores'].values())
+            total_insertadas += cls.cargar_datos_masivo(df, tamanio_lote, ocurrencias)
+
+        duracion = time.perf_counter() - inicio
+        filas_por_segundo = total_insertadas / duracion if duracion > 0 else 0.0
+        if rechazadas:
+            print(f"\u26A0 {rechazadas} celdas no se pudieron convertir.")
+        print(
+            f"\u2714 Carga por bloques terminada: {total_insertadas} obras "
+            f"en {duracion:.2f} s ({filas_por_segundo:,.0f} filas/s)."
         )
-        indicadores['monto_total_inversion'] = (
-            Obra.select(fn.SUM(Obra.Monto_contrato)).scalar() or 0
+        return total_insertadas
+
+    @classmethod
+    def cargar_csv_en_paralelo(cls, ruta_csv, trabajadores=None, tamanio_bloque=20_000, tamanio_lote=500):
+        """Carga el CSV normalizando sus bloques en `trabajadores` procesos.
+
+        Este proceso es el único que escribe: toma los bloques normalizados en el
+        orden del archivo, resuelve las dimensiones y los inserta con una sentencia
+        preparada, así que la base queda igual que con cargar_csv_por_bloques. Las
+        obras que ya estaban (misma Clave_origen) se actualizan si cambiaron, como
+        al sincronizar, así que se puede volver a correr sobre la misma base.
+        Devuelve cuántas obras se insertaron o actualizaron, o None si no carga
+        nada porque la base tiene obras sin Clave_origen (_obras_sin_clave_origen).
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        if cls._obras_sin_clave_origen():
+            return None
+        trabajadores = trabajadores or os.cpu_count() or 1
+        print(f"\U0001F4BB  Cargando CSV en paralelo con {trabajadores} procesos: {ruta_csv}")
+        inicio = time.perf_counter()
+        total_insertadas = 0
+        rechazadas = 0
+        ocurrencias = {}
+
+        # A lo sumo dos bloques por proceso en vuelo, para que la memoria no dependa del archivo
+        pendientes = deque()
+        with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+            for bloque in cls._leer_csv_por_bloques(ruta_csv, tamanio_bloque):
+                pendientes.append(pool.submit(normalizar_particion, bloque))
+                while len(pendientes) >= 2 * trabajadores:
+                    with instrumentacion.fase('espera_normalizacion'):
+                        filas, textos, errores = pendientes.popleft().result()
+                    rechazadas += sum(len(celdas) for celdas in errores.values())
+                    total_insertadas += cls._escribir_particion(
+                        filas, claves_origen(textos, ocurrencias), tamanio_lote)
+            while pendientes:
+                with instrumentacion.fase('espera_normalizacion'):
+                    filas, textos, errores = pendientes.popleft().result()
+                rechazadas += sum(len(celdas) for celdas in errores.values())
+                total_insertadas += cls._escribir_particion(
+                    filas, claves_origen(textos, ocurrencias), tamanio_lote)
+
+        foto_si_corresponde()
+        duracion = time.perf_counter() - inicio
+        filas_por_segundo = total_insertadas / duracion if duracion > 0 else 0.0
+        if rechazadas:
+            print(f"\u26A0 {rechazadas} celdas no se pudieron convertir.")
+        print(
+            f"\u2714 Carga en paralelo terminada: {total_insertadas} obras "
+            f"en {duracion:.2f} s ({filas_por_segundo:,.0f} filas/s)."
         )
+        return total_insertadas
+
+    @classmethod
+    def _escribir_particion(cls, filas, claves, tamanio_lote):
+        """Inserta o actualiza las filas de normalizar_particion, con su clave de
+        origen, en una transacción. Devuelve cuántas cambiaron en la base."""
+        registros = []
+        escritas = 0
+        try:
+            with sqlite_db.transaccion_medida():
+                with instrumentacion.fase('dimensiones'):
+                    cache_dimensiones.precargar()
+                    for (claves_fila, valores, error), clave in zip(filas, claves):
+                        try:
+                            fks = cls._resolver_dimensiones(claves_fila)
+                            if error:
+                                raise IntegrityError(error)
+                        except Exception as e:
+                            print(f"\u274C Error al insertar una obra: {e}")
+                            continue
+                        valores = (valores[:POSICION_CLAVE_ORIGEN] + (clave,)
+                                   + valores[POSICION_CLAVE_ORIGEN + 1:])
+                        registros.append(tuple(fks[campo.name] for campo in CAMPOS_FK_OBRA) + valores)
+                with instrumentacion.fase('insercion'):
+                    for lote in chunked(registros, tamanio_lote):
+                        cursor = sqlite_db.execute_sql(sql_insertar_obras(len(lote)),
+                                                       [valor for registro in lote for valor in registro])
+                        escritas += cursor.rowcount
+                Obra._registrar_escritura()
+        except Exception:
+            cache_dimensiones.invalidar()
+            raise
+        return escritas
+
+    # id de la conexión -> (conexión, version_datos(), indicadores) del último cálculo
+    # con ella: con el pool del servicio cada pedido puede tocarle otra conexión
+    _cache_indicadores = {}
 
+    @classmethod
+    def Obtener_indicadores(cls, usar_cache=True):
+        indicadores = cls.indicadores(usar_cache)
         print("\U0001F4CA Indicadores generados correctamente.")
         return indicadores
 
+    @classmethod
+    @instrumentacion.medida('indicadores')
+    def indicadores(cls, usar_cache=True):
+        """Arma todos los indicadores con una sola consulta UNION ALL sobre las
+        dimensiones y los resúmenes que los triggers mantienen al día, sin recorrer
+        Obras. El resultado se reutiliza, en cada conexión, mientras version_datos()
+        no cambie."""
+        conexion = sqlite_db.connection()
+        version = version_datos()
+        anterior = cls._cache_indicadores.get(id(conexion))
+        if usar_cache and anterior and anterior[0] is conexion and anterior[1] == version:
+            return anterior[2]
+
+        indicadores = cls.armar_indicadores(cls.consulta_indicadores())
+        cls._cache_indicadores[id(conexion)] = (conexion, version, indicadores)
+        return indicadores
+
+    @staticmethod
+    def consulta_indicadores():
+        """La consulta UNION ALL de indicadores: filas (tabla, id, descripción, valor, extra).
+        Sale de la base configurada; ciudades_obras.py la corre sobre otras bases."""
+        return (
+            Area_responsable.select(
+                Value('area'), Area_responsable.Id_Area_responsable, Area_responsable.Area,
+                Value(None), Value(None))
+            + Tipo_obra.select(
+                Value('tipo'), Tipo_obra.Id_Tipo_obra, Tipo_obra.Desc_tipo, Value(None), Value(None))
+            + Barrio.select(
+                Value('barrio'), Barrio.Id_barrio, Barrio.Barrio, Barrio.Comuna, Value(None)
+            ).where(Barrio.Comuna.in_([1, 2, 3]))
+            + Resumen_etapa.select(
+                Value('resumen_etapa'), Resumen_etapa.Id_Etapa, Etapa.Desc_etapa,
+                Resumen_etapa.Cantidad_obras, Resumen_etapa.Obras_plazo_24
+            ).join(Etapa, JOIN.LEFT_OUTER, on=(Resumen_etapa.Id_Etapa == Etapa.Id_Etapa))
+            + Resumen_tipo_obra.select(
+                Value('resumen_tipo'), Resumen_tipo_obra.Id_Tipo_obra, Tipo_obra.Desc_tipo,
+                Resumen_tipo_obra.Cantidad_obras, Resumen_tipo_obra.Monto_contrato
+            ).join(Tipo_obra, JOIN.LEFT_OUTER, on=(Resumen_tipo_obra.Id_Tipo_obra == Tipo_obra.Id_Tipo_obra))
+            + Resumen_total.select(
+                Value('resumen_total'), Resumen_total.Id_Resumen, Value(None),
+                Resumen_total.Cantidad_obras, Resumen_total.Monto_contrato)
+        ).tuples()
+
+    @staticmethod
+    def armar_indicadores(filas):
+        """Los indicadores a partir de las filas de consulta_indicadores()."""
+        areas, tipos, barrios, por_etapa, por_tipo = [], [], [], [], []
+        finalizadas_24_meses = 0
+        monto_total = 0
+        for tabla, id_, descripcion, valor, extra in filas:
+            if tabla == 'area':
+                areas.append({'id': id_, 'area': descripcion})
+            elif tabla == 'tipo':
+                tipos.append({'id': id_, 'tipo': descripcion})
+            elif tabla == 'barrio':
+                barrios.append({'id': id_, 'barrio': descripcion, 'id_comuna': valor})
+            elif tabla == 'resumen_etapa':
+                if id_ == 3:
+                    finalizadas_24_meses = extra
+                if descripcion is not None and valor:
+                    por_etapa.append({'id': id_, 'etapa': descripcion, 'cantidad_obras': valor})
+            elif tabla == 'resumen_tipo':
+                if descripcion is not None and valor:
+                    por_tipo.append({'id': id_, 'tipo': descripcion, 'cantidad_obras': valor,
+                                     'monto_por_tipo': extra})
+            else:
+                monto_total = extra
+
+        return {
+            'areas_responsables': sorted(areas, key=lambda fila: fila['id']),
+            'tipos_obra': sorted(tipos, key=lambda fila: fila['id']),
+            'obras_por_etapa': sorted(por_etapa, key=lambda fila: fila['id']),
+            'obras_y_monto_por_tipo': sorted(por_tipo, key=lambda fila: fila['id']),
+            'barrios_comunas_123': sorted(barrios, key=lambda fila: fila['id']),
+            'obras_finalizadas_en_24_meses': finalizadas_24_meses,
+            'monto_total_inversion': monto_total,
+        }
+
     @classmethod
     def cargar_datos(cls, df):
         if df is None:
             print("\u26A0 No se puede cargar datos: el DataFrame está vacío.")
             return
-        def convertir_a_int(valor):
-            try:
-                return int(valor)
-            except (ValueError, TypeError):
-                return 0
-        def convertir_a_float(valor):
-            try:
-                if isinstance(valor, str):
-                    valor = valor.replace(',', '.')
-                return float(valor)
-            except (ValueError, TypeError):
-                return 0.0
-        def parse_monto(monto_str):
-            import pandas as pd
-            if pd.isna(monto_str):
-                return 0.0
-            monto_str = str(monto_str).replace('$', '').replace(' ', '').replace('.', '').replace(',', '.')
-            try:
-                return float(monto_str)
-            except ValueError:
-                return 0.0
-        def fecha_o_none(valor):
-            fecha = pd.to_datetime(valor, errors='coerce')
-            return fecha.date() if pd.notna(fecha) else None
-        
+
         total_insertadas = 0
 
-        for _, fila in df.iterrows():
-            try:
-                entorno, _ = Entorno.get_or_create(Desc_entorno=fila['entorno'])
-                etapa, _ = Etapa.get_or_create(Desc_etapa=fila['etapa'])
-                valor_tipo_obra = fila['tipo'] or "No especificado"
-                tipo_obra, _ = Tipo_obra.get_or_create(Desc_tipo=valor_tipo_obra)
-                #tipo_obra, _ = Tipo_obra.get_or_create(Desc_tipo=fila['tipo'])
-                area_resp, _ = Area_responsable.get_or_create(Area=fila['area_responsable'])
-                valor_tipo_contratacion = fila['contratacion_tipo'] or "No especificado"
-                #tipo_contratacion, _ = Tipo_contratacion.get_or_create(Desc_contrataciones=fila['contratacion_tipo'])
-                tipo_contratacion, _ = Tipo_contratacion.get_or_create(Desc_contrataciones=valor_tipo_contratacion)
-                comuna, _ = Comuna.get_or_create(Comuna=fila['comuna'])
-                barrio, _ = Barrio.get_or_create(Barrio=fila['barrio'], Comuna=comuna)
-                valor_financiamiento = fila['financiamiento'] if fila['financiamiento'] else "No especificado"
-                financiamiento, _ = Financiamiento.get_or_create(Desc_financiamiento=valor_financiamiento)
-                nombre_empresa = fila['licitacion_oferta_empresa'] if fila['licitacion_oferta_empresa'] else "Empresa Desconocida"
-
-                nombre_empresa = fila['licitacion_oferta_empresa'] if fila['licitacion_oferta_empresa'] else "Empresa Desconocida"
-                cuit = fila['cuit_contratista'] if fila['cuit_contratista'] else "00-00000000-0"
-
-                empresa, _ = Empresa_licitadora.get_or_create(
-                    Empresa=nombre_empresa,
-                    defaults={'cuit_contratista': cuit}
-                )
-                
-
-                Obra.create(
-                    Entorno=entorno,
-                    Nombre_obra=fila['nombre'],
-                    Etapa=etapa,
-                    Tipo_obra=tipo_obra,
-                    Area_responsable=area_resp,
-                    Descripcion=fila['descripcion'],
-                    Monto_contrato=parse_monto(fila['monto_contrato']),
-                    Barrio=barrio,
-                    Direccion=fila['direccion'],
-                    Latitud=str(fila['lat']),
-                    Longitud=str(fila['lng']),
-                    #Fecha_inicio=pd.to_datetime(fila['fecha_inicio'], errors='coerce', dayfirst=True),
-                    #Fecha_fin_inicial=pd.to_datetime(fila['fecha_fin_inicial'], errors='coerce', dayfirst=True),
-                    Fecha_inicio=fecha_o_none(fila['fecha_inicio']),
-                    Fecha_fin_inicial=fecha_o_none(fila['fecha_fin_inicial']),
-                    #Plazo=convertir_a_float(fila['plazo_meses']) if fila['plazo_meses'] else 0,
-                    Plazo=parse_monto(fila['plazo_meses']),
-                    Porcentaje_avance=float(fila['porcentaje_avance']) if fila['porcentaje_avance'] else 0.0,
-                    Empresa_licitadora=empresa,
-                    año_licitacion=str(fila['licitacion_anio']),
-                    Tipo_contratacion=tipo_contratacion,
-                    Nro_contratacion=fila['nro_contratacion'],
-                    Mano_de_obra=convertir_a_int(fila['mano_obra']) if fila['mano_obra'] else 0,
-                    Compromiso=fila['compromiso'],
-                    Destacada=fila['destacada'],
-                    ba_elige=fila['ba_elige'],
-                    Expediente=fila['expediente-numero'],
-                    Financiamiento=financiamiento
-                )
-
-                total_insertadas += 1
+        # Fila por fila y sin transacción: la versión de la base se mira una sola vez
+        with cache_dimensiones.validado():
+            for fila in filas_para_carga(con_huellas(df)):
+                try:
+                    with instrumentacion.fase('dimensiones'):
+                        claves = claves_dimensiones(fila)
+                        entorno, _ = cache_dimensiones.obtener_o_crear(Entorno, Desc_entorno=claves['entorno'])
+                        etapa, _ = cache_dimensiones.obtener_o_crear(Etapa, Desc_etapa=claves['etapa'])
+                        tipo_obra, _ = cache_dimensiones.obtener_o_crear(Tipo_obra, Desc_tipo=claves['tipo_obra'])
+                        area_resp, _ = cache_dimensiones.obtener_o_crear(Area_responsable, Area=claves['area_responsable'])
+                        tipo_contratacion, _ = cache_dimensiones.obtener_o_crear(
+                            Tipo_contratacion, Desc_contrataciones=claves['tipo_contratacion'])
+                        comuna, _ = cache_dimensiones.obtener_o_crear(Comuna, Comuna=claves['comuna'])
+                        barrio, _ = cache_dimensiones.obtener_o_crear(Barrio, Barrio=claves['barrio'], Comuna=comuna)
+                        financiamiento, _ = cache_dimensiones.obtener_o_crear(
+                            Financiamiento, Desc_financiamiento=claves['financiamiento'])
+                        empresa, _ = cache_dimensiones.obtener_o_crear(
+                            Empresa_licitadora,
+                            Empresa=claves['empresa'],
+                            defaults={'cuit_contratista': claves['cuit']}
+                        )
+
+                    with instrumentacion.fase('insercion'):
+                        Obra.create(
+                            Entorno=entorno,
+                            Etapa=etapa,
+                            Tipo_obra=tipo_obra,
+                            Area_responsable=area_resp,
+                            Barrio=barrio,
+                            Empresa_licitadora=empresa,
+                            Tipo_contratacion=tipo_contratacion,
+                            Financiamiento=financiamiento,
+                            **datos_obra(fila)
+                        )
+
+                    total_insertadas += 1
+
+                except Exception as e:
+                    print(f"\u274C Error al insertar una obra: {e}")
+
+        foto_si_corresponde()
+        print(f"\u2714 Se cargaron correctamente {total_insertadas} obras.")
 
+    @classmethod
+    def _preparar_obras(cls, filas):
+        """Resuelve las dimensiones de cada fila y devuelve los datos de Obra listos
+        para insert_many. Las filas inválidas se informan y se saltean."""
+        for fila in filas:
+            try:
+                with instrumentacion.fase('dimensiones'):
+                    fks = cls._resolver_dimensiones(claves_dimensiones(fila))
+                datos = datos_obra(fila)
+                validar_no_nulos(datos)
+                datos.update({nombre: id_ for nombre, id_ in fks.items() if nombre in Obra._meta.fields})
             except Exception as e:
                 print(f"\u274C Error al insertar una obra: {e}")
+                continue
+            yield datos
+
+    @staticmethod
+    def _resolver_dimensiones(claves):
+        """Id de cada dimensión de la fila (nombre del modelo -> id), creando las que falten."""
+        fks = {}
+        for clave, modelo, campo in DIMENSIONES_CARGA:
+            valores = {campo.name: claves[clave]}
+            defaults = None
+            if modelo is Barrio:
+                valores['Comuna'] = fks['Comuna']
+            elif modelo is Empresa_licitadora:
+                defaults = {'cuit_contratista': claves['cuit']}
+            fks[modelo.__name__], _ = cache_dimensiones.obtener_o_crear(
+                modelo, defaults=defaults, **valores)
+        return fks
 
-        print(f"\u2714 Se cargaron correctamente {total_insertadas} obras.")
+    @classmethod
+    def cargar_datos_masivo(cls, df, tamanio_lote=500, ocurrencias=None):
+        """Carga el DataFrame resolviendo las dimensiones en memoria e insertando
+        las obras por lotes con insert_many dentro de una única transacción.
+        Deja la base con el mismo contenido que cargar_datos. Como cargar_datos,
+        es para una carga inicial: si las obras ya están (misma Clave_origen) falla
+        y no se carga nada; para volver a cargar el CSV, sincronizar_datos."""
+        if df is None:
+            print("\u26A0 No se puede cargar datos: el DataFrame está vacío.")
+            return 0
+
+        inicio = time.perf_counter()
+        total_insertadas = 0
+
+        try:
+            with sqlite_db.transaccion_medida():
+                # Una sola consulta por tabla de dimensión: clave natural -> id
+                with instrumentacion.fase('dimensiones'):
+                    cache_dimensiones.precargar()
+
+                lote = []
+                for datos in cls._preparar_obras(filas_para_carga(con_huellas(df, ocurrencias))):
+                    lote.append(datos)
+                    if len(lote) >= tamanio_lote:
+                        with instrumentacion.fase('insercion'):
+                            Obra.insert_many(lote).execute()
+                        total_insertadas += len(lote)
+                        lote = []
+
+                if lote:
+                    with instrumentacion.fase('insercion'):
+                        Obra.insert_many(lote).execute()
+                    total_insertadas += len(lote)
+        except Exception:
+            # Las filas creadas dentro de la transacción ya no existen
+            cache_dimensiones.invalidar()
+            raise
+
+        foto_si_corresponde()
+        duracion = time.perf_counter() - inicio
+        filas_por_segundo = total_insertadas / duracion if duracion > 0 else 0.0
+        print(
+            f"\u2714 Se cargaron correctamente {total_insertadas} obras "
+            f"en {duracion:.2f} s ({filas_por_segundo:,.0f} filas/s)."
+        )
+        estadisticas = cache_dimensiones.estadisticas()
+        print(
+            f"\U0001F5C2 Cache de dimensiones: {estadisticas['aciertos']} aciertos, "
+            f"{estadisticas['fallos']} fallos, {estadisticas['consultas']} consultas."
+        )
+        return total_insertadas
+
+    @classmethod
+    def sincronizar_datos(cls, df, marcar_ausentes=False, tamanio_lote=500):
+        """Sincroniza la base con el DataFrame de extraer_datos: inserta las obras
+        nuevas, actualiza con ON CONFLICT las que cambiaron y saltea las que ya
+        están iguales. Con marcar_ausentes, las obras que dejaron de figurar en
+        el CSV quedan con fecha en Baja_origen. Devuelve None, sin tocar la base,
+        si tiene obras cargadas antes de las claves de origen."""
+        if df is None:
+            print("\u26A0 No se puede cargar datos: el DataFrame está vacío.")
+            return None
+        return cls._sincronizar([df], marcar_ausentes, tamanio_lote)
+
+    @classmethod
+    def sincronizar_csv_por_bloques(cls, ruta_csv, tamanio_bloque=50_000, marcar_ausentes=False,
+                                    tamanio_lote=500):
+        return cls._sincronizar(
+            cls.extraer_datos_por_bloques(ruta_csv, tamanio_bloque), marcar_ausentes, tamanio_lote
+        )
+
+    @classmethod
+    def _obras_sin_clave_origen(cls):
+        """Avisa (y devuelve True) si ninguna obra de la base tiene Clave_origen, pero
+        hay obras: se cargaron antes de las claves de origen y sincronizar no las
+        reconocería en el CSV, las insertaría de nuevo. Si ya hubo una sincronización,
+        las obras sin clave son las creadas a mano y se dejan como están."""
+        if Obra.select().where(Obra.Clave_origen.is_null(False)).exists():
+            return False
+        previas = Obra.select().count()
+        if previas:
+            print(f"\u26A0 Las {previas} obras de la base se cargaron sin Clave_origen y se "
+                  f"duplicarían al sincronizar: cargue el CSV en una base nueva.")
+        return bool(previas)
+
+    @classmethod
+    def _sincronizar(cls, bloques, marcar_ausentes, tamanio_lote):
+        if cls._obras_sin_clave_origen():
+            return None
+        inicio = time.perf_counter()
+        # Clave de origen -> (hash, baja) de lo que ya se cargó desde el CSV
+        existentes = {
+            clave: (hash_origen, baja)
+            for clave, hash_origen, baja in Obra
+            .select(Obra.Clave_origen, Obra.Hash_origen, Obra.Baja_origen)
+            .where(Obra.Clave_origen.is_null(False))
+            .tuples()
+        }
+        ocurrencias = {}
+        presentes = set()
+        totales = {'nuevas': 0, 'actualizadas': 0, 'sin_cambios': 0, 'rechazadas': 0, 'ausentes': 0}
+
+        for df in bloques:
+            claves = cls._sincronizar_bloque(df, existentes, ocurrencias, totales, tamanio_lote)
+            if marcar_ausentes:
+                presentes.update(claves)
+
+        if marcar_ausentes:
+            ausentes = [clave for clave, (_, baja) in existentes.items()
+                        if baja is None and clave not in presentes]
+            hoy = datetime.date.today()
+            with sqlite_db.atomic():
+                for grupo in chunked(ausentes, tamanio_lote):
+                    Obra.update(Baja_origen=hoy).where(Obra.Clave_origen.in_(grupo)).execute()
+            totales['ausentes'] = len(ausentes)
+
+        foto_si_corresponde()
+        duracion = time.perf_counter() - inicio
+        print(
+            f"\U0001F504 Sincronización en {duracion:.2f} s: {totales['nuevas']} nuevas, "
+            f"{totales['actualizadas']} actualizadas, {totales['sin_cambios']} sin cambios, "
+            f"{totales['rechazadas']} rechazadas, {totales['ausentes']} ausentes."
+        )
+        return totales
+
+    @classmethod
+    def _sincronizar_bloque(cls, df, existentes, ocurrencias, totales, tamanio_lote):
+        df = con_huellas(df, ocurrencias)
+        claves = df['clave_origen'].tolist()
+        cambiadas = [existentes.get(clave) != (hash_origen, None)
+                     for clave, hash_origen in zip(claves, df['hash_origen'])]
+        df = df[cambiadas]
+        totales['sin_cambios'] += len(claves) - len(df)
+
+        # En conflicto se pisan todas las columnas salvo el id y la propia clave
+        campos = [campo for campo in Obra._meta.sorted_fields
+                  if campo is not Obra.Id_Obra and campo is not Obra.Clave_origen]
+
+        @instrumentacion.medida('insercion')
+        def escribir(lote):
+            (Obra
+             .insert_many(lote)
+             .on_conflict(conflict_target=[Obra.Clave_origen], preserve=campos)
+             .execute())
+            for datos in lote:
+                totales['actualizadas' if datos['Clave_origen'] in existentes else 'nuevas'] += 1
+                existentes[datos['Clave_origen']] = (datos['Hash_origen'], None)
+
+        escritas = 0
+        try:
+            with sqlite_db.transaccion_medida():
+                with instrumentacion.fase('dimensiones'):
+                    cache_dimensiones.precargar()
+                lote = []
+                for datos in cls._preparar_obras(filas_para_carga(df)):
+                    datos['Baja_origen'] = None
+                    lote.append(datos)
+                    if len(lote) >= tamanio_lote:
+                        escribir(lote)
+                        escritas += len(lote)
+                        lote = []
+                if lote:
+                    escribir(lote)
+                    escritas += len(lote)
+        except Exception:
+            cache_dimensiones.invalidar()
+            raise
+
+        totales['rechazadas'] += len(df) - escritas
+        return claves
 
     @classmethod
     def nueva_obra(cls):
@@ -294,8 +940,8 @@ class ControlObra(GestionarObra):
 
         barrio = pedir_y_validar_o_crear(Barrio, Barrio.Barrio, "Ingrese barrio de la obra: ", campos_extra=crear_barrio_con_comuna)
         direccion = input("Ingrese dirección donde se desarrolla la obra: ")
-        latitud = input("Ingrese latitud (ej: -34.6037): ")
-        longitud = input("Ingrese longitud (ej: -58.3816): ")
+        latitud = pedir_float("Ingrese latitud (ej: -34.6037): ")
+        longitud = pedir_float("Ingrese longitud (ej: -58.3816): ")
         año_licitacion = input("Ingrese año en que se licitó la obra: ")
         compromiso = pedir_si_no("¿Tiene compromiso?")
         ba_elige = pedir_si_no("¿Forma parte de BA Elige?")
@@ -339,11 +985,14 @@ class ControlObra(GestionarObra):
         input("🔹 Enter para incrementar mano de obra...")
         obra.incrementar_mano_obra()
 
-        input("🔹 Enter para finalizar la obra...")
-        obra.finalizar_obra()
-
-        input("🔹 Enter para rescindir la obra...")
-        obra.rescindir_obra()
+        # Finalizada y rescindida son etapas finales: se aplica una sola de las dos
+        cierre = ""
+        while cierre not in ("F", "R"):
+            cierre = input("🔹 ¿Finalizar (F) o rescindir (R) la obra? ").strip().upper()
+        if cierre == "F":
+            obra.finalizar_obra()
+        else:
+            obra.rescindir_obra()
 
     @classmethod
     def main(cls):
@@ -358,7 +1007,7 @@ class ControlObra(GestionarObra):
 
         print(df.head())
 
-        cls.cargar_datos(df)
+        cls.sincronizar_datos(df)
 
         print()
         print("Creamos la primer instancia de obra:")
@@ -369,33 +1018,36 @@ class ControlObra(GestionarObra):
         print()
         print()
         indicadores = ControlObra.Obtener_indicadores()
+        cls.mostrar_indicadores(indicadores)
 
+    @staticmethod
+    def mostrar_indicadores(indicadores):
         print("\n--- INDICADORES ---")
 
         # Mostrar áreas responsables
         print("\n\U0001F4C8 Áreas responsables:")
         for area in indicadores['areas_responsables']:
-            print(f"- {area.Id_Area_responsable} | {area.Area}")
+            print(f"- {area['id']} | {area['area']}")
 
         # Mostrar tipos de obra
         print("\n\U0001F4C8 Tipos de obra:")
         for tipo in indicadores['tipos_obra']:
-            print(f"- {tipo.Id_Tipo_obra} | {tipo.Desc_tipo}")
+            print(f"- {tipo['id']} | {tipo['tipo']}")
 
         # Obras por etapa
         print("\n\U0001F4C8 Obras por etapa:")
         for fila in indicadores['obras_por_etapa']:
-            print(f"- Etapa: {fila.Etapa.Desc_etapa} | Cantidad: {fila.cantidad_obras}")
+            print(f"- Etapa: {fila['etapa']} | Cantidad: {fila['cantidad_obras']}")
 
         # Obras y monto por tipo
         print("\n\U0001F4C8 Obras y monto por tipo:")
         for fila in indicadores['obras_y_monto_por_tipo']:
-            print(f"- Tipo: {fila.Tipo_obra.Desc_tipo} | Obras: {fila.cantidad_obras} | Monto total: ${fila.monto_por_tipo:,.2f}")
+            print(f"- Tipo: {fila['tipo']} | Obras: {fila['cantidad_obras']} | Monto total: ${fila['monto_por_tipo'] or 0:,.2f}")
 
         # Barrios de comunas 1, 2 y 3
         print("\n\U0001F4C8 Barrios en comunas 1, 2 y 3:")
         for barrio in indicadores['barrios_comunas_123']:
-            print(f"- {barrio.Barrio} (Comuna {barrio.Comuna.Id_Comuna})")
+            print(f"- {barrio['barrio']} (Comuna {barrio['id_comuna']})")
 
         # Obras finalizadas en 24 meses
         print(f"\n\U0001F4C8 Obras finalizadas en 24 meses: {indicadores['obras_finalizadas_en_24_meses']}")
@@ -0,0 +1,247 @@
+"""Instrumentación de la carga y las consultas: tiempos por fase, cantidad y
+latencia de las sentencias SQL y registro de consultas lentas.
+
+Está desactivada salvo que se llame a instrumentacion.activar() o se defina la
+variable de entorno OBRAS_INSTRUMENTACION (su valor, si es un número, es el
+umbral de consulta lenta en segundos). Desactivada, cada punto medido cuesta
+una comparación; no se toma ningún tiempo ni se guarda nada.
+
+    instrumentacion.activar(umbral_lenta_s=0.05)
+    ControlObra.cargar_csv_por_bloques(ruta)
+    print(instrumentacion.a_prometheus())
+"""
+import collections
+import contextlib
+import functools
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+from peewee import SqliteDatabase
+from playhouse.pool import PooledSqliteDatabase
+
+logger = logging.getLogger('obras.instrumentacion')
+
+UMBRAL_LENTA_S = 0.1
+MAXIMO_LENTAS = 100
+
+# Verbo y tabla principal de una sentencia, para agrupar sin depender de los parámetros
+_VERBO = re.compile(r'\s*(\w+)')
+_TABLA = re.compile(r'\b(?:FROM|INTO|UPDATE|TABLE|EXISTS|ON)\s+["`\[]?(\w+)', re.IGNORECASE)
+
+
+def clasificar_sql(sql):
+    """(verbo, tabla) de una sentencia: ('INSERT', 'Obras'), ('SELECT', 'Etapas')..."""
+    verbo = _VERBO.match(sql)
+    tabla = _TABLA.search(sql)
+    return (verbo.group(1).upper() if verbo else '?'), (tabla.group(1) if tabla else '')
+
+
+class _Acumulado:
+    __slots__ = ('cantidad', 'segundos', 'maximo')
+
+    def __init__(self):
+        self.cantidad = 0
+        self.segundos = 0.0
+        self.maximo = 0.0
+
+    def sumar(self, segundos):
+        self.cantidad += 1
+        self.segundos += segundos
+        if segundos > self.maximo:
+            self.maximo = segundos
+
+    def a_dict(self):
+        return {'cantidad': self.cantidad, 'segundos': round(self.segundos, 6),
+                'max_segundos': round(self.maximo, 6)}
+
+
+class _Fase:
+    """Context manager de Instrumentacion.fase cuando está activa."""
+    __slots__ = ('instrumentacion', 'nombre', 'inicio')
+
+    def __init__(self, instrumentacion, nombre):
+        self.instrumentacion = instrumentacion
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.instrumentacion._pila().append(self.nombre)
+        self.inicio = time.perf_counter()
+
+    def __exit__(self, *excepcion):
+        segundos = time.perf_counter() - self.inicio
+        self.instrumentacion._pila().pop()
+        with self.instrumentacion._lock:
+            self.instrumentacion.fases[self.nombre].sumar(segundos)
+
+
+class Instrumentacion:
+    def __init__(self):
+        self.activa = False
+        self.umbral_lenta_s = UMBRAL_LENTA_S
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reiniciar()
+
+    def activar(self, umbral_lenta_s=None):
+        if umbral_lenta_s is not None:
+            self.umbral_lenta_s = umbral_lenta_s
+        self.activa = True
+
+    def desactivar(self):
+        self.activa = False
+
+    def reiniciar(self):
+        with self._lock:
+            self.fases = collections.defaultdict(_Acumulado)
+            self.consultas = collections.defaultdict(_Acumulado)
+            self.lentas = collections.deque(maxlen=MAXIMO_LENTAS)
+            self.cantidad_lentas = 0
+
+    def _pila(self):
+        pila = getattr(self._local, 'pila', None)
+        if pila is None:
+            pila = self._local.pila = []
+        return pila
+
+    def fase_actual(self):
+        pila = self._pila()
+        return pila[-1] if pila else None
+
+    def registrar_fase(self, nombre, segundos):
+        if self.activa:
+            with self._lock:
+                self.fases[nombre].sumar(segundos)
+
+    def fase(self, nombre):
+        """Context manager que suma su duración a la fase `nombre`."""
+        if not self.activa:
+            return contextlib.nullcontext()
+        return _Fase(self, nombre)
+
+    def medida(self, nombre):
+        """Decorador: cada llamada a la función cuenta como una vez la fase `nombre`."""
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envoltura(*args, **kwargs):
+                if not self.activa:
+                    return funcion(*args, **kwargs)
+                with _Fase(self, nombre):
+                    return funcion(*args, **kwargs)
+            return envoltura
+        return decorador
+
+    def iterar(self, nombre, iterable):
+        """Recorre `iterable` sumando a la fase `nombre` lo que tarda en dar cada elemento
+        (para lectores por bloques, donde el trabajo está en el next())."""
+        iterador = iter(iterable)
+        while True:
+            if not self.activa:
+                yield from iterador
+                return
+            inicio = time.perf_counter()
+            try:
+                elemento = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                self.registrar_fase(nombre, time.perf_counter() - inicio)
+            yield elemento
+
+    def registrar_consulta(self, sql, params, segundos):
+        clave = clasificar_sql(sql)
+        lenta = segundos >= self.umbral_lenta_s
+        with self._lock:
+            self.consultas[clave].sumar(segundos)
+            if lenta:
+                self.cantidad_lentas += 1
+                self.lentas.append({'segundos': round(segundos, 6), 'sql': sql[:500],
+                                    'parametros': len(params or ()), 'fase': self.fase_actual()})
+        if lenta:
+            logger.warning('Consulta lenta (%.3f s, fase %s): %.200s', segundos, self.fase_actual(), sql)
+
+    def a_dict(self):
+        with self._lock:
+            return {
+                'fases': {nombre: acumulado.a_dict() for nombre, acumulado in sorted(self.fases.items())},
+                'consultas': [{'sentencia': verbo, 'tabla': tabla, **acumulado.a_dict()}
+                              for (verbo, tabla), acumulado in sorted(self.consultas.items())],
+                'umbral_lenta_s': self.umbral_lenta_s,
+                'cantidad_lentas': self.cantidad_lentas,
+                'consultas_lentas': list(self.lentas),
+            }
+
+    def a_json(self, **kwargs):
+        return json.dumps(self.a_dict(), ensure_ascii=False, **kwargs)
+
+    def a_prometheus(self, prefijo='obras'):
+        """Texto en el formato de exposición de Prometheus (contadores acumulados)."""
+        datos = self.a_dict()
+        lineas = []
+
+        def metrica(nombre, ayuda, muestras):
+            lineas.append(f'# HELP {prefijo}_{nombre} {ayuda}')
+            lineas.append(f'# TYPE {prefijo}_{nombre} counter')
+            for etiquetas, valor in muestras:
+                texto = ','.join(f'{clave}="{_escapar_etiqueta(v)}"' for clave, v in etiquetas.items())
+                lineas.append(f'{prefijo}_{nombre}{{{texto}}} {valor}' if texto else f'{prefijo}_{nombre} {valor}')
+
+        fases = datos['fases'].items()
+        metrica('fase_total', 'Veces que se ejecutó cada fase.',
+                [({'fase': nombre}, valores['cantidad']) for nombre, valores in fases])
+        metrica('fase_segundos_total', 'Tiempo acumulado en cada fase.',
+                [({'fase': nombre}, valores['segundos']) for nombre, valores in fases])
+        consultas = [({'sentencia': c['sentencia'], 'tabla': c['tabla']}, c) for c in datos['consultas']]
+        metrica('sql_consultas_total', 'Sentencias SQL ejecutadas.',
+                [(etiquetas, c['cantidad']) for etiquetas, c in consultas])
+        metrica('sql_segundos_total', 'Tiempo acumulado ejecutando sentencias SQL.',
+                [(etiquetas, c['segundos']) for etiquetas, c in consultas])
+        metrica('sql_lentas_total', f'Sentencias que tardaron {datos["umbral_lenta_s"]} s o más.',
+                [({}, datos['cantidad_lentas'])])
+        return '\n'.join(lineas) + '\n'
+
+
+def _escapar_etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+instrumentacion = Instrumentacion()
+if os.environ.get('OBRAS_INSTRUMENTACION'):
+    try:
+        instrumentacion.activar(float(os.environ['OBRAS_INSTRUMENTACION']))
+    except ValueError:
+        instrumentacion.activar()
+
+
+class _SentenciasMedidas:
+    """Mezcla para bases de peewee: con la instrumentación activa mide cada sentencia.
+    Cuenta el tiempo de ejecutarla y obtener la primera fila, no el de recorrer
+    el resto del cursor."""
+
+    def execute_sql(self, sql, params=None):
+        if not instrumentacion.activa:
+            return super().execute_sql(sql, params)
+        inicio = time.perf_counter()
+        try:
+            return super().execute_sql(sql, params)
+        finally:
+            instrumentacion.registrar_consulta(sql, params, time.perf_counter() - inicio)
+
+    @contextlib.contextmanager
+    def transaccion_medida(self):
+        """atomic() que además suma a la fase 'commit' lo que tarda en confirmarse."""
+        with self.atomic() as transaccion:
+            yield transaccion
+            inicio = time.perf_counter()
+        instrumentacion.registrar_fase('commit', time.perf_counter() - inicio)
+
+
+class SqliteInstrumentada(_SentenciasMedidas, SqliteDatabase):
+    pass
+
+
+class PooledSqliteInstrumentada(_SentenciasMedidas, PooledSqliteDatabase):
+    pass
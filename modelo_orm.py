@@ -1,48 +1,107 @@
 from peewee import *
+from peewee import Entity, NodeList
+from playhouse.migrate import SqliteMigrator, migrate
+import bisect
+import collections
+import contextlib
 import datetime
-# Conexión a la base de datos
-sqlite_db = SqliteDatabase(
-    r'C:\Users\Usuario\Desktop\TP Integrador POO\obras_urbanas.db',
-    pragmas={'journal_mode': 'wal'}
-)
+import functools
+import heapq
+import inspect
+import json
+import math
+import re
+import unicodedata
+
+from conexion import BaseConfigurable
+from instrumentacion import instrumentacion
+
+# Conexión a la base de datos: ruta, pool y PRAGMAs se cambian con
+# sqlite_db.configurar(...) (ver conexion.py; instrumentacion.py para medir sus consultas)
+sqlite_db = BaseConfigurable()
+sqlite_db.configurar()
 
 # Clase base
 class BaseModel(Model):
     class Meta:
         database = sqlite_db
 
+    # Escrituras hechas desde este proceso (ver version_datos)
+    escrituras = 0
+
+    # Toda escritura pasa por insert/update/delete: la contamos y avisamos al cache de dimensiones
+    @classmethod
+    def _registrar_escritura(cls):
+        BaseModel.escrituras += 1
+        cache_dimensiones.invalidar(cls)
+
+    @classmethod
+    def insert(cls, *args, **kwargs):
+        cls._registrar_escritura()
+        return super().insert(*args, **kwargs)
+
+    @classmethod
+    def insert_many(cls, *args, **kwargs):
+        cls._registrar_escritura()
+        return super().insert_many(*args, **kwargs)
+
+    @classmethod
+    def insert_from(cls, *args, **kwargs):
+        cls._registrar_escritura()
+        return super().insert_from(*args, **kwargs)
+
+    @classmethod
+    def update(cls, *args, **kwargs):
+        cls._registrar_escritura()
+        return super().update(*args, **kwargs)
+
+    @classmethod
+    def delete(cls, *args, **kwargs):
+        cls._registrar_escritura()
+        return super().delete(*args, **kwargs)
+
+
+def version_datos():
+    """Identifica el contenido actual de la base: cambia con cada escritura de este
+    proceso y con cada commit de otra conexión (PRAGMA data_version). data_version
+    solo se puede comparar dentro de una misma conexión, por eso va con ella
+    (con un pool, cada hilo puede estar usando otra)."""
+    conexion = sqlite_db.connection()
+    return (sqlite_db.database, BaseModel.escrituras, id(conexion),
+            conexion.execute('PRAGMA data_version').fetchone()[0])
+
 # Modelos
 class Etapa(BaseModel):
     Id_Etapa = IntegerField(primary_key=True)
-    Desc_etapa = TextField()
+    Desc_etapa = TextField(unique=True)
 
     class Meta:
         table_name = 'Etapas'
 
 class Entorno(BaseModel):
     Id_Entorno = IntegerField(primary_key=True)
-    Desc_entorno = TextField()
+    Desc_entorno = TextField(unique=True)
 
     class Meta:
         table_name = 'Entornos'
 
 class Tipo_obra(BaseModel):
     Id_Tipo_obra = IntegerField(primary_key=True)
-    Desc_tipo = TextField()
+    Desc_tipo = TextField(unique=True)
 
     class Meta:
         table_name = 'Tipos_obras'
 
 class Area_responsable(BaseModel):
     Id_Area_responsable = IntegerField(primary_key=True)
-    Area = TextField()
+    Area = TextField(unique=True)
 
     class Meta:
         table_name = 'Areas_Responsables'
 
 class Comuna(BaseModel):
     Id_Comuna = IntegerField(primary_key=True)
-    Comuna = TextField()
+    Comuna = TextField(unique=True)
 
     class Meta:
         table_name = 'Comunas'
@@ -54,17 +113,20 @@ class Barrio(BaseModel):
 
     class Meta:
         table_name = 'Barrios'
+        indexes = (
+            (('Barrio', 'Comuna'), True),
+        )
 
 class Tipo_contratacion(BaseModel):
     Id_Tipo_contratacione = IntegerField(primary_key=True)
-    Desc_contrataciones = TextField()
+    Desc_contrataciones = TextField(unique=True)
 
     class Meta:
         table_name = 'Tipos_contrataciones'
 
 class Empresa_licitadora(BaseModel):
     Id_Empresa_licitadora = IntegerField(primary_key=True)
-    Empresa = TextField()
+    Empresa = TextField(unique=True)
     cuit_contratista = CharField(null=True)
 
     class Meta:
@@ -72,7 +134,7 @@ class Empresa_licitadora(BaseModel):
 
 class Financiamiento(BaseModel):
     Id_Financiamiento = IntegerField(primary_key=True)
-    Desc_financiamiento= TextField(null=True)
+    Desc_financiamiento= TextField(null=True, unique=True)
 
     class Meta:
         table_name = 'Financiamientos'
@@ -88,8 +150,8 @@ class Obra(BaseModel):
     Monto_contrato = FloatField(null=True)
     Barrio = ForeignKeyField(Barrio, backref='obras', null=True)
     Direccion = TextField(null=True)
-    Latitud = TextField(null=True)
-    Longitud = TextField(null=True)
+    Latitud = FloatField(null=True)
+    Longitud = FloatField(null=True)
     Fecha_inicio = DateField(null=True)
     Fecha_fin_inicial = DateField(null=True)
     Financiamiento=ForeignKeyField(Financiamiento, backref='obras', null=True)
@@ -104,25 +166,24 @@ class Obra(BaseModel):
     Destacada = CharField(null=True)
     ba_elige = CharField(null=True)
     Expediente = TextField(null=True)
+    # Identificación de la fila del CSV de origen, para resincronizar sin duplicar
+    Clave_origen = CharField(null=True, unique=True)
+    Hash_origen = CharField(null=True)
+    Baja_origen = DateField(null=True)
     
     def nuevo_proyecto(self):
         print("\n\U0001F4CC Etapa: Nuevo Proyecto")
 
-        # Usamos tu lógica para validar o crear etapa "Proyecto"
-        etapa = Etapa.get_or_none(Etapa.Desc_etapa == "Proyecto")
-        if not etapa:
-            etapa = Etapa.create(Desc_etapa="Proyecto")
-            print("\u2705 Etapa 'Proyecto' creada y asignada.")
-        else:
-            print("\U0001F527 Etapa 'Proyecto' ya existente. Se asignará.")
-
-        self.Etapa = etapa
-        self.save()
-
-    print("\U0001F680 Se creó el nuevo proyecto (Etapa: Proyecto)")
+        existente = cache_dimensiones.obtener_id(Etapa, Desc_etapa="Proyecto") is not None
+        if self._transicion_interactiva('nuevo_proyecto'):
+            if existente:
+                print("\U0001F527 Etapa 'Proyecto' ya existente. Se asignó.")
+            else:
+                print("\u2705 Etapa 'Proyecto' creada y asignada.")
+            print("\U0001F680 Se creó el nuevo proyecto (Etapa: Proyecto)")
 
     def iniciar_contratacion(self):
-        from gestionar_obras import pedir_y_validar_o_crear
+        from gestionar_obras import pedir_y_validar_o_crear, pedir_float
         print("\n\U0001F4CC Iniciando contratación")
 
         tipo_contratacion = pedir_y_validar_o_crear(
@@ -130,41 +191,35 @@ class Obra(BaseModel):
             Tipo_contratacion.Desc_contrataciones,
             "Ingrese tipo de contratación: "
         )
-        monto_contratacion = input("Ingrese monto de contratación: ").strip()
+        monto_contratacion = pedir_float("Ingrese monto de contratación: ")
         nro_contratacion = input("Ingrese número de contratación: ").strip()
 
-        
-        self.Tipo_contratacion = tipo_contratacion
-        self.Monto_contrato = monto_contratacion
-        self.Nro_contratacion = nro_contratacion
-        self.save()
-
-        print("\u2705 Contratación registrada con éxito.")
+        if self._transicion_interactiva('iniciar_contratacion', tipo_contratacion=tipo_contratacion,
+                                        monto=monto_contratacion, nro_contratacion=nro_contratacion):
+            print("\u2705 Contratación registrada con éxito.")
 
     def adjudicar_obra(self):
         print("\n\U0001F4CC Adjudicando obra")
 
-        # Mostrar empresas existentes, pedir que elijan una que ya exista (sin crear)
-        while True:
-            print("\nEmpresas licitadoras disponibles:")
-            for empresa in Empresa_licitadora.select():
-                print(f"- {empresa.Empresa}")
+        from gestionar_obras import mostrar_opciones, elegir_sugerencia
 
-            empresa_nombre = input("Ingrese empresa licitadora (de la lista): ").strip()
-            empresa = Empresa_licitadora.get_or_none(Empresa_licitadora.Empresa == empresa_nombre)
+        # Pedir una empresa que ya exista (sin crear), sugiriendo a partir de lo escrito
+        mostrar_opciones(Empresa_licitadora, Empresa_licitadora.Empresa)
+        while True:
+            empresa_nombre = input("Ingrese empresa licitadora: ").strip()
+            empresa = cache_dimensiones.obtener_id(Empresa_licitadora, Empresa=empresa_nombre)
 
-            if empresa:
+            if empresa is None:
+                print("\u274C Empresa no encontrada.")
+                empresa = elegir_sugerencia(Empresa_licitadora, Empresa_licitadora.Empresa, empresa_nombre,
+                                            "Elija un número de la lista o Enter para reintentar: ")
+            if empresa is not None:
                 break
-            else:
-                print("\u274C Empresa no encontrada. Por favor, ingrese una empresa válida.")
 
         expediente = input("Ingrese número de expediente: ").strip()
 
-        self.Empresa_licitadora = empresa
-        self.Expediente = expediente
-        self.save()
-
-        print("\u2705 Obra adjudicada correctamente.")
+        if self._transicion_interactiva('adjudicar_obra', empresa=empresa, expediente=expediente):
+            print("\u2705 Obra adjudicada correctamente.")
     
     def iniciar_obra(self):
         from gestionar_obras import (pedir_y_validar_o_crear, pedir_int, pedir_fecha, pedir_si_no)
@@ -180,14 +235,10 @@ class Obra(BaseModel):
         )
         mano_obra = pedir_int("Ingrese cantidad de personas en obra: ")
 
-        self.Destacada = destacada
-        self.Fecha_inicio = fecha_inicio
-        self.Fecha_fin_inicial = fecha_fin_inicial
-        self.Financiamiento = financiamiento
-        self.Mano_de_obra = mano_obra
-        self.save()
-
-        print("\u2705 Obra iniciada correctamente.")
+        if self._transicion_interactiva('iniciar_obra', destacada=destacada, fecha_inicio=fecha_inicio,
+                                        fecha_fin_inicial=fecha_fin_inicial, financiamiento=financiamiento,
+                                        mano_obra=mano_obra):
+            print("\u2705 Obra iniciada correctamente.")
 
     def actualizar_porcentaje_avance(self):
         from gestionar_obras import pedir_float
@@ -195,10 +246,8 @@ class Obra(BaseModel):
 
         porcentaje = pedir_float("Ingrese porcentaje de avance (ej: 42.5): ")
 
-        self.Porcentaje_avance = porcentaje
-        self.save()
-
-        print(f"\u2705 Porcentaje de avance actualizado a {porcentaje}%.")
+        if self._transicion_interactiva('actualizar_porcentaje_avance', porcentaje=porcentaje):
+            print(f"\u2705 Porcentaje de avance actualizado a {porcentaje}%.")
 
     def incrementar_plazo(self):
         from gestionar_obras import pedir_int
@@ -207,10 +256,8 @@ class Obra(BaseModel):
 
         nuevo_plazo = pedir_float("Ingrese plazo (en días): ")
 
-        self.Plazo = nuevo_plazo
-        self.save()
-
-        print(f"\u2705 Plazo actualizado a {nuevo_plazo} días.") 
+        if self._transicion_interactiva('incrementar_plazo', plazo=nuevo_plazo):
+            print(f"\u2705 Plazo actualizado a {nuevo_plazo} días.") 
 
     def incrementar_mano_obra(self):
         from gestionar_obras import pedir_int
@@ -218,33 +265,1586 @@ class Obra(BaseModel):
 
         nueva_mano_obra = pedir_int("Ingrese nueva cantidad de mano de obra: ")
 
-        self.Mano_de_obra = nueva_mano_obra
-        self.save()
-
-        print(f"\u2705 Mano de obra actualizada a {nueva_mano_obra}personas.") 
+        if self._transicion_interactiva('incrementar_mano_obra', mano_obra=nueva_mano_obra):
+            print(f"\u2705 Mano de obra actualizada a {nueva_mano_obra}personas.") 
 
     def finalizar_obra(self):
         print("\n\U0001F4CC Finalizando obra")
 
-        # Buscar la etapa "Finalizada" (si no existe, crearla)
-        etapa_finalizada, creada = Etapa.get_or_create(Desc_etapa="Finalizada")
-
-        # Actualizar la etapa de la obra
-        self.Etapa = etapa_finalizada
-        self.save()
+        # Pasa a la etapa "Finalizada" (si no existe, se crea)
+        self._transicion_interactiva('finalizar_obra')
 
     def rescindir_obra(self):
         print("\n\U0001F4CC Rescindiendo obra")
 
-        # Buscar la etapa "Rescindida", y si no existe, crearla
-        etapa_rescindida, creada = Etapa.get_or_create(Desc_etapa="Rescisión")
+        # Pasa a la etapa "Rescisión" (si no existe, se crea)
+        if self._transicion_interactiva('rescindir_obra'):
+            print("\u2705 Obra marcada como rescindida.")       
+
+    # Ciclo de vida sin input(): cada transición de TRANSICIONES valida el estado
+    # de la obra y escribe solo las columnas que cambia.
+    @instrumentacion.medida('transicion')
+    def aplicar_transicion(self, nombre, **datos):
+        """Aplica una transición a esta obra con un UPDATE parcial.
+        Lanza TransicionInvalida si no corresponde en el estado actual."""
+        estado = {campo: self.__data__.get(campo) for campo in CAMPOS_ESTADO}
+        estado['Id_Obra'] = self.Id_Obra
+        registro = dict(datos, obra=self.Id_Obra, transicion=nombre)
+        cambios = _calcular_transicion({self.Id_Obra: estado}, registro)
+        type(self).update(cambios).where(type(self).Id_Obra == self.Id_Obra).execute()
+        for campo, valor in cambios.items():
+            setattr(self, campo, valor)
+        return cambios
 
-        # Actualizar la etapa de la obra
-        self.Etapa = etapa_rescindida
-        self.save()
+    def _transicion_interactiva(self, nombre, **datos):
+        try:
+            self.aplicar_transicion(nombre, **datos)
+        except TransicionInvalida as e:
+            print(f"\u274C No se pudo aplicar '{nombre}': {e}")
+            return False
+        return True
+
+    @classmethod
+    def aplicar_transiciones(cls, registros, estricto=False, tamanio_lote=500):
+        """Aplica muchas transiciones en una única transacción.
+
+        `registros` son dicts {'obra': id, 'transicion': nombre, **argumentos},
+        que se validan en orden (varias transiciones de una misma obra ven el
+        estado que dejaron las anteriores). Al final se escribe, por columna,
+        un UPDATE ... WHERE Id_Obra IN (...) por lote de obras.
+        Devuelve {'aplicadas', 'obras', 'rechazadas': [(registro, motivo)]};
+        con estricto=True la primera transición inválida cancela todo.
+        """
+        registros = list(registros)
+        aplicadas = 0
+        rechazadas = []
+        cambios = {}
+        try:
+            with sqlite_db.transaccion_medida():
+                with instrumentacion.fase('lectura_estados'):
+                    estados = cls._estados({registro.get('obra') for registro in registros}, tamanio_lote)
+                with instrumentacion.fase('validacion'):
+                    for registro in registros:
+                        try:
+                            nuevos = _calcular_transicion(estados, registro)
+                        except TransicionInvalida as e:
+                            if estricto:
+                                raise
+                            rechazadas.append((registro, str(e)))
+                            continue
+                        estados[registro['obra']].update(nuevos)
+                        cambios.setdefault(registro['obra'], {}).update(nuevos)
+                        aplicadas += 1
+                with instrumentacion.fase('actualizacion'):
+                    _actualizar_obras(cambios, tamanio_lote)
+        except Exception:
+            # Las dimensiones creadas dentro de la transacción ya no existen
+            cache_dimensiones.invalidar()
+            raise
+        foto_si_corresponde()
+        return {'aplicadas': aplicadas, 'obras': len(cambios), 'rechazadas': rechazadas}
+
+    @classmethod
+    def _estados(cls, ids, tamanio_lote):
+        """Columnas CAMPOS_ESTADO de las obras pedidas, por id."""
+        ids = [id_ for id_ in ids if isinstance(id_, int)]
+        columnas = [cls.Id_Obra] + [cls._meta.fields[campo] for campo in CAMPOS_ESTADO]
+        estados = {}
+        for grupo in chunked(ids, tamanio_lote):
+            for fila in cls.select(*columnas).where(cls.Id_Obra.in_(grupo)).dicts():
+                estados[fila['Id_Obra']] = fila
+        return estados
+
+    # Consultas espaciales sobre la tabla R*Tree Obras_rtree (ver crear_indice_espacial).
+    # Devuelven obras livianas: solo Id_Obra, Nombre_obra, Direccion, Latitud y Longitud;
+    # el resto de los campos se obtiene con Obra.get_by_id.
+    @classmethod
+    @instrumentacion.medida('busqueda_espacial')
+    def en_rectangulo(cls, lat_min, lng_min, lat_max, lng_max):
+        """Obras con coordenadas dentro del rectángulo (en grados)."""
+        return [cls._liviana(fila) for fila in _en_caja(lat_min, lng_min, lat_max, lng_max)
+                if lat_min <= fila[3] <= lat_max and lng_min <= fila[4] <= lng_max]
+
+    @classmethod
+    @instrumentacion.medida('busqueda_espacial')
+    def en_radio(cls, lat, lng, metros):
+        """Obras a `metros` o menos del punto, de la más cercana a la más lejana.
+        Cada obra trae su distancia en metros en el atributo `distancia`."""
+        return [cls._liviana(fila, distancia) for distancia, fila in _cercanas(lat, lng, metros)]
+
+    @classmethod
+    @instrumentacion.medida('busqueda_espacial')
+    def mas_cercanas(cls, lat, lng, k=10):
+        """Las k obras más cercanas al punto, con su `distancia` en metros."""
+        def contar(metros):
+            return _contar_en_caja(*_caja_alrededor(lat, lng, metros))
+
+        # Se agranda la caja contando solo en el R*Tree hasta que tenga al menos k obras...
+        radio = RADIO_BUSQUEDA_INICIAL_M
+        cantidad = contar(radio)
+        while cantidad < k and radio < math.pi * RADIO_TIERRA_M:
+            radio *= 2
+            cantidad = contar(radio)
+        # ...y si quedó muy cargada (un punto lejos de todo) se la achica por bisección
+        menor = radio / 2
+        for _ in range(8):
+            if cantidad <= 4 * k:
+                break
+            medio = (menor + radio) / 2
+            cantidad_medio = contar(medio)
+            if cantidad_medio >= k:
+                radio, cantidad = medio, cantidad_medio
+            else:
+                menor = medio
+        candidatas = _por_distancia(lat, lng, _en_caja(*_caja_alrededor(lat, lng, radio)))
+        # La k-ésima de la caja puede estar en una esquina, más allá de `radio`:
+        # el círculo hasta ella contiene k obras, así que las k más cercanas están en su caja
+        if len(candidatas) >= k and candidatas[k - 1][0] > radio:
+            candidatas = _cercanas(lat, lng, candidatas[k - 1][0])
+        return [cls._liviana(fila, distancia) for distancia, fila in candidatas[:k]]
 
-        print("\u2705 Obra marcada como rescindida.")       
+    @classmethod
+    @instrumentacion.medida('busqueda_texto')
+    def buscar(cls, texto, limite=20):
+        """Obras que contienen todas las palabras de `texto` (o palabras que empiezan
+        con ellas) en el nombre, la descripción o la dirección, sin distinguir
+        mayúsculas ni acentos. Vienen ordenadas por relevancia y cada una trae
+        en `fragmento` el pedazo de texto donde aparecieron."""
+        consulta = consulta_fts(texto)
+        if not consulta:
+            return []
+        return list(cls.raw(_SQL_BUSCAR, consulta, limite))
 
+    @classmethod
+    def _liviana(cls, fila, distancia=None):
+        id_, nombre, direccion, latitud, longitud = fila
+        obra = cls(Id_Obra=id_, Nombre_obra=nombre, Direccion=direccion, Latitud=latitud, Longitud=longitud)
+        if distancia is not None:
+            obra.distancia = distancia
+        return obra
+
+    # Recorridos de solo lectura para reportes que pasan por todas las obras:
+    # no arman instancias del modelo (ver registro_compacto y CAMPOS_NUMERICOS).
+    @classmethod
+    def recorrer(cls, campos=None, filtro=None, tamanio_lote=10_000, limite=None):
+        """Obras como namedtuples livianas, en orden de Id_Obra.
+
+        `campos` son nombres o campos de Obra (por defecto todos), `filtro` una
+        expresión de peewee y `limite` la cantidad máxima de obras. Las FK vienen como códigos enteros (Etapa_id,
+        Barrio_id, ...) y las fechas como texto ISO, tal como las guarda SQLite.
+        """
+        campos = [cls._meta.fields[campo] if isinstance(campo, str) else campo
+                  for campo in (campos or cls._meta.sorted_fields)]
+        Registro = registro_compacto(tuple(campo.column_name for campo in campos))
+        consulta = cls.select(*campos).order_by(cls.Id_Obra)
+        if filtro is not None:
+            consulta = consulta.where(filtro)
+        if limite is not None:
+            consulta = consulta.limit(limite)
+            tamanio_lote = min(tamanio_lote, limite or 1)
+        cursor = sqlite_db.execute(consulta)
+        while True:
+            filas = cursor.fetchmany(tamanio_lote)
+            if not filas:
+                return
+            yield from map(Registro._make, filas)
+
+    @classmethod
+    @instrumentacion.medida('columnas_numericas')
+    def columnas_numericas(cls, filtro=None):
+        """Arreglo estructurado de NumPy con Id_Obra, los códigos de las FK y
+        CAMPOS_NUMERICOS. Los reales nulos quedan en NaN; las FK y los enteros
+        nulos, en SIN_CODIGO."""
+        import numpy as np
+
+        campos = ([cls.Id_Obra] + [campo for campo in cls._meta.sorted_fields if isinstance(campo, ForeignKeyField)]
+                  + [cls._meta.fields[nombre] for nombre in CAMPOS_NUMERICOS])
+        tipos = [(campo.column_name, _TIPOS_NUMPY.get(type(campo), 'i4')) for campo in campos]
+        columnas = [campo if isinstance(campo, FloatField) else fn.IFNULL(campo, SIN_CODIGO) for campo in campos]
+        consulta = cls.select(*columnas).order_by(cls.Id_Obra)
+        if filtro is not None:
+            consulta = consulta.where(filtro)
+        return np.fromiter(sqlite_db.execute(consulta), dtype=np.dtype(tipos))
+
+    # Consultas sobre el historial de cambios (ver CAMPOS_HISTORIAL)
+    @classmethod
+    def historial(cls, id_obra, campo=None):
+        """Los eventos de la obra, del más viejo al más nuevo, como namedtuples con
+        Fecha, Campo, Valor_anterior y Valor_nuevo; solo los de `campo` si se indica."""
+        consulta = (Evento_obra
+                    .select(Evento_obra.Fecha, Evento_obra.Campo, Evento_obra.Valor_anterior,
+                            Evento_obra.Valor_nuevo)
+                    .where(Evento_obra.Id_Obra == id_obra)
+                    .order_by(Evento_obra.Fecha, Evento_obra.Id_Evento))
+        if campo is not None:
+            consulta = consulta.where(Evento_obra.Campo == campo)
+        return list(consulta.namedtuples())
+
+    @classmethod
+    def curva_avance(cls, id_obra):
+        """[(fecha, porcentaje)] con cada valor que tuvo el avance de la obra."""
+        return [(evento.Fecha, evento.Valor_nuevo)
+                for evento in cls.historial(id_obra, 'Porcentaje_avance')]
+
+    @classmethod
+    @instrumentacion.medida('historial')
+    def cambios_de_etapa(cls, desde, hasta):
+        """Cambios de etapa entre `desde` y `hasta` (fechas u horas UTC, inclusive),
+        en orden, como namedtuples con Fecha, Id_Obra, Valor_anterior y Valor_nuevo
+        (ids de Etapa). Incluye las altas con etapa."""
+        return list(Evento_obra
+                    .select(Evento_obra.Fecha, Evento_obra.Id_Obra, Evento_obra.Valor_anterior,
+                            Evento_obra.Valor_nuevo)
+                    .where((Evento_obra.Campo == 'Etapa')
+                           & Evento_obra.Fecha.between(_instante_historial(desde),
+                                                       _instante_historial(hasta, fin_del_dia=True))
+                           & Evento_obra.Valor_nuevo.is_null(False))
+                    .order_by(Evento_obra.Fecha, Evento_obra.Id_Evento)
+                    .namedtuples())
+
+    @classmethod
+    @instrumentacion.medida('historial')
+    def estado_al(cls, fecha):
+        """{id_obra: {campo: valor}} con los CAMPOS_HISTORIAL de cada obra en `fecha`
+        (una fecha sola vale hasta el final del día, UTC). Parte de la última foto
+        anterior y aplica solo los eventos registrados después de ella."""
+        hasta = _instante_historial(fecha, fin_del_dia=True)
+        foto = (Foto_historial.select()
+                .where(Foto_historial.Fecha <= hasta)
+                .order_by(Foto_historial.Fecha.desc(), Foto_historial.Id_Foto.desc())
+                .first())
+        estados = {}
+        eventos = Evento_obra.select(Evento_obra.Id_Obra, Evento_obra.Campo, Evento_obra.Valor_nuevo)
+        if foto is None:
+            eventos = eventos.where(Evento_obra.Campo.in_(CAMPOS_HISTORIAL) & (Evento_obra.Fecha <= hasta))
+        else:
+            columnas = [Estado_foto._meta.fields[campo] for campo in CAMPOS_HISTORIAL]
+            for id_, *valores in (Estado_foto.select(Estado_foto.Id_Obra, *columnas)
+                                  .where(Estado_foto.Id_Foto == foto.Id_Foto).tuples()):
+                estados[id_] = dict(zip(CAMPOS_HISTORIAL, valores))
+            desde = _instante_historial(foto.Fecha)
+            eventos = eventos.where(Evento_obra.Campo.in_(CAMPOS_HISTORIAL)
+                                    & Evento_obra.Fecha.between(desde, hasta)
+                                    & (Evento_obra.Id_Evento > foto.Ultimo_evento))
+        for id_, campo, valor in eventos.order_by(Evento_obra.Id_Evento).tuples():
+            estado = estados.get(id_)
+            if estado is None:
+                estado = estados[id_] = dict.fromkeys(CAMPOS_HISTORIAL)
+            estado[campo] = valor
+        return estados
+
+    @classmethod
+    def listado(cls, orden='id', descendente=False):
+        """ListadoObras para filtrar y paginar las obras (ver ListadoObras)."""
+        return ListadoObras(orden, descendente)
 
     class Meta:
         table_name = 'Obras'
+        # Índices pensados para las consultas de Obtener_indicadores
+        indexes = (
+            (('Etapa', 'Plazo'), False),
+            (('Tipo_obra', 'Monto_contrato'), False),
+        )
+
+
+# Transiciones del ciclo de vida de una obra
+class TransicionInvalida(ValueError):
+    """La transición no se puede aplicar a la obra en su estado actual."""
+
+
+# Etapas de obras terminadas y de obras en curso (None: todavía sin etapa)
+ETAPAS_CERRADAS = ('Finalizada', 'Rescisión', 'Desestimada', 'Finalizada/desestimada')
+ETAPAS_ABIERTAS = (None, 'Proyecto', 'En licitación', 'En ejecución', 'En obra', 'En curso',
+                   'Paralizada', 'Neutralizada')
+# Etapas desde las que se puede aplicar cada transición. Avance, plazo y mano de
+# obra se corrigen en cualquier etapa, también en obras ya terminadas.
+TODAS_LAS_ETAPAS = None
+ETAPAS_PERMITIDAS = {
+    'nuevo_proyecto': (None, 'Proyecto'),
+    'iniciar_contratacion': (None, 'Proyecto', 'En licitación'),
+    'adjudicar_obra': (None, 'Proyecto', 'En licitación'),
+    'iniciar_obra': ETAPAS_ABIERTAS,
+    'actualizar_porcentaje_avance': TODAS_LAS_ETAPAS,
+    'incrementar_plazo': TODAS_LAS_ETAPAS,
+    'incrementar_mano_obra': TODAS_LAS_ETAPAS,
+    'finalizar_obra': ETAPAS_ABIERTAS,
+    'rescindir_obra': ETAPAS_ABIERTAS,
+}
+# Columnas de la obra que consultan las validaciones
+CAMPOS_ESTADO = ('Etapa', 'Plazo', 'Fecha_inicio')
+
+
+def _id_dimension(modelo, valor, crear=True):
+    """Id de la dimensión a partir de su id (que tiene que existir) o de su
+    descripción (que se crea si hace falta)."""
+    if isinstance(valor, int):
+        if not cache_dimensiones.existe_id(modelo, valor):
+            raise TransicionInvalida(f"no existe {modelo.__name__} {valor}")
+        return valor
+    if not valor:
+        raise TransicionInvalida(f"falta {modelo.__name__}")
+    campo = CLAVES_NATURALES[modelo][0]
+    if crear:
+        return cache_dimensiones.obtener_o_crear(modelo, **{campo: valor})[0]
+    id_ = cache_dimensiones.obtener_id(modelo, **{campo: valor})
+    if id_ is None:
+        raise TransicionInvalida(f"no existe {modelo.__name__} '{valor}'")
+    return id_
+
+
+def _numero(valor, nombre, minimo=None, maximo=None, entero=False):
+    try:
+        numero = float(valor)
+    except (TypeError, ValueError):
+        numero = math.nan
+    if not math.isfinite(numero):
+        raise TransicionInvalida(f"{nombre} inválido: {valor!r}")
+    if entero:
+        if numero != int(numero):
+            raise TransicionInvalida(f"{nombre} debe ser entero: {valor!r}")
+        numero = int(numero)
+    if minimo is not None and numero < minimo:
+        raise TransicionInvalida(f"{nombre} no puede ser menor a {minimo}: {valor!r}")
+    if maximo is not None and numero > maximo:
+        raise TransicionInvalida(f"{nombre} no puede ser mayor a {maximo}: {valor!r}")
+    return numero
+
+
+def _fecha(valor, nombre):
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, datetime.date):
+        return valor
+    try:
+        return datetime.datetime.strptime(valor, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise TransicionInvalida(f"{nombre} inválida (use AAAA-MM-DD): {valor!r}") from None
+
+
+def _nuevo_proyecto(estado):
+    return {'Etapa': _id_dimension(Etapa, "Proyecto")}
+
+
+def _iniciar_contratacion(estado, tipo_contratacion, monto, nro_contratacion):
+    monto = _numero(monto, 'monto', minimo=0)
+    return {
+        'Tipo_contratacion': _id_dimension(Tipo_contratacion, tipo_contratacion),
+        'Monto_contrato': monto,
+        'Nro_contratacion': str(nro_contratacion),
+    }
+
+
+def _adjudicar_obra(estado, empresa, expediente):
+    # Solo se adjudica a empresas que ya existen
+    return {
+        'Empresa_licitadora': _id_dimension(Empresa_licitadora, empresa, crear=False),
+        'Expediente': str(expediente),
+    }
+
+
+def _iniciar_obra(estado, destacada, fecha_inicio, fecha_fin_inicial, financiamiento, mano_obra):
+    if destacada not in ("SI", "NO"):
+        raise TransicionInvalida(f"destacada debe ser 'SI' o 'NO': {destacada!r}")
+    inicio = _fecha(fecha_inicio, 'fecha de inicio')
+    fin = _fecha(fecha_fin_inicial, 'fecha de finalización')
+    if fin < inicio:
+        raise TransicionInvalida(f"la finalización ({fin}) es anterior al inicio ({inicio})")
+    mano_obra = _numero(mano_obra, 'mano de obra', minimo=0, entero=True)
+    return {
+        'Destacada': destacada,
+        'Fecha_inicio': inicio,
+        'Fecha_fin_inicial': fin,
+        'Financiamiento': _id_dimension(Financiamiento, financiamiento),
+        'Mano_de_obra': mano_obra,
+    }
+
+
+def _actualizar_porcentaje_avance(estado, porcentaje):
+    return {'Porcentaje_avance': _numero(porcentaje, 'porcentaje', minimo=0, maximo=100)}
+
+
+def _incrementar_plazo(estado, plazo):
+    # Un incremento no puede dejar el plazo por debajo del actual
+    return {'Plazo': _numero(plazo, 'plazo', minimo=estado['Plazo'] or 0)}
+
+
+def _incrementar_mano_obra(estado, mano_obra):
+    return {'Mano_de_obra': _numero(mano_obra, 'mano de obra', minimo=0, entero=True)}
+
+
+def _finalizar_obra(estado):
+    return {'Etapa': _id_dimension(Etapa, "Finalizada")}
+
+
+def _rescindir_obra(estado):
+    return {'Etapa': _id_dimension(Etapa, "Rescisión")}
+
+
+TRANSICIONES = {
+    'nuevo_proyecto': _nuevo_proyecto,
+    'iniciar_contratacion': _iniciar_contratacion,
+    'adjudicar_obra': _adjudicar_obra,
+    'iniciar_obra': _iniciar_obra,
+    'actualizar_porcentaje_avance': _actualizar_porcentaje_avance,
+    'incrementar_plazo': _incrementar_plazo,
+    'incrementar_mano_obra': _incrementar_mano_obra,
+    'finalizar_obra': _finalizar_obra,
+    'rescindir_obra': _rescindir_obra,
+}
+_FIRMAS_TRANSICIONES = {nombre: inspect.signature(funcion) for nombre, funcion in TRANSICIONES.items()}
+
+
+def _calcular_transicion(estados, registro):
+    """Valida el registro contra el estado de su obra y devuelve {campo: valor nuevo}."""
+    datos = dict(registro)
+    id_ = datos.pop('obra', None)
+    nombre = datos.pop('transicion', None)
+    if nombre not in TRANSICIONES:
+        raise TransicionInvalida(f"transición desconocida: {nombre!r}")
+    estado = estados.get(id_) if isinstance(id_, int) else None
+    if estado is None:
+        raise TransicionInvalida(f"no existe la obra {id_!r}")
+    try:
+        _FIRMAS_TRANSICIONES[nombre].bind(estado, **datos)
+    except TypeError as e:
+        raise TransicionInvalida(f"{nombre}: {e}") from None
+    permitidas = ETAPAS_PERMITIDAS[nombre]
+    if permitidas is not TODAS_LAS_ETAPAS:
+        if estado['Etapa'] is None:
+            permitida = None in permitidas
+        else:
+            permitida = any(estado['Etapa'] == cache_dimensiones.obtener_id(Etapa, Desc_etapa=descripcion)
+                            for descripcion in permitidas if descripcion)
+        if not permitida:
+            actual = Etapa.select(Etapa.Desc_etapa).where(Etapa.Id_Etapa == estado['Etapa']).scalar()
+            raise TransicionInvalida(f"{nombre} no se aplica a la obra {id_}, en etapa '{actual}'")
+    return TRANSICIONES[nombre](estado, **datos)
+
+
+def _actualizar_obras(cambios, tamanio_lote):
+    """Escribe {id_obra: {campo: valor}} con UPDATE parciales: por cada columna y lote
+    de obras, SET columna = ? si todas reciben el mismo valor, o un CASE Id_Obra si no."""
+    por_campo = {}
+    for id_, campos in cambios.items():
+        for nombre, valor in campos.items():
+            por_campo.setdefault(nombre, {})[id_] = valor
+    for nombre, valores in por_campo.items():
+        campo = Obra._meta.fields[nombre]
+        for ids in chunked(sorted(valores), tamanio_lote):
+            distintos = {valores[id_] for id_ in ids}
+            if len(distintos) == 1:
+                nuevo = distintos.pop()
+            else:
+                nuevo = Case(Obra.Id_Obra, [(id_, campo.db_value(valores[id_])) for id_ in ids])
+            Obra.update({campo: nuevo}).where(Obra.Id_Obra.in_(ids)).execute()
+
+
+# Resúmenes de Obras que mantienen los triggers de crear_triggers_resumen
+class Resumen_etapa(BaseModel):
+    Id_Etapa = IntegerField(primary_key=True)
+    Cantidad_obras = IntegerField(default=0)
+    Obras_plazo_24 = IntegerField(default=0)
+
+    class Meta:
+        table_name = 'Resumenes_etapas'
+
+class Resumen_tipo_obra(BaseModel):
+    Id_Tipo_obra = IntegerField(primary_key=True)
+    Cantidad_obras = IntegerField(default=0)
+    Monto_contrato = FloatField(default=0)
+
+    class Meta:
+        table_name = 'Resumenes_tipos_obras'
+
+class Resumen_total(BaseModel):
+    Id_Resumen = IntegerField(primary_key=True)
+    Cantidad_obras = IntegerField(default=0)
+    Monto_contrato = FloatField(default=0)
+
+    class Meta:
+        table_name = 'Resumenes_totales'
+
+
+MODELOS_RESUMEN = [Resumen_etapa, Resumen_tipo_obra, Resumen_total]
+
+
+def _sql_sumar_obra(fila):
+    """Sentencias que suman la obra NEW a los resúmenes."""
+    return f"""
+        INSERT INTO Resumenes_etapas (Id_Etapa, Cantidad_obras, Obras_plazo_24)
+            SELECT {fila}.Etapa_id, 1, IFNULL({fila}.Plazo <= 24, 0) WHERE {fila}.Etapa_id IS NOT NULL
+            ON CONFLICT (Id_Etapa) DO UPDATE SET
+                Cantidad_obras = Cantidad_obras + 1,
+                Obras_plazo_24 = Obras_plazo_24 + excluded.Obras_plazo_24;
+        INSERT INTO Resumenes_tipos_obras (Id_Tipo_obra, Cantidad_obras, Monto_contrato)
+            SELECT {fila}.Tipo_obra_id, 1, IFNULL({fila}.Monto_contrato, 0) WHERE {fila}.Tipo_obra_id IS NOT NULL
+            ON CONFLICT (Id_Tipo_obra) DO UPDATE SET
+                Cantidad_obras = Cantidad_obras + 1,
+                Monto_contrato = Monto_contrato + excluded.Monto_contrato;
+        INSERT INTO Resumenes_totales (Id_Resumen, Cantidad_obras, Monto_contrato)
+            SELECT 1, 1, IFNULL({fila}.Monto_contrato, 0) WHERE 1
+            ON CONFLICT (Id_Resumen) DO UPDATE SET
+                Cantidad_obras = Cantidad_obras + 1,
+                Monto_contrato = Monto_contrato + excluded.Monto_contrato;"""
+
+
+def _sql_restar_obra(fila):
+    """Sentencias que restan la obra OLD de los resúmenes."""
+    return f"""
+        UPDATE Resumenes_etapas SET
+            Cantidad_obras = Cantidad_obras - 1,
+            Obras_plazo_24 = Obras_plazo_24 - IFNULL({fila}.Plazo <= 24, 0)
+        WHERE Id_Etapa = {fila}.Etapa_id;
+        UPDATE Resumenes_tipos_obras SET
+            Cantidad_obras = Cantidad_obras - 1,
+            Monto_contrato = Monto_contrato - IFNULL({fila}.Monto_contrato, 0)
+        WHERE Id_Tipo_obra = {fila}.Tipo_obra_id;
+        UPDATE Resumenes_totales SET
+            Cantidad_obras = Cantidad_obras - 1,
+            Monto_contrato = Monto_contrato - IFNULL({fila}.Monto_contrato, 0)
+        WHERE Id_Resumen = 1;"""
+
+
+def crear_triggers_resumen():
+    """Triggers sobre Obras que mantienen los resúmenes con cualquier camino de escritura
+    (create, save, insert_many, upserts de sincronizar_datos, SQL directo)."""
+    sqlite_db.execute_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS obras_resumen_insert AFTER INSERT ON Obras
+        BEGIN {_sql_sumar_obra('NEW')}
+        END""")
+    sqlite_db.execute_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS obras_resumen_delete AFTER DELETE ON Obras
+        BEGIN {_sql_restar_obra('OLD')}
+        END""")
+    sqlite_db.execute_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS obras_resumen_update
+        AFTER UPDATE OF Etapa_id, Tipo_obra_id, Monto_contrato, Plazo ON Obras
+        BEGIN {_sql_restar_obra('OLD')} {_sql_sumar_obra('NEW')}
+        END""")
+
+
+def _calcular_resumenes():
+    """Recalcula los resúmenes desde cero con GROUP BY sobre Obras."""
+    plazo_24 = fn.SUM(Case(None, [(Obra.Plazo <= 24, 1)], 0))
+    monto = fn.COALESCE(fn.SUM(Obra.Monto_contrato), 0)
+    etapas = {
+        id_: (cantidad, en_plazo)
+        for id_, cantidad, en_plazo in Obra
+        .select(Obra.Etapa, fn.COUNT(Obra.Id_Obra), plazo_24)
+        .where(Obra.Etapa.is_null(False))
+        .group_by(Obra.Etapa)
+        .tuples()
+    }
+    tipos = {
+        id_: (cantidad, suma)
+        for id_, cantidad, suma in Obra
+        .select(Obra.Tipo_obra, fn.COUNT(Obra.Id_Obra), monto)
+        .where(Obra.Tipo_obra.is_null(False))
+        .group_by(Obra.Tipo_obra)
+        .tuples()
+    }
+    total = Obra.select(fn.COUNT(Obra.Id_Obra), monto).tuples().get()
+    return etapas, tipos, total
+
+
+def reconstruir_resumenes():
+    """Vuelve a llenar los resúmenes con el contenido actual de Obras."""
+    etapas, tipos, total = _calcular_resumenes()
+    with sqlite_db.atomic():
+        for modelo in MODELOS_RESUMEN:
+            modelo.delete().execute()
+        Resumen_etapa.insert_many(
+            [(id_, cantidad, en_plazo) for id_, (cantidad, en_plazo) in etapas.items()],
+            fields=[Resumen_etapa.Id_Etapa, Resumen_etapa.Cantidad_obras, Resumen_etapa.Obras_plazo_24]
+        ).execute()
+        Resumen_tipo_obra.insert_many(
+            [(id_, cantidad, suma) for id_, (cantidad, suma) in tipos.items()],
+            fields=[Resumen_tipo_obra.Id_Tipo_obra, Resumen_tipo_obra.Cantidad_obras,
+                    Resumen_tipo_obra.Monto_contrato]
+        ).execute()
+        Resumen_total.insert(Id_Resumen=1, Cantidad_obras=total[0], Monto_contrato=total[1]).execute()
+
+
+def verificar_resumenes(tolerancia=1e-9):
+    """Compara los resúmenes con un recálculo completo. Devuelve la lista de
+    diferencias encontradas (vacía si son consistentes)."""
+    etapas, tipos, total = _calcular_resumenes()
+    diferencias = []
+
+    guardadas = {fila.Id_Etapa: (fila.Cantidad_obras, fila.Obras_plazo_24)
+                 for fila in Resumen_etapa.select() if fila.Cantidad_obras}
+    if guardadas != etapas:
+        diferencias.append(f"Resumenes_etapas: {guardadas} != {etapas}")
+
+    guardados = {fila.Id_Tipo_obra: (fila.Cantidad_obras, fila.Monto_contrato)
+                 for fila in Resumen_tipo_obra.select() if fila.Cantidad_obras}
+    if set(guardados) != set(tipos):
+        diferencias.append(f"Resumenes_tipos_obras: tipos {sorted(guardados)} != {sorted(tipos)}")
+    for id_, (cantidad, suma) in tipos.items():
+        if id_ in guardados and (guardados[id_][0] != cantidad or
+                                 not math.isclose(guardados[id_][1], suma, rel_tol=tolerancia)):
+            diferencias.append(f"Resumenes_tipos_obras[{id_}]: {guardados[id_]} != {(cantidad, suma)}")
+
+    fila = Resumen_total.get_or_none(Resumen_total.Id_Resumen == 1)
+    guardado = (fila.Cantidad_obras, fila.Monto_contrato) if fila else (0, 0)
+    if guardado[0] != total[0] or not math.isclose(guardado[1], total[1], rel_tol=tolerancia):
+        diferencias.append(f"Resumenes_totales: {guardado} != {total}")
+
+    return diferencias
+
+
+# Índice espacial: una caja degenerada (un punto) por obra con coordenadas en
+# la tabla virtual R*Tree Obras_rtree, mantenida por triggers sobre Obras.
+RADIO_TIERRA_M = 6_371_008.8
+RADIO_BUSQUEDA_INICIAL_M = 250
+
+
+def crear_indice_espacial():
+    """Crea Obras_rtree y los triggers que la sincronizan con Obras."""
+    sqlite_db.execute_sql(
+        'CREATE VIRTUAL TABLE IF NOT EXISTS Obras_rtree USING rtree(Id_Obra, Lat_min, Lat_max, Lng_min, Lng_max)')
+    insertar = """
+        INSERT INTO Obras_rtree (Id_Obra, Lat_min, Lat_max, Lng_min, Lng_max)
+            SELECT NEW.Id_Obra, NEW.Latitud, NEW.Latitud, NEW.Longitud, NEW.Longitud
+            WHERE NEW.Latitud IS NOT NULL AND NEW.Longitud IS NOT NULL;"""
+    borrar = 'DELETE FROM Obras_rtree WHERE Id_Obra = OLD.Id_Obra;'
+    sqlite_db.execute_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS obras_rtree_insert AFTER INSERT ON Obras
+        BEGIN {insertar}
+        END""")
+    sqlite_db.execute_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS obras_rtree_delete AFTER DELETE ON Obras
+        BEGIN {borrar}
+        END""")
+    sqlite_db.execute_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS obras_rtree_update AFTER UPDATE OF Latitud, Longitud ON Obras
+        BEGIN {borrar} {insertar}
+        END""")
+
+
+def reconstruir_indice_espacial():
+    """Vuelve a llenar Obras_rtree con las coordenadas actuales de Obras."""
+    with sqlite_db.atomic():
+        sqlite_db.execute_sql('DELETE FROM Obras_rtree')
+        sqlite_db.execute_sql("""
+            INSERT INTO Obras_rtree (Id_Obra, Lat_min, Lat_max, Lng_min, Lng_max)
+            SELECT Id_Obra, Latitud, Latitud, Longitud, Longitud FROM Obras
+            WHERE Latitud IS NOT NULL AND Longitud IS NOT NULL""")
+
+
+def distancia_metros(lat1, lng1, lat2, lng2):
+    """Distancia sobre la esfera (haversine) entre dos puntos en grados."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RADIO_TIERRA_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+# Consulta armada una sola vez: estas búsquedas se repiten mucho y son baratas,
+# así que no vale la pena construirlas con el query builder en cada llamada.
+_SQL_EN_CAJA = """
+    SELECT o.Id_Obra, o.Nombre_obra, o.Direccion, o.Latitud, o.Longitud
+    FROM Obras_rtree AS r JOIN Obras AS o ON o.Id_Obra = r.Id_Obra
+    WHERE r.Lat_max >= ? AND r.Lat_min <= ? AND r.Lng_max >= ? AND r.Lng_min <= ?"""
+
+
+def _en_caja(lat_min, lng_min, lat_max, lng_max):
+    """Filas de las obras candidatas a estar en el rectángulo.
+    R*Tree guarda float32 redondeando hacia afuera: puede traer de más, nunca de menos."""
+    return sqlite_db.execute_sql(_SQL_EN_CAJA, (lat_min, lat_max, lng_min, lng_max)).fetchall()
+
+
+def _caja_alrededor(lat, lng, metros):
+    """Rectángulo (lat_min, lng_min, lat_max, lng_max) que contiene el círculo de radio `metros`."""
+    angulo = metros / RADIO_TIERRA_M
+    lat_min = max(lat - math.degrees(angulo), -90.0)
+    lat_max = min(lat + math.degrees(angulo), 90.0)
+    seno = math.sin(angulo) / max(math.cos(math.radians(lat)), 1e-12)
+    if angulo >= math.pi / 2 or seno >= 1 or lat_min <= -90 or lat_max >= 90:
+        return lat_min, -180.0, lat_max, 180.0
+    delta_lng = math.degrees(math.asin(seno))
+    if lng - delta_lng < -180 or lng + delta_lng > 180:
+        # El círculo cruza el antimeridiano: se revisan todas las longitudes
+        return lat_min, -180.0, lat_max, 180.0
+    return lat_min, lng - delta_lng, lat_max, lng + delta_lng
+
+
+def _contar_en_caja(lat_min, lng_min, lat_max, lng_max):
+    return sqlite_db.execute_sql(
+        'SELECT COUNT(*) FROM Obras_rtree WHERE Lat_max >= ? AND Lat_min <= ? AND Lng_max >= ? AND Lng_min <= ?',
+        (lat_min, lat_max, lng_min, lng_max)).fetchone()[0]
+
+
+def _por_distancia(lat, lng, filas):
+    """[(distancia, fila)] ordenadas de la más cercana a la más lejana."""
+    pares = [(distancia_metros(lat, lng, fila[3], fila[4]), fila) for fila in filas]
+    pares.sort(key=lambda par: (par[0], par[1][0]))
+    return pares
+
+
+def _cercanas(lat, lng, metros):
+    """[(distancia, fila)] de las obras a `metros` o menos, ordenadas por distancia."""
+    candidatas = _por_distancia(lat, lng, _en_caja(*_caja_alrededor(lat, lng, metros)))
+    return [(distancia, fila) for distancia, fila in candidatas if distancia <= metros]
+
+
+# Búsqueda de texto completo: índice FTS5 de contenido externo sobre las columnas
+# de texto de Obras (no duplica el texto, solo guarda el índice), mantenido por triggers.
+COLUMNAS_FTS = ('Nombre_obra', 'Descripcion', 'Direccion')
+# Peso de cada columna en el ranking bm25: un acierto en el nombre vale más que en la descripción
+PESOS_FTS = (10.0, 1.0, 5.0)
+
+
+def crear_indice_texto():
+    """Crea Obras_fts y los triggers que la sincronizan con Obras."""
+    columnas = ', '.join(COLUMNAS_FTS)
+    nuevos = ', '.join(f'NEW.{columna}' for columna in COLUMNAS_FTS)
+    viejos = ', '.join(f'OLD.{columna}' for columna in COLUMNAS_FTS)
+    sqlite_db.execute_sql(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS Obras_fts USING fts5(
+            {columnas}, content='Obras', content_rowid='Id_Obra',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3')""")
+    insertar = f'INSERT INTO Obras_fts (rowid, {columnas}) VALUES (NEW.Id_Obra, {nuevos});'
+    # Con contenido externo, para borrar hay que pasarle a FTS5 los valores viejos
+    borrar = f"INSERT INTO Obras_fts (Obras_fts, rowid, {columnas}) VALUES ('delete', OLD.Id_Obra, {viejos});"
+    sqlite_db.execute_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS obras_fts_insert AFTER INSERT ON Obras
+        BEGIN {insertar}
+        END""")
+    sqlite_db.execute_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS obras_fts_delete AFTER DELETE ON Obras
+        BEGIN {borrar}
+        END""")
+    sqlite_db.execute_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS obras_fts_update AFTER UPDATE OF {columnas} ON Obras
+        BEGIN {borrar} {insertar}
+        END""")
+
+
+def reconstruir_indice_texto():
+    """Vuelve a indexar todo el texto de Obras."""
+    sqlite_db.execute_sql("INSERT INTO Obras_fts (Obras_fts) VALUES ('rebuild')")
+
+
+def verificar_indice_texto():
+    """True si Obras_fts coincide con el contenido de Obras."""
+    try:
+        sqlite_db.execute_sql("INSERT INTO Obras_fts (Obras_fts, rank) VALUES ('integrity-check', 1)")
+    except DatabaseError:
+        return False
+    return True
+
+
+def consulta_fts(texto):
+    """Convierte lo que escribe el usuario en una consulta FTS5 segura: cada palabra
+    entre comillas y como prefijo ('av. corrientes' -> '"av"* "corrientes"*')."""
+    palabras = re.findall(r'\w+', texto or '')
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+
+_SQL_BUSCAR = f"""
+    SELECT o.*,
+           snippet(Obras_fts, -1, '[', ']', '…', 12) AS fragmento,
+           bm25(Obras_fts, {', '.join(map(str, PESOS_FTS))}) AS relevancia
+    FROM Obras_fts JOIN Obras AS o ON o.Id_Obra = Obras_fts.rowid
+    WHERE Obras_fts MATCH ?
+    ORDER BY relevancia
+    LIMIT ?"""
+
+# Historial de las obras: cada cambio de un campo de CAMPOS_HISTORIAL queda como
+# un evento en Historial_obras, que solo crece. Lo escriben triggers sobre Obras,
+# así que va en la misma transacción que el cambio sea cual sea el camino de
+# escritura; al dar de alta una obra se registran sus valores iniciales (la etapa
+# siempre, aunque sea nula, para que el alta quede en el historial). Las fechas
+# son UTC con milisegundos. Cada EVENTOS_POR_FOTO eventos se guarda una foto con
+# el estado de todas las obras (foto_si_corresponde), de modo que reconstruir un
+# instante (Obra.estado_al) solo aplica los eventos posteriores a la última foto.
+CAMPOS_HISTORIAL = ('Etapa', 'Porcentaje_avance', 'Plazo', 'Mano_de_obra')
+EVENTOS_POR_FOTO = 50_000
+_AHORA_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+
+class Evento_obra(BaseModel):
+    Id_Evento = AutoField()
+    Id_Obra = IntegerField()
+    Campo = CharField()
+    # Sin tipo: cada valor queda como lo guardó Obras (entero, real o texto)
+    Valor_anterior = BareField(null=True)
+    Valor_nuevo = BareField(null=True)
+    Fecha = DateTimeField()
+
+    class Meta:
+        table_name = 'Historial_obras'
+        indexes = (
+            (('Id_Obra', 'Campo', 'Fecha'), False),  # la curva de una obra
+            (('Campo', 'Fecha'), False),  # los cambios de un campo en un rango de fechas
+        )
+
+
+class Foto_historial(BaseModel):
+    Id_Foto = AutoField()
+    Fecha = DateTimeField()
+    # Último evento del historial que ya está reflejado en la foto
+    Ultimo_evento = IntegerField()
+
+    class Meta:
+        table_name = 'Fotos_historial'
+
+
+class Estado_foto(BaseModel):
+    """Los CAMPOS_HISTORIAL de una obra en una foto."""
+    Id_Foto = IntegerField()
+    Id_Obra = IntegerField()
+    Etapa = IntegerField(null=True, column_name='Etapa_id')
+    Porcentaje_avance = FloatField(null=True)
+    Plazo = FloatField(null=True)
+    Mano_de_obra = IntegerField(null=True)
+
+    class Meta:
+        table_name = 'Estados_fotos'
+        primary_key = CompositeKey('Id_Foto', 'Id_Obra')
+        without_rowid = True
+
+
+MODELOS_HISTORIAL = [Evento_obra, Foto_historial, Estado_foto]
+
+
+def _sql_eventos(viejo, condicion):
+    """INSERT de un evento por cada campo de CAMPOS_HISTORIAL de NEW que cumpla
+    `condicion` (un formato con {viejo} y {nuevo}); `viejo` es la fila anterior o NULL."""
+    selects = []
+    for campo in CAMPOS_HISTORIAL:
+        columna = Obra._meta.fields[campo].column_name
+        anterior = f'{viejo}.{columna}' if viejo else 'NULL'
+        selects.append(
+            f"SELECT NEW.Id_Obra, '{campo}', {anterior}, NEW.{columna}, {_AHORA_SQL} "
+            f"WHERE {condicion(campo, anterior, f'NEW.{columna}')}")
+    return ("INSERT INTO Historial_obras (Id_Obra, Campo, Valor_anterior, Valor_nuevo, Fecha) "
+            + ' UNION ALL '.join(selects) + ';')
+
+
+def crear_triggers_historial():
+    """Triggers sobre Obras que registran las altas y los cambios en Historial_obras."""
+    columnas = ', '.join(Obra._meta.fields[campo].column_name for campo in CAMPOS_HISTORIAL)
+    alta = _sql_eventos(None, lambda campo, anterior, nuevo:
+                        '1' if campo == 'Etapa' else f'{nuevo} IS NOT NULL')
+    cambio = _sql_eventos('OLD', lambda campo, anterior, nuevo: f'{anterior} IS NOT {nuevo}')
+    sqlite_db.execute_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS obras_historial_insert AFTER INSERT ON Obras
+        BEGIN {alta}
+        END""")
+    sqlite_db.execute_sql(f"""
+        CREATE TRIGGER IF NOT EXISTS obras_historial_update AFTER UPDATE OF {columnas} ON Obras
+        BEGIN {cambio}
+        END""")
+
+
+def tomar_foto_historial():
+    """Guarda el estado actual de CAMPOS_HISTORIAL de todas las obras y devuelve el id de la foto."""
+    with sqlite_db.atomic():
+        ultimo = Evento_obra.select(fn.MAX(Evento_obra.Id_Evento)).scalar() or 0
+        foto = Foto_historial.insert(Fecha=SQL(_AHORA_SQL), Ultimo_evento=ultimo).execute()
+        Estado_foto.insert_from(
+            Obra.select(Value(foto), Obra.Id_Obra, *(Obra._meta.fields[campo] for campo in CAMPOS_HISTORIAL)),
+            [Estado_foto.Id_Foto, Estado_foto.Id_Obra,
+             *(Estado_foto._meta.fields[campo] for campo in CAMPOS_HISTORIAL)]
+        ).execute()
+    return foto
+
+
+def foto_si_corresponde(eventos_por_foto=EVENTOS_POR_FOTO):
+    """Toma una foto si desde la última se registraron `eventos_por_foto` eventos o más.
+    Devuelve el id de la foto nueva, o None."""
+    ultimo = Evento_obra.select(fn.MAX(Evento_obra.Id_Evento)).scalar() or 0
+    en_foto = Foto_historial.select(fn.MAX(Foto_historial.Ultimo_evento)).scalar() or 0
+    if ultimo - en_foto < eventos_por_foto:
+        return None
+    return tomar_foto_historial()
+
+
+def _instante_historial(valor, fin_del_dia=False):
+    """Fecha u hora como el texto que guardan los triggers, para compararla tal
+    cual. Una fecha sola es el comienzo del día, o su final con fin_del_dia."""
+    if not isinstance(valor, datetime.datetime):
+        valor = datetime.datetime.combine(valor, datetime.time.max if fin_del_dia else datetime.time.min)
+    return Value(valor.strftime('%Y-%m-%d %H:%M:%S.%f')[:23], converter=False)
+
+
+
+# Columnas numéricas de Obra.columnas_numericas (además de Id_Obra y las FK)
+CAMPOS_NUMERICOS = ('Monto_contrato', 'Plazo', 'Porcentaje_avance', 'Mano_de_obra')
+# Valor de las FK y los enteros nulos en Obra.columnas_numericas (los ids empiezan en 1)
+SIN_CODIGO = -1
+# Tipo de NumPy por tipo de campo; el resto (las FK) van como códigos 'i4'
+_TIPOS_NUMPY = {AutoField: 'i8', IntegerField: 'i8', FloatField: 'f8'}
+
+
+@functools.lru_cache(maxsize=None)
+def registro_compacto(columnas):
+    """namedtuple de Obra.recorrer para esas columnas: una tupla con __slots__
+    vacíos, sin __dict__, __data__ ni seguimiento de cambios como un modelo."""
+    return collections.namedtuple('ObraCompacta', columnas)
+
+
+# Listado de obras filtrado y paginado por clave (ListadoObras). Orden -> campo de Obra
+ORDENES_LISTADO = {
+    'id': 'Id_Obra',
+    'monto': 'Monto_contrato',
+    'fecha_inicio': 'Fecha_inicio',
+    'avance': 'Porcentaje_avance',
+}
+# Campos por los que se puede filtrar: van en los índices del listado para que
+# cada página se resuelva leyendo solo el índice
+CAMPOS_FILTRO_LISTADO = ('Etapa', 'Tipo_obra', 'Barrio', 'Monto_contrato', 'Fecha_inicio', 'Porcentaje_avance')
+# Si los filtros de dimensión dejan hasta estas obras, conviene que SQLite las
+# traiga por el índice de la FK y las ordene; si dejan más, recorrer el índice
+# del orden descartando las que no cumplen
+UMBRAL_ORDENAR_FILTRADAS = 1000
+
+PaginaObras = collections.namedtuple('PaginaObras', 'obras siguiente')
+
+
+def _indice_listado(orden):
+    return f'obra_listado_{orden}'
+
+
+# Un índice por orden: (clave, Id_Obra, campos de filtro), en el mismo orden que las páginas
+for _orden, _clave in ORDENES_LISTADO.items():
+    Obra.add_index(Obra.index(
+        *(Obra._meta.fields[nombre] for nombre in dict.fromkeys((_clave, 'Id_Obra') + CAMPOS_FILTRO_LISTADO)),
+        name=_indice_listado(_orden)))
+
+
+class ListadoObras:
+    """Obras filtradas y ordenadas, de a páginas. Cada página sigue a la anterior
+    desde la clave (valor del orden, Id_Obra) de su última obra, sin OFFSET: una
+    página profunda cuesta lo mismo que la primera.
+
+        listado = Obra.listado('monto', descendente=True).etapa(1).comuna(4).monto(minimo=1e6)
+        pagina = listado.pagina(50)
+        siguiente = listado.pagina(50, despues=pagina.siguiente)
+
+    Las obras vienen como en Obra.recorrer. Las que no tienen valor en el campo
+    del orden van primero en orden ascendente y al final en descendente.
+    """
+
+    def __init__(self, orden='id', descendente=False):
+        if orden not in ORDENES_LISTADO:
+            raise ValueError(f"Orden desconocido: {orden!r} (opciones: {', '.join(ORDENES_LISTADO)})")
+        self.orden = orden
+        self.clave = Obra._meta.fields[ORDENES_LISTADO[orden]]
+        self.descendente = descendente
+        self._dimensiones = []
+        self._rangos = []
+        self._indice = None
+
+    # Filtros: cada uno se suma a los anteriores (AND) y devuelve el listado
+    def _filtrar_dimension(self, condicion):
+        self._dimensiones.append(condicion)
+        self._indice = None
+        return self
+
+    def etapa(self, *ids):
+        return self._filtrar_dimension(Obra.Etapa.in_(ids))
+
+    def tipo_obra(self, *ids):
+        return self._filtrar_dimension(Obra.Tipo_obra.in_(ids))
+
+    def barrio(self, *ids):
+        return self._filtrar_dimension(Obra.Barrio.in_(ids))
+
+    def comuna(self, *ids):
+        return self._filtrar_dimension(
+            Obra.Barrio.in_(Barrio.select(Barrio.Id_barrio).where(Barrio.Comuna.in_(ids))))
+
+    def _filtrar_rango(self, campo, minimo, maximo):
+        if minimo is not None:
+            self._rangos.append(campo >= minimo)
+        if maximo is not None:
+            self._rangos.append(campo <= maximo)
+        return self
+
+    def monto(self, minimo=None, maximo=None):
+        return self._filtrar_rango(Obra.Monto_contrato, minimo, maximo)
+
+    def fecha_inicio(self, desde=None, hasta=None):
+        return self._filtrar_rango(Obra.Fecha_inicio, desde, hasta)
+
+    def avance(self, minimo=None, maximo=None):
+        return self._filtrar_rango(Obra.Porcentaje_avance, minimo, maximo)
+
+    def _filtro(self, *extra):
+        condiciones = self._dimensiones + self._rangos + [condicion for condicion in extra if condicion is not None]
+        return functools.reduce(lambda a, b: a & b, condiciones) if condiciones else None
+
+    def indice(self):
+        """Índice con el que se recorren las páginas, o None si conviene dejar
+        que SQLite elija (filtros de dimensión que dejan pocas obras)."""
+        if self._indice is None:
+            pocas = False
+            if self._dimensiones:
+                consulta = Obra.select(Obra.Id_Obra).where(self._filtro()).limit(UMBRAL_ORDENAR_FILTRADAS + 1)
+                pocas = consulta.count() <= UMBRAL_ORDENAR_FILTRADAS
+            self._indice = '' if pocas else _indice_listado(self.orden)
+        return self._indice or None
+
+    def _tramos(self, despues):
+        """Condiciones de los tramos a recorrer, en orden, desde `despues`. Los NULL
+        del campo del orden forman su propio tramo (antes de los demás en ascendente),
+        y después de un valor siguen las obras con ese mismo valor y después las de
+        los siguientes: SQLite no busca en el índice por (valor, Id_Obra) > (?, ?)
+        cuando Id_Obra es el rowid, pero sí por valor = ? AND Id_Obra > ?."""
+        id_ = Obra.Id_Obra
+        seguir = (lambda a, b: a < b) if self.descendente else (lambda a, b: a > b)
+        if self.clave is id_:
+            return [None if despues is None else seguir(id_, despues[1])]
+        nulos, con_valor = self.clave.is_null(), self.clave.is_null(False)
+        tramos = [con_valor, nulos] if self.descendente else [nulos, con_valor]
+        if despues is None:
+            return tramos
+        valor, ultimo_id = despues
+        if valor is None:
+            desde = 1 if self.descendente else 0
+            return [nulos & seguir(id_, ultimo_id)] + tramos[desde + 1:]
+        desde = 0 if self.descendente else 1
+        return [(self.clave == valor) & seguir(id_, ultimo_id), seguir(self.clave, valor)] + tramos[desde + 1:]
+
+    def _consulta_claves(self, tramo):
+        campos = [self.clave, Obra.Id_Obra] if self.clave is not Obra.Id_Obra else [Obra.Id_Obra, Obra.Id_Obra]
+        consulta = Obra.select(*campos)
+        indice = self.indice()
+        if indice:
+            consulta = consulta.from_(NodeList((Obra, SQL('INDEXED BY'), Entity(indice))))
+        filtro = self._filtro(tramo)
+        if filtro is not None:
+            consulta = consulta.where(filtro)
+        if self.descendente:
+            return consulta.order_by(self.clave.desc(), Obra.Id_Obra.desc())
+        return consulta.order_by(self.clave, Obra.Id_Obra)
+
+    def pagina(self, limite=50, despues=None, campos=None):
+        """PaginaObras(obras, siguiente): hasta `limite` obras a continuación de
+        `despues`, y la clave para pedir la página siguiente (None si no hay más)."""
+        claves = []
+        for tramo in self._tramos(despues):
+            claves += sqlite_db.execute(self._consulta_claves(tramo).limit(limite - len(claves))).fetchall()
+            if len(claves) == limite:
+                break
+        ids = [id_ for _, id_ in claves]
+        if campos is not None:
+            campos = [Obra._meta.fields[campo] if isinstance(campo, str) else campo for campo in campos]
+            if not any(campo is Obra.Id_Obra for campo in campos):
+                campos.insert(0, Obra.Id_Obra)
+        por_id = {obra.Id_Obra: obra for obra in Obra.recorrer(campos, filtro=Obra.Id_Obra.in_(ids))} if ids else {}
+        siguiente = tuple(claves[-1]) if len(claves) == limite else None
+        return PaginaObras([por_id[id_] for id_ in ids], siguiente)
+
+    def paginas(self, limite=50, despues=None, campos=None):
+        """Recorre todas las páginas desde `despues`."""
+        while True:
+            pagina = self.pagina(limite, despues, campos)
+            if pagina.obras:
+                yield pagina
+            if pagina.siguiente is None:
+                return
+            despues = pagina.siguiente
+
+    def contar(self):
+        """Cantidad de obras que cumplen los filtros (recorre todas: no usar por página)."""
+        consulta = Obra.select(Obra.Id_Obra)
+        filtro = self._filtro()
+        return (consulta.where(filtro) if filtro is not None else consulta).count()
+
+    def explicar(self, despues=None):
+        """EXPLAIN QUERY PLAN de la consulta de claves del primer tramo desde `despues`."""
+        sql, parametros = self._consulta_claves(self._tramos(despues)[0]).sql()
+        return [fila[-1] for fila in sqlite_db.execute_sql('EXPLAIN QUERY PLAN ' + sql, parametros)]
+
+    # La clave de la página siguiente como texto, para pasarla por una URL
+    @staticmethod
+    def cursor_a_texto(cursor):
+        return json.dumps(list(cursor), separators=(',', ':')) if cursor is not None else None
+
+    @staticmethod
+    def cursor_desde_texto(texto):
+        try:
+            valor, id_ = json.loads(texto)
+        except (TypeError, ValueError):
+            raise ValueError(f"Cursor inválido: {texto!r}") from None
+        if not isinstance(id_, int) or isinstance(valor, (list, dict)):
+            raise ValueError(f"Cursor inválido: {texto!r}")
+        return valor, id_
+
+
+# Clave natural de cada tabla de dimensión (campos con los que se la busca al cargar)
+CLAVES_NATURALES = {
+    Entorno: ('Desc_entorno',),
+    Etapa: ('Desc_etapa',),
+    Tipo_obra: ('Desc_tipo',),
+    Area_responsable: ('Area',),
+    Tipo_contratacion: ('Desc_contrataciones',),
+    Comuna: ('Comuna',),
+    Barrio: ('Barrio', 'Comuna'),
+    Financiamiento: ('Desc_financiamiento',),
+    Empresa_licitadora: ('Empresa',),
+}
+
+
+def normalizar_texto(texto):
+    """Texto en minúsculas y sin acentos, para comparar lo que escribe el usuario."""
+    descompuesto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).casefold().strip()
+
+
+def _trigramas(texto):
+    relleno = f'  {texto} '
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class IndiceSugerencias:
+    """Sugerencias para un texto a medio escribir sobre los valores de una columna.
+
+    Primero los valores que empiezan con el texto, después los que tienen una
+    palabra que empieza con cada palabra del texto y, si todavía faltan, los
+    que tienen palabras parecidas por trigramas (errores de tipeo).
+    """
+
+    # Cuántos candidatos por sugerencia pedida se puntúan en la búsqueda aproximada
+    CANDIDATOS_POR_SUGERENCIA = 50
+
+    def __init__(self, valores=()):
+        self._completos = []    # [(normalizado, valor)] ordenada
+        self._palabras = []     # [(palabra, valor)] ordenada
+        self._normalizado = {}  # valor -> (normalizado, palabras)
+        self._con_palabra = {}  # palabra -> {valor}
+        self._trigramas = {}    # trigrama -> {palabra}
+        for valor in valores:
+            self._indexar(valor)
+        self._completos.sort()
+        self._palabras.sort()
+
+    def __len__(self):
+        return len(self._completos)
+
+    def _indexar(self, valor, insertar=list.append):
+        if not valor or valor in self._normalizado:
+            return
+        normalizado = normalizar_texto(valor)
+        palabras = set(normalizado.split())
+        insertar(self._completos, (normalizado, valor))
+        self._normalizado[valor] = (normalizado, palabras)
+        for palabra in palabras:
+            insertar(self._palabras, (palabra, valor))
+            if palabra not in self._con_palabra:
+                self._con_palabra[palabra] = set()
+                for trigrama in _trigramas(palabra):
+                    self._trigramas.setdefault(trigrama, set()).add(palabra)
+            self._con_palabra[palabra].add(valor)
+
+    def agregar(self, valor):
+        self._indexar(valor, bisect.insort)
+
+    @staticmethod
+    def _rango(ordenada, prefijo):
+        """Posiciones [desde, hasta) de las entradas que empiezan con prefijo."""
+        return (bisect.bisect_left(ordenada, (prefijo,)),
+                bisect.bisect_left(ordenada, (prefijo + '\U0010ffff',)))
+
+    def _parecidas(self, palabra, parecido_minimo):
+        """{palabra del vocabulario: parecido} para una palabra del texto."""
+        trigramas = _trigramas(palabra)
+        comunes = {}
+        for trigrama in trigramas:
+            for candidata in self._trigramas.get(trigrama, ()):
+                comunes[candidata] = comunes.get(candidata, 0) + 1
+        parecidas = {}
+        for candidata, cantidad in comunes.items():
+            # Jaccard entre los trigramas de las dos palabras
+            parecido = cantidad / (len(trigramas) + len(candidata) + 2 - cantidad)
+            if candidata.startswith(palabra):
+                parecido = 1.0
+            if parecido >= parecido_minimo:
+                parecidas[candidata] = parecido
+        return parecidas
+
+    def sugerir(self, texto, n=10, parecido_minimo=0.4):
+        """Hasta n valores para `texto`, los mejores primero."""
+        clave = normalizar_texto(texto)
+        desde, hasta = self._rango(self._completos, clave)
+        sugerencias = [valor for _, valor in self._completos[desde:min(hasta, desde + n)]]
+        if len(sugerencias) >= n or not clave:
+            return sugerencias
+
+        # Se recorre solo el rango de la palabra más selectiva y se filtra por las demás
+        palabras = clave.split()
+        rangos = sorted(((self._rango(self._palabras, palabra), palabra) for palabra in palabras),
+                        key=lambda r: r[0][1] - r[0][0])
+        (desde, hasta), _ = rangos[0]
+        resto = [palabra for _, palabra in rangos[1:]]
+        vistos = set(sugerencias)
+        candidatos = {valor for _, valor in self._palabras[desde:hasta]} - vistos
+        for _, valor in sorted((self._normalizado[valor][0], valor) for valor in candidatos):
+            propias = self._normalizado[valor][1]
+            if all(any(w.startswith(p) for w in propias) for p in resto):
+                sugerencias.append(valor)
+                if len(sugerencias) >= n:
+                    return sugerencias
+        vistos.update(sugerencias)
+
+        # Los candidatos salen de las palabras más parecidas a la palabra más
+        # selectiva y se puntúan con la suma del mejor parecido de cada palabra
+        parecidas = [self._parecidas(palabra, parecido_minimo) for palabra in palabras]
+        if not any(parecidas):
+            return sugerencias
+        semilla = min((p for p in parecidas if p), key=lambda p: sum(len(self._con_palabra[w]) for w in p))
+        otras = [p for p in parecidas if p is not semilla]
+        tope = n * self.CANDIDATOS_POR_SUGERENCIA if otras else n - len(sugerencias)
+        puntajes = {}
+        anterior = None
+        for palabra in sorted(semilla, key=semilla.get, reverse=True):
+            # Con una sola palabra el puntaje es el de la semilla: se corta al cambiar de parecido
+            if len(puntajes) >= tope and (otras or semilla[palabra] < anterior):
+                break
+            anterior = semilla[palabra]
+            for valor in self._con_palabra[palabra]:
+                if valor not in vistos and valor not in puntajes:
+                    puntajes[valor] = anterior
+        for p in otras:
+            for valor in puntajes:
+                puntajes[valor] += max([p[w] for w in self._normalizado[valor][1] if w in p], default=0.0)
+        mejores = heapq.nsmallest(n - len(sugerencias), puntajes,
+                                  key=lambda v: (-puntajes[v], self._normalizado[v][0]))
+        sugerencias.extend(mejores)
+        return sugerencias
+
+
+# Marca de CacheDimensiones.validado en la entrada de la conexión
+_BLOQUE_VALIDADO = object()
+
+
+class CacheDimensiones:
+    """Cache en memoria clave natural -> id para las tablas de dimensión.
+
+    Cada índice se arma con un único SELECT la primera vez que se usa, se
+    actualiza con las filas que crea el propio cache y se descarta cuando
+    BaseModel detecta una escritura sobre esa tabla hecha por fuera de él.
+    Lo que escriben otros procesos no pasa por BaseModel: antes de usar lo
+    cacheado se mira PRAGMA data_version y, si cambió, se descarta todo.
+    """
+
+    def __init__(self, claves=CLAVES_NATURALES):
+        self.claves = claves
+        self._indices = {}
+        self._sugerencias = {}
+        self._ids = {}
+        # id de la conexión -> [conexión, data_version con el que se validó el cache,
+        # transacción (o bloque validado) en la que se miró por última vez]
+        self._versiones = {}
+        self._escritura_propia = False
+        self.aciertos = 0
+        self.fallos = 0
+        self.consultas = 0
+        self.invalidaciones = 0
+
+    def _comprobar_version(self):
+        """Descarta todo si otra conexión confirmó cambios desde la última vez que se
+        miró con la conexión en uso (data_version solo se compara dentro de una
+        misma conexión; una conexión nueva no sabe qué pasó antes). Dentro de una
+        transacción (o en un bloque validado) alcanza con mirarlo una vez."""
+        conexion = sqlite_db.connection()
+        transaccion = sqlite_db.top_transaction()
+        entrada = self._versiones.get(id(conexion))
+        if entrada is not None and entrada[0] is conexion and (
+                entrada[2] is _BLOQUE_VALIDADO or (transaccion is not None and entrada[2] is transaccion)):
+            return
+        version = sqlite_db.execute_sql('PRAGMA data_version').fetchone()[0]
+        if entrada is None or entrada[0] is not conexion or entrada[1] != version:
+            self.invalidar()
+        self._versiones[id(conexion)] = [conexion, version, transaccion]
+
+    @contextlib.contextmanager
+    def validado(self):
+        """Mira data_version una sola vez para todo el bloque, como dentro de una
+        transacción: para operaciones con muchas búsquedas fuera de una (cargar_datos)."""
+        self._comprobar_version()
+        entrada = self._versiones[id(sqlite_db.connection())]
+        anterior, entrada[2] = entrada[2], _BLOQUE_VALIDADO
+        try:
+            yield self
+        finally:
+            entrada[2] = anterior
+
+    def olvidar_conexiones(self):
+        """Al cambiar de base las conexiones anteriores ya no cuentan."""
+        self._versiones.clear()
+
+    def precargar(self):
+        self._comprobar_version()
+        for modelo, campos in self.claves.items():
+            self._indice(modelo, campos)
+
+    def _indice(self, modelo, campos):
+        if (modelo, campos) not in self._indices:
+            columnas = [modelo._meta.fields[nombre] for nombre in campos]
+            consulta = (modelo
+                        .select(modelo._meta.primary_key, *columnas)
+                        .order_by(modelo._meta.primary_key)
+                        .tuples())
+            indice = {}
+            for id_, *valores in consulta:
+                indice.setdefault(tuple(valores), id_)
+            self._indices[(modelo, campos)] = indice
+            self.consultas += 1
+        return self._indices[(modelo, campos)]
+
+    @staticmethod
+    def _clave(modelo, campos, valores):
+        return tuple(modelo._meta.fields[nombre].db_value(valores[nombre]) for nombre in campos)
+
+    def obtener_id(self, modelo, **valores):
+        """Devuelve el id de la fila con esos valores, o None si no existe."""
+        self._comprobar_version()
+        campos = tuple(sorted(valores))
+        if modelo in self.claves and set(campos) == set(self.claves[modelo]):
+            campos = self.claves[modelo]
+        id_ = self._indice(modelo, campos).get(self._clave(modelo, campos, valores))
+        if id_ is None:
+            self.fallos += 1
+        else:
+            self.aciertos += 1
+        return id_
+
+    def existe_id(self, modelo, id_):
+        """Si hay una fila de `modelo` con ese id (los ids se leen con un único SELECT)."""
+        self._comprobar_version()
+        if (modelo, None) not in self._ids:
+            clave = modelo._meta.primary_key
+            self._ids[(modelo, None)] = {valor for valor, in modelo.select(clave).tuples()}
+            self.consultas += 1
+        return id_ in self._ids[(modelo, None)]
+
+    def crear(self, modelo, **datos):
+        """Inserta una fila nueva y la registra en los índices ya cargados."""
+        self._escritura_propia = True
+        try:
+            id_ = modelo.insert(**datos).execute()
+        finally:
+            self._escritura_propia = False
+        for (modelo_indice, campos), indice in self._indices.items():
+            if modelo_indice is modelo and all(nombre in datos for nombre in campos):
+                indice.setdefault(self._clave(modelo, campos, datos), id_)
+        if (modelo, None) in self._ids:
+            self._ids[(modelo, None)].add(id_)
+        for (modelo_indice, campo), sugerencias in self._sugerencias.items():
+            if modelo_indice is modelo and campo in datos:
+                sugerencias.agregar(datos[campo])
+        return id_
+
+    def obtener_o_crear(self, modelo, defaults=None, **valores):
+        """Equivalente a get_or_create, pero devuelve (id, creado)."""
+        id_ = self.obtener_id(modelo, **valores)
+        if id_ is not None:
+            return id_, False
+        datos = dict(valores)
+        if defaults:
+            datos.update(defaults)
+        return self.crear(modelo, **datos), True
+
+    def sugerencias(self, modelo, campo):
+        """IndiceSugerencias de modelo.campo, armado con un SELECT la primera vez."""
+        self._comprobar_version()
+        if (modelo, campo) not in self._sugerencias:
+            columna = modelo._meta.fields[campo]
+            valores = modelo.select(columna).where(columna.is_null(False)).distinct().tuples()
+            self._sugerencias[(modelo, campo)] = IndiceSugerencias(valor for valor, in valores)
+            self.consultas += 1
+        return self._sugerencias[(modelo, campo)]
+
+    def sugerir(self, modelo, campo, texto, n=10):
+        return self.sugerencias(modelo, campo).sugerir(texto, n)
+
+    def invalidar(self, modelo=None):
+        if self._escritura_propia:
+            return
+        for cache in (self._indices, self._sugerencias, self._ids):
+            if modelo is None:
+                descartados = list(cache)
+            else:
+                descartados = [clave for clave in cache if clave[0] is modelo]
+            for clave in descartados:
+                del cache[clave]
+            self.invalidaciones += len(descartados)
+
+    def estadisticas(self):
+        return {
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'consultas': self.consultas,
+            'invalidaciones': self.invalidaciones,
+        }
+
+
+cache_dimensiones = CacheDimensiones()
+
+
+def _base_reemplazada(base):
+    # Otra base, otras claves: al reconfigurar la conexión o restaurar una
+    # instantánea se descarta lo cacheado (y version_datos cambia)
+    BaseModel.escrituras += 1
+    cache_dimensiones.invalidar()
+    cache_dimensiones.olvidar_conexiones()
+
+
+sqlite_db.attach_callback(_base_reemplazada)
+
+
+# Migraciones del esquema. La versión aplicada se guarda en PRAGMA user_version;
+# los índices declarados en los modelos los crea create_tables (IF NOT EXISTS).
+def _migracion_columnas_origen():
+    """Columnas con las que sincronizar_datos identifica cada fila del CSV."""
+    migrador = SqliteMigrator(sqlite_db)
+    columnas = {columna.name for columna in sqlite_db.get_columns(Obra._meta.table_name)}
+    nuevas = [
+        ('Clave_origen', CharField(null=True)),
+        ('Hash_origen', CharField(null=True)),
+        ('Baja_origen', DateField(null=True)),
+    ]
+    migrate(*[
+        migrador.add_column(Obra._meta.table_name, nombre, campo)
+        for nombre, campo in nuevas if nombre not in columnas
+    ])
+
+
+def _migracion_claves_unicas():
+    """Unifica las filas repetidas de cada dimensión antes de crear los índices únicos:
+    se conserva el id más bajo y se reapuntan las FK que señalaban a las demás."""
+    for modelo, campos in CLAVES_NATURALES.items():
+        pk = modelo._meta.primary_key
+        columnas = [modelo._meta.fields[nombre] for nombre in campos]
+        repetidos = (modelo
+                     .select(fn.MIN(pk), *columnas)
+                     .group_by(*columnas)
+                     .having(fn.COUNT(pk) > 1)
+                     .tuples())
+        for conservar, *valores in list(repetidos):
+            if any(valor is None for valor in valores):
+                continue
+            condicion = pk != conservar
+            for columna, valor in zip(columnas, valores):
+                condicion &= (columna == valor)
+            sobrantes = [fila[0] for fila in modelo.select(pk).where(condicion).tuples()]
+            for campo, modelo_relacionado in modelo._meta.backrefs.items():
+                (modelo_relacionado
+                 .update({campo: conservar})
+                 .where(campo.in_(sobrantes))
+                 .execute())
+            modelo.delete().where(pk.in_(sobrantes)).execute()
+
+
+def _migracion_resumenes():
+    """Tablas de resúmenes de Obras, sus triggers y su contenido inicial."""
+    sqlite_db.create_tables(MODELOS_RESUMEN)
+    crear_triggers_resumen()
+    reconstruir_resumenes()
+
+
+def _migracion_coordenadas():
+    """Latitud y Longitud pasan de TEXT a REAL y se crea el índice espacial.
+
+    SQLite no cambia el tipo de una columna en el lugar: el migrador reconstruye
+    Obras, y con ella se pierden los triggers, que se vuelven a crear.
+    """
+    migrador = SqliteMigrator(sqlite_db)
+    tabla = Obra._meta.table_name
+    migrate(
+        migrador.alter_column_type(tabla, 'Latitud', FloatField(null=True)),
+        migrador.alter_column_type(tabla, 'Longitud', FloatField(null=True)),
+    )
+    crear_indice_espacial()
+    crear_triggers_obras()
+
+    # La afinidad REAL convierte sola '-34.56'; lo que queda como texto ('-34,56', '') se convierte acá
+    def a_float(valor):
+        if not isinstance(valor, str):
+            return valor
+        try:
+            numero = float(valor.strip().replace(',', '.'))
+        except ValueError:
+            return None
+        return numero if math.isfinite(numero) else None
+
+    pendientes = sqlite_db.execute_sql(
+        f"SELECT Id_Obra, Latitud, Longitud FROM {tabla} "
+        "WHERE typeof(Latitud) = 'text' OR typeof(Longitud) = 'text'").fetchall()
+    for id_, latitud, longitud in pendientes:
+        (Obra
+         .update(Latitud=a_float(latitud), Longitud=a_float(longitud))
+         .where(Obra.Id_Obra == id_)
+         .execute())
+    # Coordenadas sin separador decimal ('-34658478') no son un punto válido
+    Obra.update(Latitud=None).where(~Obra.Latitud.between(-90, 90)).execute()
+    Obra.update(Longitud=None).where(~Obra.Longitud.between(-180, 180)).execute()
+
+    reconstruir_indice_espacial()
+
+
+def _migracion_texto():
+    """Índice de texto completo sobre nombre, descripción y dirección de las obras."""
+    crear_indice_texto()
+    reconstruir_indice_texto()
+
+
+def _migracion_historial():
+    """Historial de cambios de las obras, con una primera foto de su estado actual."""
+    sqlite_db.create_tables(MODELOS_HISTORIAL)
+    crear_triggers_historial()
+    tomar_foto_historial()
+
+
+def crear_triggers_obras():
+    """Vuelve a crear todos los triggers sobre Obras de las tablas que ya existen
+    (resúmenes, índice espacial, índice de texto e historial). Reconstruir Obras
+    (alter_column_type y similares) los borra a todos: hay que llamarla después."""
+    if sqlite_db.table_exists(Resumen_etapa._meta.table_name):
+        crear_triggers_resumen()
+    if sqlite_db.table_exists('Obras_rtree'):
+        crear_indice_espacial()
+    if sqlite_db.table_exists('Obras_fts'):
+        crear_indice_texto()
+    if sqlite_db.table_exists(Evento_obra._meta.table_name):
+        crear_triggers_historial()
+
+
+MIGRACIONES = [
+    (1, 'columnas de sincronización con el CSV', _migracion_columnas_origen),
+    (2, 'claves naturales únicas en las dimensiones', _migracion_claves_unicas),
+    (3, 'resúmenes de obras por etapa, tipo y total', _migracion_resumenes),
+    (4, 'coordenadas REAL e índice espacial', _migracion_coordenadas),
+    (5, 'índice de texto completo de obras', _migracion_texto),
+    (6, 'historial de cambios de las obras', _migracion_historial),
+]
+VERSION_ESQUEMA = MIGRACIONES[-1][0]
+
+
+def migrar_esquema(modelos):
+    """Crea las tablas o lleva una base existente a VERSION_ESQUEMA.
+    Devuelve la descripción de las migraciones aplicadas."""
+    if not sqlite_db.table_exists(Obra._meta.table_name):
+        sqlite_db.create_tables(modelos + MODELOS_RESUMEN + MODELOS_HISTORIAL)
+        crear_triggers_resumen()
+        crear_triggers_historial()
+        crear_indice_espacial()
+        crear_indice_texto()
+        sqlite_db.user_version = VERSION_ESQUEMA
+        return []
+
+    aplicadas = []
+    for numero, descripcion, migracion in MIGRACIONES:
+        if numero > sqlite_db.user_version:
+            with sqlite_db.atomic():
+                migracion()
+                sqlite_db.user_version = numero
+            aplicadas.append(descripcion)
+    sqlite_db.create_tables(modelos)
+    return aplicadas
@@ -0,0 +1,231 @@
+"""Servicio local de consultas de solo lectura sobre la base de obras (HTTP/1.1
+sobre TCP o sobre un socket Unix).
+
+    python servicio_obras.py --db obras_urbanas.db --puerto 8080 --lectores 4
+    python servicio_obras.py --db obras_urbanas.db --socket /tmp/obras.sock
+
+    GET /indicadores                          los de ControlObra.Obtener_indicadores
+    GET /obras/123                            una obra
+    GET /obras?etapa=3&comuna=1&orden=monto   listado filtrado, de a `limite` obras
+    GET /buscar?q=escuela&limite=20           búsqueda de texto (FTS5)
+    GET /metricas                             instrumentación en formato Prometheus
+
+Las conexiones aceptan pedidos en un único event loop de asyncio; cada consulta
+corre en uno de `lectores` hilos, con su conexión de un pool abierta con el
+perfil 'consulta' y query_only. En WAL un escritor no bloquea a los lectores:
+otro proceso puede estar cargando datos mientras el servicio responde.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import datetime
+import json
+import logging
+import urllib.parse
+
+from instrumentacion import instrumentacion
+from modelo_orm import sqlite_db, Obra, ListadoObras, ORDENES_LISTADO
+
+logger = logging.getLogger('obras.servicio')
+
+LECTORES = 4
+LIMITE_LISTADO = 50
+MAXIMO_LISTADO = 500
+# Filtros del listado: parámetro -> método de ListadoObras (lista de ids separados por comas)
+FILTROS_LISTADO = {'etapa': 'etapa', 'tipo': 'tipo_obra', 'barrio': 'barrio', 'comuna': 'comuna'}
+# Rangos del listado: (parámetro mínimo, parámetro máximo, método, conversión)
+RANGOS_LISTADO = (
+    ('monto_min', 'monto_max', 'monto', float),
+    ('inicio_desde', 'inicio_hasta', 'fecha_inicio', datetime.date.fromisoformat),
+    ('avance_min', 'avance_max', 'avance', float),
+)
+MOTIVOS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+class PedidoInvalido(ValueError):
+    pass
+
+
+def _entero(parametros, nombre, defecto=None):
+    valor = parametros.get(nombre, defecto)
+    if valor is None:
+        return None
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise PedidoInvalido(f"'{nombre}' tiene que ser un entero") from None
+
+
+def _limite(parametros, defecto):
+    limite = _entero(parametros, 'limite', defecto)
+    if limite < 1:
+        raise PedidoInvalido("'limite' tiene que ser positivo")
+    return min(limite, MAXIMO_LISTADO)
+
+
+def _convertir(parametros, nombre, conversion):
+    if nombre not in parametros:
+        return None
+    try:
+        return conversion(parametros[nombre])
+    except ValueError:
+        raise PedidoInvalido(f"'{nombre}' no es válido") from None
+
+
+def listar_obras(parametros):
+    """Una página de obras filtradas (ver ListadoObras). `siguiente` es el valor
+    a pasar en `despues` para pedir la página que sigue."""
+    orden = parametros.get('orden', 'id')
+    if orden not in ORDENES_LISTADO:
+        raise PedidoInvalido(f"'orden' tiene que ser uno de: {', '.join(ORDENES_LISTADO)}")
+    listado = Obra.listado(orden, descendente=parametros.get('desc') in ('1', 'true'))
+    for nombre, metodo in FILTROS_LISTADO.items():
+        if nombre in parametros:
+            ids = [_entero({nombre: id_}, nombre) for id_ in parametros[nombre].split(',')]
+            getattr(listado, metodo)(*ids)
+    for minimo, maximo, metodo, conversion in RANGOS_LISTADO:
+        getattr(listado, metodo)(_convertir(parametros, minimo, conversion),
+                                 _convertir(parametros, maximo, conversion))
+    despues = _convertir(parametros, 'despues', ListadoObras.cursor_desde_texto)
+    pagina = listado.pagina(_limite(parametros, LIMITE_LISTADO), despues)
+    return {'obras': [obra._asdict() for obra in pagina.obras],
+            'siguiente': ListadoObras.cursor_a_texto(pagina.siguiente)}
+
+
+def obtener_obra(id_obra):
+    obras = list(Obra.recorrer(filtro=Obra.Id_Obra == id_obra, limite=1))
+    return obras[0]._asdict() if obras else None
+
+
+def buscar_obras(parametros):
+    texto = parametros.get('q', '').strip()
+    if not texto:
+        raise PedidoInvalido("falta el texto a buscar ('q')")
+    limite = _limite(parametros, 20)
+    return [{'Id_Obra': obra.Id_Obra, 'Nombre_obra': obra.Nombre_obra, 'Direccion': obra.Direccion,
+             'fragmento': obra.fragmento, 'relevancia': obra.relevancia}
+            for obra in Obra.buscar(texto, limite)]
+
+
+def atender(ruta, parametros):
+    """(estado, tipo de contenido, cuerpo) para un GET. Corre en un hilo lector."""
+    from gestionar_obras import ControlObra
+
+    partes = [parte for parte in ruta.split('/') if parte]
+    try:
+        with sqlite_db.connection_context():
+            if partes == ['indicadores']:
+                datos = ControlObra.indicadores()
+            elif partes == ['obras']:
+                datos = listar_obras(parametros)
+            elif len(partes) == 2 and partes[0] == 'obras':
+                if not partes[1].isdigit():
+                    raise PedidoInvalido('el id de la obra tiene que ser un entero')
+                datos = obtener_obra(int(partes[1]))
+                if datos is None:
+                    return 404, 'application/json', _json({'error': 'no existe la obra'})
+            elif partes == ['buscar']:
+                datos = buscar_obras(parametros)
+            elif partes == ['metricas']:
+                return 200, 'text/plain; version=0.0.4', instrumentacion.a_prometheus().encode()
+            else:
+                return 404, 'application/json', _json({'error': f'no existe {ruta}'})
+    except PedidoInvalido as error:
+        return 400, 'application/json', _json({'error': str(error)})
+    return 200, 'application/json', _json(datos)
+
+
+def _json(datos):
+    return json.dumps(datos, ensure_ascii=False, default=str).encode()
+
+
+class ServicioObras:
+    def __init__(self, lectores=LECTORES):
+        self.ejecutor = concurrent.futures.ThreadPoolExecutor(lectores, thread_name_prefix='lector')
+
+    async def atender_conexion(self, lector, escritor):
+        """Atiende los pedidos de una conexión (keep-alive) hasta que el cliente la cierre."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                linea = await lector.readline()
+                if not linea.strip():
+                    break
+                encabezados = {}
+                while (encabezado := await lector.readline()) not in (b'\r\n', b'\n', b''):
+                    nombre, _, valor = encabezado.decode('latin1').partition(':')
+                    encabezados[nombre.strip().lower()] = valor.strip()
+                try:
+                    metodo, destino, version = linea.decode('latin1').split()
+                except ValueError:
+                    await self._responder(escritor, 400, 'application/json', _json({'error': 'pedido mal formado'}))
+                    break
+                if int(encabezados.get('content-length') or 0):
+                    await lector.readexactly(int(encabezados['content-length']))
+                if metodo != 'GET':
+                    estado, tipo, cuerpo = 405, 'application/json', _json({'error': 'solo GET'})
+                else:
+                    url = urllib.parse.urlsplit(destino)
+                    parametros = dict(urllib.parse.parse_qsl(url.query))
+                    try:
+                        estado, tipo, cuerpo = await loop.run_in_executor(
+                            self.ejecutor, atender, url.path, parametros)
+                    except Exception:
+                        logger.exception('Error atendiendo %s', destino)
+                        estado, tipo, cuerpo = 500, 'application/json', _json({'error': 'error interno'})
+                seguir = (version == 'HTTP/1.1' and encabezados.get('connection', '').lower() != 'close')
+                await self._responder(escritor, estado, tipo, cuerpo, seguir)
+                if not seguir:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            escritor.close()
+
+    @staticmethod
+    async def _responder(escritor, estado, tipo, cuerpo, seguir=False):
+        escritor.write(
+            f'HTTP/1.1 {estado} {MOTIVOS[estado]}\r\nContent-Type: {tipo}\r\n'
+            f'Content-Length: {len(cuerpo)}\r\nConnection: {"keep-alive" if seguir else "close"}\r\n\r\n'
+            .encode('latin1') + cuerpo)
+        await escritor.drain()
+
+    async def servir(self, host='127.0.0.1', puerto=8080, socket=None):
+        if socket:
+            servidor = await asyncio.start_unix_server(self.atender_conexion, socket)
+        else:
+            servidor = await asyncio.start_server(self.atender_conexion, host, puerto)
+        direcciones = ', '.join(str(s.getsockname()) for s in servidor.sockets)
+        print(f"\U0001F310 Servicio de consultas escuchando en {direcciones}", flush=True)
+        async with servidor:
+            await servidor.serve_forever()
+
+
+def configurar_lectura(ruta_db, lectores=LECTORES):
+    """Pool de conexiones de solo lectura con el perfil 'consulta'."""
+    sqlite_db.configurar(ruta_db, 'consulta', pool=True, max_conexiones=lectores, query_only=1)
+    with sqlite_db.connection_context():
+        if not sqlite_db.table_exists(Obra._meta.table_name):
+            raise SystemExit(f"La base {ruta_db} no tiene obras cargadas.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help='archivo de la base (por defecto OBRAS_DB)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8080)
+    parser.add_argument('--socket', help='escuchar en un socket Unix en lugar de TCP')
+    parser.add_argument('--lectores', type=int, default=LECTORES, help='hilos (y conexiones) de lectura')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    configurar_lectura(args.db, args.lectores)
+    try:
+        asyncio.run(ServicioObras(args.lectores).servir(args.host, args.puerto, args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()